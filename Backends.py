@@ -0,0 +1,516 @@
+# Backends.py
+
+import math
+import os
+import queue
+import threading
+import time
+from collections import namedtuple
+
+# google.generativeai and dotenv are imported by GeminiBackend on first
+# use (normally the intro's background warm-up), never at import time:
+# the SDK is slow to import and combat-only tools don't need it.
+
+MODEL_NAME = "gemini-2.5-flash"
+
+# How long the remote model gets before the local rule engine answers instead
+LATENCY_BUDGET_SECONDS = 3.0
+
+# Upper bound on a single remote request, so abandoned calls still end
+REQUEST_TIMEOUT_SECONDS = 30
+
+# "gemini" (remote, with local fallback) or "local" (rule engine only)
+BACKEND_ENV_VAR = "NEGOTIATOR_BACKEND"
+
+# Everything a negotiator may base its reply on. Model backends only read
+# the prompt text; LocalRuleBackend works from these fields directly.
+NegotiationTurn = namedtuple(
+    "NegotiationTurn",
+    "shopkeeper personality mood step item_name price offer prevoffer last_counter_offer catchphrase",
+)
+
+
+class Reply(str):
+    """
+    Reply text that also carries the model's token counts (None when the
+    backend doesn't report them) and whether it may be stored in the
+    reply cache. Behaves exactly like the plain string.
+    """
+
+    def __new__(cls, text, prompt_tokens=None, response_tokens=None, cacheable=True):
+        reply = super().__new__(cls, text)
+        reply.prompt_tokens = prompt_tokens
+        reply.response_tokens = response_tokens
+        reply.cacheable = cacheable
+        return reply
+
+
+def is_cacheable(text):
+    """False for replies that must not be stored in (or served from) the reply cache."""
+    return getattr(text, "cacheable", True)
+
+
+def _reply(text, response):
+    """Reply(text) with whatever usage_metadata `response` reports."""
+    usage = getattr(response, "usage_metadata", None)
+    return Reply(
+        text,
+        getattr(usage, "prompt_token_count", None),
+        getattr(usage, "candidates_token_count", None),
+    )
+
+
+# ------------------- Client pool -------------------
+class ClientPool:
+    """
+    Thread-safe pool of long-lived model clients.
+
+    Clients are built by `factory` on demand (at most `size` of them)
+    and handed out one caller at a time; callers block when all are busy.
+    """
+
+    def __init__(self, factory, size=4):
+        self.factory = factory
+        self.size = size
+        self.created = 0
+        self._idle = queue.LifoQueue()
+        self._lock = threading.Lock()
+
+    def _reserve(self):
+        """Claim a slot for a new client; False once the pool is full."""
+        with self._lock:
+            if self.created >= self.size:
+                return False
+            self.created += 1
+            return True
+
+    def _build(self):
+        try:
+            return self.factory()
+        except Exception:
+            with self._lock:
+                self.created -= 1
+            raise
+
+    def acquire(self):
+        try:
+            return self._idle.get_nowait()
+        except queue.Empty:
+            pass
+        if self._reserve():
+            return self._build()
+        return self._idle.get()
+
+    def release(self, client):
+        self._idle.put(client)
+
+    def warm_up(self):
+        """Build every client up front so no player waits on setup."""
+        while self._reserve():
+            self._idle.put(self._build())
+
+
+# ------------------- Backends -------------------
+class NegotiationBackend:
+    """
+    What Shopkeeper needs from a negotiator: prompt (and the structured
+    NegotiationTurn behind it) in, reply text ending in a DECISION line out
+    (a plain str, or a Reply when the model reports token counts).
+    Implementations must be safe to share between threads.
+    """
+
+    # Replies may go through the shared reply cache. The cache key only
+    # bands the offer and price, so exact backends must opt out.
+    cacheable = True
+
+    def generate(self, prompt, turn=None):
+        raise NotImplementedError
+
+    def stream(self, prompt, turn=None):
+        """Yield the reply in pieces as it is produced (default: all at once)."""
+        yield self.generate(prompt, turn)
+
+    def warm_up(self):
+        pass
+
+
+class PooledBackend(NegotiationBackend):
+    """Backend whose replies come from model clients held in a ClientPool."""
+
+    def __init__(self, pool, request_options=None):
+        self.pool = pool
+        # Passed to generate_content, e.g. {"timeout": 30} to bound a call
+        self.request_options = request_options
+
+    def _options(self):
+        return {"request_options": self.request_options} if self.request_options else {}
+
+    def generate(self, prompt, turn=None):
+        model = self.pool.acquire()
+        try:
+            response = model.generate_content(prompt, **self._options())
+        finally:
+            self.pool.release(model)
+        return _reply(response.text.strip(), response)
+
+    def stream(self, prompt, turn=None):
+        # Streamed chunks report the running token counts so far
+        model = self.pool.acquire()
+        try:
+            for chunk in model.generate_content(prompt, stream=True, **self._options()):
+                if chunk.text:
+                    yield _reply(chunk.text, chunk)
+        finally:
+            self.pool.release(model)
+
+    def warm_up(self):
+        self.pool.warm_up()
+
+
+class GeminiBackend(PooledBackend):
+    """Google Gemini, configured once and served from a ClientPool."""
+
+    def __init__(self, model_name=MODEL_NAME, pool_size=4):
+        import google.generativeai as genai
+        from dotenv import load_dotenv
+
+        load_dotenv()
+        genai.configure(api_key=os.getenv("GEMINI_API_KEY"))
+        self.model_name = model_name
+        super().__init__(
+            ClientPool(lambda: genai.GenerativeModel(self.model_name), size=pool_size),
+            request_options={"timeout": REQUEST_TIMEOUT_SECONDS},
+        )
+
+
+class _StubReply:
+    def __init__(self, text):
+        self.text = text
+
+
+class _StubModel:
+    """Mimics genai.GenerativeModel: optional setup cost, canned reply."""
+
+    def __init__(self, backend):
+        self.backend = backend
+        if backend.setup_seconds:
+            time.sleep(backend.setup_seconds)
+
+    def generate_content(self, prompt, stream=False):
+        text = self.backend.reply_for(prompt)
+        if stream:
+            return self._stream(text)
+        if self.backend.latency_seconds:
+            time.sleep(self.backend.latency_seconds)
+        return _StubReply(text)
+
+    def _stream(self, text):
+        # Spread the total latency over the chunks, like a real token stream
+        size = self.backend.chunk_size
+        pieces = [text[i:i + size] for i in range(0, len(text), size)] or [""]
+        pause = self.backend.latency_seconds / len(pieces)
+        for piece in pieces:
+            if pause:
+                time.sleep(pause)
+            yield _StubReply(piece)
+
+
+class LocalStubBackend(PooledBackend):
+    """
+    Offline stand-in with the same pooling as GeminiBackend.
+
+    Counts calls and client setups, so per-call setup overhead can be
+    measured without network access (setups should stay <= pool size).
+    """
+
+    def __init__(
+        self,
+        reply="Hmph. Fine, I'll take 25 gold for it.\nDECISION: ACCEPT",
+        setup_seconds=0.0,
+        latency_seconds=0.0,
+        pool_size=4,
+        chunk_size=12,
+    ):
+        self.reply = reply
+        self.setup_seconds = setup_seconds
+        self.latency_seconds = latency_seconds
+        # Characters per streamed chunk when stream() is used
+        self.chunk_size = chunk_size
+        self.calls = 0
+        self._calls_lock = threading.Lock()
+        super().__init__(ClientPool(lambda: _StubModel(self), size=pool_size))
+
+    def reply_for(self, prompt):
+        return self.reply
+
+    def _count_call(self):
+        with self._calls_lock:
+            self.calls += 1
+
+    def generate(self, prompt, turn=None):
+        self._count_call()
+        return super().generate(prompt, turn)
+
+    def stream(self, prompt, turn=None):
+        self._count_call()
+        return super().stream(prompt, turn)
+
+    @property
+    def setups(self):
+        return self.pool.created
+
+
+# ------------------- Local rule engine -------------------
+# Reply templates per personality "tone". The number the shopkeeper wants
+# must be the last number in the text (Shopkeeper scrapes it as the
+# counter-offer), and the decision words only appear on the final line.
+RULE_LINES = {
+    "arrogant": {
+        "agree": "{catch} {offer} gold. Take the {item} before I change my mind.",
+        "counter": "{catch} {offer} gold for a {item}? Insulting. {counter} gold.",
+        "annoyed": "You're wasting my time. {counter} gold, not a copper less.",
+        "refuse": "I'm done haggling. It's {counter} gold or the door.",
+    },
+    "warm": {
+        "agree": "{catch} {offer} gold is fair. The {item} is yours, friend.",
+        "counter": "{catch} I can't go as low as {offer} gold for the {item}. How about {counter} gold?",
+        "annoyed": "Friend, I've been patient. {counter} gold is the best I can do.",
+        "refuse": "I'm sorry, traveler, I can't lower it again. {counter} gold.",
+    },
+}
+
+DEFAULT_RULES = {"opening_ratio": 1.3, "accept_ratio": 1.0, "concession": 0.05, "tone": "warm"}
+
+
+class LocalRuleBackend(NegotiationBackend):
+    """
+    Deterministic offline shopkeeper: no model and no network.
+
+    The asking price starts at the personality's opening_ratio of the
+    hidden price and drops by `concession` each step while the mood
+    allows it, never below accept_ratio or above the last counter-offer.
+    The player wins by meeting the asking price or a previous counter.
+    Replies are exact and free to compute, so they are never cached.
+    """
+
+    cacheable = False
+
+    def ask_price(self, turn):
+        rules = {**DEFAULT_RULES, **turn.personality}
+        steps = min(turn.step, 4) - 1  # "Very annoyed" (step 5) and worse stop conceding
+        ratio = max(rules["accept_ratio"], rules["opening_ratio"] - rules["concession"] * steps)
+        ask = max(1, math.ceil(turn.price * ratio))
+        if turn.last_counter_offer:
+            ask = min(ask, turn.last_counter_offer)
+        return ask
+
+    def generate(self, prompt, turn=None):
+        if turn is None:
+            raise ValueError("LocalRuleBackend needs the NegotiationTurn, not just a prompt")
+        lines = RULE_LINES.get(turn.personality.get("tone"), RULE_LINES[DEFAULT_RULES["tone"]])
+        ask = self.ask_price(turn)
+
+        if turn.offer >= ask:
+            template, decision = lines["agree"], "ACCEPT"
+        elif turn.mood == "Refuses to negotiate further":
+            template, decision = lines["refuse"], "REJECT"
+        elif turn.step > 2:
+            template, decision = lines["annoyed"], "REJECT"
+        else:
+            template, decision = lines["counter"], "REJECT"
+
+        text = template.format(catch=turn.catchphrase, offer=turn.offer, item=turn.item_name, counter=ask)
+        return f"{text}\nDECISION: {decision}"
+
+
+# ------------------- Deadlines -------------------
+_STREAM_END = object()
+
+
+class DeadlineExceeded(Exception):
+    """A negotiator did not answer before its deadline."""
+
+
+class BackgroundStream:
+    """
+    Pulls an iterator on a daemon thread so the reader can wait for each
+    piece with a timeout. cancel() stops pulling after the piece in
+    flight and closes the source (which hands a pooled client back).
+    """
+
+    def __init__(self, make_iterator):
+        self._pieces = queue.Queue()
+        self._stop = threading.Event()
+        threading.Thread(target=self._pump, args=(make_iterator,), name="negotiator-stream", daemon=True).start()
+
+    def _pump(self, make_iterator):
+        try:
+            source = make_iterator()
+            try:
+                for piece in source:
+                    if self._stop.is_set():
+                        break
+                    self._pieces.put(piece)
+            finally:
+                close = getattr(source, "close", None)
+                if close is not None:
+                    close()
+        except Exception as exc:
+            self._pieces.put(exc)
+        finally:
+            self._pieces.put(_STREAM_END)
+
+    def next(self, timeout=None):
+        """
+        Next piece, waiting at most `timeout` seconds. Raises
+        DeadlineExceeded on timeout, StopIteration at the end, and
+        re-raises whatever the source raised.
+        """
+        try:
+            piece = self._pieces.get(timeout=timeout)
+        except queue.Empty:
+            raise DeadlineExceeded from None
+        if piece is _STREAM_END:
+            self._pieces.put(_STREAM_END)  # stay at the end for later calls
+            raise StopIteration
+        if isinstance(piece, Exception):
+            raise piece
+        return piece
+
+    def cancel(self):
+        self._stop.set()
+
+
+def _remaining(deadline):
+    """Seconds left until a time.perf_counter() deadline (None = no limit)."""
+    if deadline is None:
+        return None
+    return max(0.0, deadline - time.perf_counter())
+
+
+def stream_before(pieces, deadline):
+    """
+    Yield from `pieces` until the time.perf_counter() `deadline`, then
+    cancel the source and raise DeadlineExceeded.
+    """
+    reader = BackgroundStream(lambda: iter(pieces))
+    while True:
+        try:
+            piece = reader.next(timeout=_remaining(deadline))
+        except StopIteration:
+            return
+        except DeadlineExceeded:
+            reader.cancel()
+            raise
+        yield piece
+
+
+def call_before(deadline, func, *args):
+    """
+    func(*args) on a daemon thread; its result, or DeadlineExceeded once
+    the time.perf_counter() `deadline` passes. A call that can't be
+    interrupted is abandoned and its result dropped.
+    """
+    reader = BackgroundStream(lambda: iter((func(*args),)))
+    try:
+        return reader.next(timeout=_remaining(deadline))
+    except DeadlineExceeded:
+        reader.cancel()
+        raise
+
+
+# ------------------- Latency budget -------------------
+class FallbackBackend(NegotiationBackend):
+    """
+    Gives `primary` budget_seconds to answer (to its first streamed
+    piece when streaming); if it is slower or fails, `fallback` answers
+    instead. An abandoned remote call finishes on its daemon thread and
+    its result is dropped.
+    """
+
+    def __init__(self, primary, fallback=None, budget_seconds=LATENCY_BUDGET_SECONDS):
+        self.primary = primary
+        self.fallback = fallback if fallback is not None else LocalRuleBackend()
+        self.budget_seconds = budget_seconds
+        self.fallbacks = 0
+        self._lock = threading.Lock()
+
+    def _count_fallback(self):
+        with self._lock:
+            self.fallbacks += 1
+
+    def generate(self, prompt, turn=None):
+        try:
+            return call_before(time.perf_counter() + self.budget_seconds, self.primary.generate, prompt, turn)
+        except Exception:  # timed out, or the remote call itself failed
+            self._count_fallback()
+            return Reply(self.fallback.generate(prompt, turn), cacheable=False)
+
+    def stream(self, prompt, turn=None):
+        reader = BackgroundStream(lambda: self.primary.stream(prompt, turn))
+        try:
+            try:
+                first = reader.next(timeout=self.budget_seconds)
+            except Exception:  # too slow, empty, or the remote stream failed
+                first = None
+            if first is None:
+                reader.cancel()
+                self._count_fallback()
+                for piece in self.fallback.stream(prompt, turn):
+                    yield Reply(piece, cacheable=False)
+                return
+
+            yield first
+            while True:
+                try:
+                    yield reader.next()
+                except StopIteration:
+                    return
+        finally:
+            # Also runs when the consumer stops early (e.g. stream_before
+            # hit its deadline): stop pulling the model, which closes the
+            # primary stream and hands its client back to the pool
+            reader.cancel()
+
+    def warm_up(self):
+        self.primary.warm_up()
+        self.fallback.warm_up()
+
+
+# ------------------- Process-wide backend -------------------
+_backend = None
+_backend_lock = threading.Lock()
+
+
+def get_backend():
+    """
+    The shared backend, created once per process: Gemini behind a
+    latency budget by default, or only the rule engine when
+    NEGOTIATOR_BACKEND=local or the Gemini SDK isn't installed.
+    """
+    global _backend
+    if _backend is None:
+        with _backend_lock:
+            if _backend is None:
+                if os.getenv(BACKEND_ENV_VAR, "gemini").lower() == "local":
+                    _backend = LocalRuleBackend()
+                else:
+                    try:
+                        _backend = FallbackBackend(GeminiBackend())
+                    except ImportError:
+                        _backend = LocalRuleBackend()
+    return _backend
+
+
+def set_backend(backend):
+    """Install a different backend for every shopkeeper (e.g. LocalRuleBackend)."""
+    global _backend
+    with _backend_lock:
+        _backend = backend
+
+
+def warm_up_in_background():
+    """Create and warm the shared backend on a daemon thread."""
+    thread = threading.Thread(target=lambda: get_backend().warm_up(), name="backend-warm-up", daemon=True)
+    thread.start()
+    return thread
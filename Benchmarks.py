@@ -0,0 +1,284 @@
+# Benchmarks.py
+
+import argparse
+import json
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import time
+
+import Rng
+from UI import ScriptedIO, use_io
+from Characters import Character, create_enemy, enemy_templates
+from Combat import ACTIONS, Combat
+from Simulator import Simulator, new_player, random_policy
+from ResponseCache import LRUCache, ResponseCache
+from Shopkeeper import Shopkeeper, greedy
+from Backends import LocalStubBackend
+
+# Results of every recorded run, oldest first
+HISTORY_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "benchmark_history.json")
+
+# A path fails when it gets this much slower than its baseline (0.25 = +25%)
+DEFAULT_THRESHOLD = 0.25
+
+# Baseline = median of this many most recent recorded runs, so one noisy
+# run can't move it much
+BASELINE_RUNS = 5
+
+# Timing repeats per benchmark; the fastest repeat is reported, since
+# slower ones only measure interference from the rest of the machine
+REPEATS = 5
+
+SEED = 1234
+
+
+# ------------------------
+# BENCHMARK CASES
+# ------------------------
+# Each case is a build() that sets up its fixtures once and returns
+# (run, calls): run(calls) drives the hot path `calls` times per sample.
+
+def _resolve_turn_case(player_action, enemy_action):
+    def build():
+        combat = Combat()
+        player = Character("Player", 100, 0, 5, 5)
+        enemy = Character("Enemy", 100, 0, 5, 6)
+
+        def run(calls):
+            for _ in range(calls):
+                # Same starting state every call, so every sample takes the same branch
+                player.health, player.armor, player.vigor = 100, 5, 0
+                enemy.health, enemy.armor, enemy.vigor = 100, 5, 0
+                combat.resolve_turn(player, enemy, player_action, enemy_action)
+        return run, 2000
+    return build
+
+
+def _enemy_action_case():
+    combat = Combat()
+    enemies = []
+    for template in enemy_templates:
+        for vigor in (0, 2):
+            enemy = create_enemy(0, template)
+            enemy.vigor = vigor
+            enemies.append(enemy)
+
+    def run(calls):
+        with Rng.use_seed(SEED):
+            for i in range(calls):
+                enemy = enemies[i % len(enemies)]
+                vigor = enemy.vigor
+                combat._get_enemy_action(enemy)
+                enemy.vigor = vigor  # undo any Vigor paid for a special
+    return run, 20000
+
+
+def _create_enemy_case():
+    def run(calls):
+        with Rng.use_seed(SEED):
+            for i in range(calls):
+                create_enemy(i % 50)  # rounds 1-50
+    return run, 10000
+
+
+def _simulator_battle_case(compiled):
+    def build():
+        sim = Simulator(policy=random_policy, compiled=compiled, seed=SEED)
+        template = enemy_templates[0]
+
+        def run(calls):
+            for _ in range(calls):
+                enemy = create_enemy(0, template, pool=sim.enemy_pool)
+                sim.run_battle(new_player(), enemy)
+                sim.enemy_pool.release(enemy)
+        return run, 500
+    return build
+
+
+def _menu_script(text, answered):
+    if "(y/n)" in text:
+        return "n"
+    return "123"[answered % 3]
+
+
+def _combat_battle_case():
+    """The real interactive Combat.run_battle on a scripted console (no pauses)."""
+    combat = Combat()
+    template = enemy_templates[0]
+
+    def run(calls):
+        with Rng.use_seed(SEED):
+            for _ in range(calls):
+                with use_io(ScriptedIO(_menu_script)):
+                    combat.run_battle(new_player(), create_enemy(0, template))
+    return run, 100
+
+
+def _negotiate_case():
+    """One Shopkeeper.negotiate step against the offline stub (reply cache off)."""
+    backend = LocalStubBackend(reply="Hmph. 30 gold, not a copper less.\nDECISION: REJECT")
+    cache = ResponseCache(memory=LRUCache(max_entries=0))
+    shopkeeper = Shopkeeper("Grimble", greedy, cache=cache, backend=backend)
+
+    def run(calls):
+        with Rng.use_seed(SEED):
+            for i in range(calls):
+                session = shopkeeper.new_session("Iron Sword", 40)
+                shopkeeper.negotiate(session, 10 + i % 20, 0)
+    return run, 2000
+
+
+# Fresh interpreter that starts the real game and quits at its first prompt
+_FIRST_PROMPT_SCRIPT = """
+import os
+from UI import ScriptedIO, use_io
+from GameController import GameController
+
+def first_prompt(text, answered):
+    os._exit(0)
+
+with use_io(ScriptedIO(first_prompt)):
+    GameController().run()
+"""
+
+
+def _startup_case():
+    """
+    Time to first prompt of a cold start: interpreter, imports and the
+    intro (pauses skipped) up to the name prompt.
+    """
+    here = os.path.dirname(os.path.abspath(__file__))
+    command = [sys.executable, "-c", _FIRST_PROMPT_SCRIPT]
+
+    def run(calls):
+        for _ in range(calls):
+            subprocess.run(command, cwd=here, check=True, stdout=subprocess.DEVNULL)
+    return run, 5
+
+
+def benchmark_cases():
+    """{name: build()} for every hot path, in report order."""
+    cases = {}
+    for player_action in ACTIONS:
+        for enemy_action in ACTIONS:
+            cases[f"resolve_turn[{player_action}/{enemy_action}]"] = _resolve_turn_case(player_action, enemy_action)
+    cases["enemy_action"] = _enemy_action_case
+    cases["create_enemy[rounds 1-50]"] = _create_enemy_case
+    cases["simulator.run_battle"] = _simulator_battle_case(False)
+    cases["simulator.run_battle[compiled]"] = _simulator_battle_case(True)
+    cases["combat.run_battle[scripted]"] = _combat_battle_case
+    cases["shopkeeper.negotiate[stub]"] = _negotiate_case
+    cases["startup.first_prompt"] = _startup_case
+    return cases
+
+
+# ------------------------
+# RUNNER
+# ------------------------
+def time_case(build, repeats=REPEATS, scale=1.0):
+    """Seconds per call of one case (best of `repeats` samples)."""
+    run, calls = build()
+    calls = max(1, int(calls * scale))
+    run(max(1, calls // 10))  # warm caches and lazy tables
+    best = None
+    for _ in range(repeats):
+        start = time.perf_counter()
+        run(calls)
+        sample = (time.perf_counter() - start) / calls
+        best = sample if best is None else min(best, sample)
+    return best
+
+
+def run_benchmarks(only=None, repeats=REPEATS, scale=1.0):
+    """{name: seconds per call} for every case whose name contains `only`."""
+    results = {}
+    for name, build in benchmark_cases().items():
+        if only and only not in name:
+            continue
+        results[name] = time_case(build, repeats, scale)
+    return results
+
+
+def load_history(path=HISTORY_PATH):
+    if not os.path.exists(path):
+        return []
+    with open(path, encoding="utf-8") as handle:
+        return json.load(handle)["runs"]
+
+
+def record(results, path=HISTORY_PATH):
+    runs = load_history(path)
+    runs.append({
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "python": platform.python_version(),
+        "machine": platform.machine(),
+        "results": results,
+    })
+    with open(path, "w", encoding="utf-8") as handle:
+        json.dump({"runs": runs}, handle, indent=2)
+
+
+def baselines(history, runs=BASELINE_RUNS):
+    """{name: median seconds per call over the last `runs` runs that timed it}."""
+    samples = {}
+    for run in reversed(history):
+        for name, seconds in run["results"].items():
+            if len(samples.setdefault(name, [])) < runs:
+                samples[name].append(seconds)
+    return {name: statistics.median(values) for name, values in samples.items()}
+
+
+def compare(results, history, threshold=DEFAULT_THRESHOLD):
+    """
+    Rows of (name, seconds, baseline or None, ratio or None, regressed)
+    for every result; regressed means slower than baseline * (1 + threshold).
+    """
+    base = baselines(history)
+    rows = []
+    for name, seconds in results.items():
+        reference = base.get(name)
+        ratio = seconds / reference if reference else None
+        rows.append((name, seconds, reference, ratio, ratio is not None and ratio > 1 + threshold))
+    return rows
+
+
+# ----------------------------------------------------------------------
+# Entry point
+# ----------------------------------------------------------------------
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Time the game's hot paths and flag regressions")
+    parser.add_argument("--history", default=HISTORY_PATH, help="JSON history file")
+    parser.add_argument("--threshold", type=float, default=DEFAULT_THRESHOLD,
+                        help="fail when a path is this much slower than its baseline (0.25 = +25%%)")
+    parser.add_argument("--only", help="run only benchmarks whose name contains this")
+    parser.add_argument("--repeats", type=int, default=REPEATS)
+    parser.add_argument("--quick", action="store_true", help="fewer calls per sample (noisier)")
+    parser.add_argument("--no-record", action="store_true", help="compare only, don't append to the history")
+    parser.add_argument("--accept", action="store_true",
+                        help="record this run even if it regressed (makes it part of the new baseline)")
+    args = parser.parse_args()
+
+    results = run_benchmarks(args.only, args.repeats, 0.2 if args.quick else 1.0)
+    rows = compare(results, load_history(args.history), args.threshold)
+
+    regressions = 0
+    for name, seconds, reference, ratio, regressed in rows:
+        change = f"{ratio - 1:+7.1%}" if ratio is not None else "    new"
+        flag = "  REGRESSION" if regressed else ""
+        print(f"{name:<40} {seconds * 1e6:10.2f} us  {change}{flag}")
+        regressions += regressed
+
+    # A regressed run only joins the history when accepted, so a slowdown
+    # can't creep into the baseline by being run a few times
+    if not args.no_record:
+        if regressions and not args.accept:
+            print("Not recording this run (rerun with --accept to make it the new normal)")
+        else:
+            record(results, args.history)
+    if regressions:
+        print(f"{regressions} path(s) slower than baseline by more than {args.threshold:.0%}")
+        if not args.accept:
+            sys.exit(1)
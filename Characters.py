@@ -1,4 +1,30 @@
+import json
+import math
+import os
+from bisect import bisect
+from collections import namedtuple
+from functools import lru_cache
+from itertools import accumulate
+
+import Rng
+
+
 class Character:
+    # Every combat field is declared up front: no per-instance __dict__,
+    # which keeps millions of simulated combatants small and fast to read.
+    __slots__ = (
+        "name",
+        "health",
+        "money",
+        "armor",
+        "damage",
+        "inventory",
+        "vigor",
+        "gold_min",
+        "gold_max",
+        "preferred_action",
+    )
+
     def __init__(self, name, health, money, armor, damage):
         self.name = name
         self.health = health
@@ -9,43 +35,316 @@ class Character:
         self.inventory = []
         # Vigor resource used by combat (starts at 0 for player & enemies)
         self.vigor = 0
+        # Enemy-only fields (loot range + AI preference); harmless on the player
+        self.gold_min = 0
+        self.gold_max = 0
+        self.preferred_action = None
+
+    def reset(self, name, health, money, armor, damage):
+        """Re-initialise in place so pooled instances can be reused."""
+        self.name = name
+        self.health = health
+        self.money = money
+        self.armor = armor
+        self.damage = damage
+        self.inventory.clear()
+        self.vigor = 0
+        self.gold_min = 0
+        self.gold_max = 0
+        self.preferred_action = None
+
+
+class EnemyPool:
+    """
+    Recycles enemy Character objects between rounds and simulations.
+
+    acquire() hands back a reset instance (allocating only when the pool
+    is empty); release() returns one once its battle is over.
+    """
+
+    def __init__(self, max_size=1024):
+        self.max_size = max_size
+        self._free = []
+
+    def __len__(self):
+        return len(self._free)
+
+    def acquire(self, name, health, armor, damage):
+        if self._free:
+            enemy = self._free.pop()
+            enemy.reset(name, health, 0, armor, damage)
+            return enemy
+        return Character(name=name, health=health, money=0, armor=armor, damage=damage)
+
+    def release(self, enemy):
+        if len(self._free) < self.max_size:
+            self._free.append(enemy)
+
+
+# ----------------------------------------------------------------------
+# ENEMY CATALOG
+# ----------------------------------------------------------------------
+# Templates and round scaling live in a JSON data file, so new enemy
+# types and curves need no code changes. Set ENEMY_CATALOG to load a
+# different file.
+ENEMY_CATALOG_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "enemies.json")
+CATALOG_ENV_VAR = "ENEMY_CATALOG"
+
+PREFERRED_ACTIONS = (None, "attack", "block", "feint")
+
+# Stats that grow with the fight index. A curve is either a number
+# (bonus = floor(rate * rounds_after_the_first)) or a list of bonuses by
+# rounds after the first, whose last entry holds from then on.
+SCALED_STATS = ("health", "armor", "damage", "gold_min", "gold_max", "vigor")
+
+_TEMPLATE_KEYS = {
+    "name", "health", "armor", "damage", "gold_min", "gold_max", "vigor",
+    "preferred_action", "spawn_weight", "min_fight", "max_fight", "scaling", "notes",
+}
+
+# How many fight indices keep their stat blocks / spawn tables around
+ROUND_CACHE_SIZE = 256
+
+# One template's numbers at one fight index
+StatBlock = namedtuple(
+    "StatBlock", "name health armor damage gold_min gold_max vigor preferred_action"
+)
+
+# Templates that can spawn at one fight index, with cumulative weights
+# for the weighted roll (indices point into enemy_templates)
+SpawnTable = namedtuple("SpawnTable", "indices blocks cum_weights total")
+
+
+def _check_curve(curve, where):
+    if isinstance(curve, bool):
+        raise ValueError(f"{where}: scaling curve must be a number or a list of integers")
+    if isinstance(curve, (int, float)):
+        if curve < 0:
+            raise ValueError(f"{where}: scaling rate must not be negative")
+        return curve
+    if isinstance(curve, list) and curve and all(isinstance(v, int) and not isinstance(v, bool) for v in curve):
+        if any(v < 0 for v in curve):
+            raise ValueError(f"{where}: scaling curve entries must not be negative (got {curve!r})")
+        return tuple(curve)
+    raise ValueError(f"{where}: scaling curve must be a number or a non-empty list of integers")
+
+
+def _check_scaling(scaling, where):
+    if not isinstance(scaling, dict):
+        raise ValueError(f"{where}: scaling must be an object")
+    unknown = set(scaling) - set(SCALED_STATS)
+    if unknown:
+        raise ValueError(f"{where}: unknown scaled stat(s) {sorted(unknown)}")
+    return {stat: _check_curve(curve, f"{where}.{stat}") for stat, curve in scaling.items()}
+
+
+def _check_int(template, key, where, minimum, default=None):
+    value = template.get(key, default)
+    if not isinstance(value, int) or isinstance(value, bool) or value < minimum:
+        raise ValueError(f"{where}: {key} must be an integer >= {minimum} (got {value!r})")
+    return value
+
+
+def validate_catalog(data, source="enemy catalog"):
+    """
+    Check a parsed catalog and return its templates as plain dicts
+    (defaults filled in, per-template scaling merged over the default).
+    Raises ValueError naming the file, template and field at fault.
+    """
+    if not isinstance(data, dict) or not isinstance(data.get("templates"), list):
+        raise ValueError(f"{source}: expected an object with a 'templates' list")
+    unknown = set(data) - {"scaling", "templates"}
+    if unknown:
+        raise ValueError(f"{source}: unknown top-level key(s) {sorted(unknown)}")
+    default_scaling = _check_scaling(data.get("scaling", {}), f"{source}: scaling")
+
+    templates = []
+    names = set()
+    for position, raw in enumerate(data["templates"]):
+        if not isinstance(raw, dict):
+            raise ValueError(f"{source}: template #{position} must be an object")
+        name = raw.get("name")
+        if not isinstance(name, str) or not name:
+            raise ValueError(f"{source}: template #{position} needs a non-empty name")
+        where = f"{source}: {name}"
+        if name in names:
+            raise ValueError(f"{where}: duplicate template name")
+        names.add(name)
+        unknown = set(raw) - _TEMPLATE_KEYS
+        if unknown:
+            raise ValueError(f"{where}: unknown field(s) {sorted(unknown)}")
+
+        template = {
+            "name": name,
+            "health": _check_int(raw, "health", where, 1),
+            "armor": _check_int(raw, "armor", where, 0),
+            "damage": _check_int(raw, "damage", where, 0),
+            "gold_min": _check_int(raw, "gold_min", where, 0, 0),
+            "gold_max": _check_int(raw, "gold_max", where, 0, 0),
+            "vigor": _check_int(raw, "vigor", where, 0, 0),
+            "preferred_action": raw.get("preferred_action"),
+            "spawn_weight": raw.get("spawn_weight", 1),
+            "min_fight": _check_int(raw, "min_fight", where, 1, 1),
+            "max_fight": raw.get("max_fight"),
+            "scaling": dict(default_scaling, **_check_scaling(raw.get("scaling", {}), f"{where}: scaling")),
+        }
+        if template["gold_max"] < template["gold_min"]:
+            raise ValueError(f"{where}: gold_max is below gold_min")
+        if template["preferred_action"] not in PREFERRED_ACTIONS:
+            raise ValueError(f"{where}: preferred_action must be one of {PREFERRED_ACTIONS}")
+        weight = template["spawn_weight"]
+        if isinstance(weight, bool) or not isinstance(weight, (int, float)) or weight < 0:
+            raise ValueError(f"{where}: spawn_weight must be a number >= 0")
+        if template["max_fight"] is not None:
+            _check_int(raw, "max_fight", where, template["min_fight"])
+        templates.append(template)
+
+    if not templates:
+        raise ValueError(f"{source}: no templates")
+    if sum(template["spawn_weight"] for template in templates) <= 0:
+        raise ValueError(f"{source}: spawn weights add up to 0, so no template could ever spawn")
+    return templates
+
+
+def load_catalog(path=None):
+    """Read and validate an enemy catalog file (default: ENEMY_CATALOG or enemies.json)."""
+    path = path or os.environ.get(CATALOG_ENV_VAR) or ENEMY_CATALOG_PATH
+    with open(path, encoding="utf-8") as handle:
+        try:
+            data = json.load(handle)
+        except json.JSONDecodeError as exc:
+            raise ValueError(f"{path}: not valid JSON ({exc})") from None
+    return validate_catalog(data, path)
+
+
+# Loaded once at import; other modules hold on to this very list
+enemy_templates = load_catalog()
+
+
+def use_catalog(templates):
+    """
+    Swap in another catalog (a path or validated templates) for the
+    whole process and drop every cached round table.
+    """
+    if isinstance(templates, (str, os.PathLike)):
+        templates = load_catalog(templates)
+    enemy_templates[:] = templates
+    _positions.cache_clear()
+    stat_blocks.cache_clear()
+    spawn_table.cache_clear()
+
+
+# ----------------------------------------------------------------------
+# ROUND TABLES
+# ----------------------------------------------------------------------
+def _bonus(curve, scale):
+    if isinstance(curve, tuple):
+        return curve[min(scale, len(curve) - 1)]
+    return math.floor(curve * scale)
+
+
+def scaled_stats(template, fight_index):
+    """StatBlock for one template at one fight index (no caching)."""
+    scale = max(0, fight_index - 1)  # 0,1,2,...
+    scaling = template.get("scaling", {})
+    stats = {
+        stat: template.get(stat, 0) + (_bonus(scaling[stat], scale) if stat in scaling else 0)
+        for stat in SCALED_STATS
+    }
+    return StatBlock(
+        name=template["name"],
+        preferred_action=template.get("preferred_action"),
+        **stats,
+    )
+
+
+@lru_cache(maxsize=ROUND_CACHE_SIZE)
+def stat_blocks(fight_index):
+    """StatBlocks for every template at `fight_index`, in enemy_templates order."""
+    return tuple(scaled_stats(template, fight_index) for template in enemy_templates)
+
+
+@lru_cache(maxsize=ROUND_CACHE_SIZE)
+def spawn_table(fight_index):
+    """Weighted spawn table for `fight_index` (templates outside their fight window are left out)."""
+    blocks = stat_blocks(fight_index)
+    indices = tuple(
+        i for i, template in enumerate(enemy_templates)
+        if template.get("min_fight", 1) <= fight_index
+        and (template.get("max_fight") is None or fight_index <= template["max_fight"])
+    )
+    if not indices:
+        raise ValueError(f"no enemy template can spawn at fight {fight_index}")
+    weights = [enemy_templates[i].get("spawn_weight", 1) for i in indices]
+    if sum(weights) <= 0:
+        raise ValueError(f"every enemy template that can spawn at fight {fight_index} has spawn_weight 0")
+    cum_weights = tuple(accumulate(weights))
+    return SpawnTable(indices, tuple(blocks[i] for i in indices), cum_weights, cum_weights[-1] + 0.0)
+
+
+@lru_cache(maxsize=1)
+def _positions():
+    """id(template) -> index in enemy_templates."""
+    return {id(template): i for i, template in enumerate(enemy_templates)}
+
+
+def _block_for(template, fight_index):
+    """Cached StatBlock when `template` is a catalog entry, computed otherwise."""
+    i = _positions().get(id(template))
+    if i is not None and enemy_templates[i] is template:
+        return stat_blocks(fight_index)[i]
+    return scaled_stats(template, fight_index)
+
+
+def create_enemy(round_counter, template=None, pool=None):
+    """
+    Create a new enemy based on a weighted random template, scaled by round.
+
+    round_counter = number of enemies defeated so far in this run.
+    Pass `template` to skip the weighted roll (used by balance tools)
+    and `pool` (an EnemyPool) to reuse a released enemy object.
+
+    Fight index (for the next enemy) is:
+        fight_index = round_counter + 1
+
+    Stats come from the per-fight tables (stat_blocks / spawn_table),
+    built once per fight index from the catalog in enemies.json. With
+    the shipped catalog:
+        - Round 1: pure template stats (no scaling)
+        - From round 2 onward:
+            * +3 HP per round
+            * +2 Armor per round
+            * +1 base Damage per round
+            * Gold: grows very slowly (barely increasing)
+        - Starting Vigor:
+            * Rounds 1–3: 0 Vigor
+            * Rounds 4–7: 1 Vigor
+            * Rounds 8+: 2 Vigor
+    """
+    fight_index = round_counter + 1  # 1,2,3,...
+
+    if template is None:
+        # Same single random() + bisect as random.choices with these weights
+        table = spawn_table(fight_index)
+        pick = Rng.stream(Rng.ENEMY_SPAWN).random() * table.total
+        block = table.blocks[bisect(table.cum_weights, pick, 0, len(table.blocks) - 1)]
+    else:
+        block = _block_for(template, fight_index)
 
+    if pool is not None:
+        enemy = pool.acquire(block.name, block.health, block.armor, block.damage)
+    else:
+        enemy = Character(
+            name=block.name,
+            health=block.health,
+            money=0,
+            armor=block.armor,
+            damage=block.damage,
+        )
 
-enemy_templates = [
-    {
-        "name": "Goblin Cutthroat",
-        "health": 12,
-        "armor": 3,
-        "damage": 8,
-        "gold_min": 14,
-        "gold_max": 20,
-        # Nimble and tricksy – likes feints
-        "preferred_action": "feint",
-        # 45% spawn chance
-        "spawn_weight": 40,
-    },
-    {
-        "name": "Skeleton Knight",  # your "Skeleton King"
-        "health": 18,
-        "armor": 6,
-        "damage": 4,
-        "gold_min": 18,
-        "gold_max": 26,
-        # Heavily armored – likes to block and punish
-        "preferred_action": "block",
-        # 35% spawn chance
-        "spawn_weight": 35,
-    },
-    {
-        "name": "Bandit Raider",
-        "health": 16,
-        "armor": 4,
-        "damage": 6,
-        "gold_min": 20,
-        "gold_max": 30,
-        # Aggressive brawler – likes to attack
-        "preferred_action": "attack",
-        # 20% spawn chance
-        "spawn_weight": 25,
-    },
-]
+    enemy.gold_min = block.gold_min
+    enemy.gold_max = block.gold_max
+    # Preferred action for AI
+    enemy.preferred_action = block.preferred_action
+    enemy.vigor = block.vigor
+    return enemy
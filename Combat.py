@@ -1,11 +1,276 @@
 # Combat.py
 
-import time
-import random
-from UI import slow_print
+from bisect import bisect
+from collections import namedtuple
+from itertools import accumulate
+from time import perf_counter
+
+import Rng
+from Instrumentation import phase, record, timed
+from UI import read_line, sleep, slow_print, write_line
+
+# Every logical action resolve_turn understands. The index doubles as a
+# compact action code for the headless engines (VectorCombat, CombatTable).
+ACTIONS = ("attack", "block", "feint", "heavy_attack", "fortify")
+ACTION_CODES = {name: code for code, name in enumerate(ACTIONS)}
+
+
+# ----------------------------------------------------------------------
+# ENEMY AI TABLES
+# ----------------------------------------------------------------------
+# (actions, weights) the enemy AI rolls, per preferred_action. The basic
+# menu is used under 2 Vigor, the specials menu from 2 Vigor up; any
+# preference not listed behaves like None.
+ENEMY_BASIC_WEIGHTS = {
+    "attack": (("attack", "block", "feint"), (0.5, 0.25, 0.25)),
+    "block": (("attack", "block", "feint"), (0.25, 0.5, 0.25)),
+    "feint": (("attack", "block", "feint"), (0.25, 0.25, 0.5)),
+    None: (("attack", "block", "feint"), (1 / 3, 1 / 3, 1 / 3)),
+}
+ENEMY_VIGOR_WEIGHTS = {
+    "attack": (("heavy_attack", "fortify", "feint"), (0.5, 0.25, 0.25)),
+    "block": (("fortify", "heavy_attack", "feint"), (0.5, 0.25, 0.25)),
+    "feint": (("feint", "heavy_attack", "fortify"), (0.5, 0.25, 0.25)),
+    None: (("heavy_attack", "fortify", "feint"), (0.4, 0.3, 0.3)),
+}
+
+
+class ActionSampler:
+    """
+    One enemy AI roll compiled to a cumulative-weight table.
+
+    draw() is random.choices(actions, weights, k=1)[0] with the sums done
+    up front: same single random() call, same bisect, same result.
+    `codes` holds the matching ACTION_CODES for the table-driven engines.
+    """
+
+    __slots__ = ("actions", "codes", "cum_weights", "total", "hi")
+
+    def __init__(self, actions, weights):
+        self.actions = actions
+        self.codes = tuple(ACTION_CODES[action] for action in actions)
+        self.cum_weights = tuple(accumulate(weights))
+        self.total = self.cum_weights[-1] + 0.0
+        self.hi = len(actions) - 1
+
+    def draw(self, rng):
+        return self.actions[bisect(self.cum_weights, rng.random() * self.total, 0, self.hi)]
+
+    def probabilities(self):
+        """{action: probability} (for exact calculators and dashboards)."""
+        previous = 0.0
+        result = {}
+        for action, cumulative in zip(self.actions, self.cum_weights):
+            result[action] = (cumulative - previous) / self.total
+            previous = cumulative
+        return result
+
+
+# (preferred_action, has 2+ Vigor) -> ActionSampler
+ENEMY_SAMPLERS = {
+    (preferred, has_vigor): ActionSampler(actions, weights)
+    for has_vigor, table in ((False, ENEMY_BASIC_WEIGHTS), (True, ENEMY_VIGOR_WEIGHTS))
+    for preferred, (actions, weights) in table.items()
+}
+
+
+def enemy_sampler(enemy):
+    """Compiled AI roll for this enemy's preference and current Vigor."""
+    has_vigor = enemy.vigor >= 2
+    sampler = ENEMY_SAMPLERS.get((getattr(enemy, "preferred_action", None), has_vigor))
+    return sampler if sampler is not None else ENEMY_SAMPLERS[(None, has_vigor)]
+
+
+def choose_enemy_actions(enemies):
+    """
+    Enemy AI moves for many enemies in one call (pays Vigor for specials).
+    Draws happen in list order, so this matches calling
+    Combat._get_enemy_action on each enemy in turn.
+    """
+    rng = Rng.stream(Rng.ENEMY_AI)
+    actions = []
+    for enemy in enemies:
+        action = enemy_sampler(enemy).draw(rng)
+        if action == "heavy_attack" or action == "fortify":
+            enemy.vigor = max(0, enemy.vigor - 2)
+        actions.append(action)
+    return actions
+
+
+# ----------------------------------------------------------------------
+# STRUCTURED COMBAT EVENTS
+# ----------------------------------------------------------------------
+# One record per line of combat text. Deltas are signed changes to the
+# actor (-3 armor = 3 armor lost); `amount` carries any other number the
+# line shows (a crit, chip damage, the armor a guard had before breaking).
+CombatEvent = namedtuple("CombatEvent", "kind actor target armor hp vigor amount")
+
+# Text templates, filled in only when someone asks to read an event.
+EVENT_TEXT = {
+    # Shared
+    "vigor_both": "Both {actor} and {target} steel themselves. (+1 Vigor each)",
+    "no_guard_hit": "{actor} has no guard left and takes {amount} HP damage directly!",
+    "guard_shatter": "{actor}'s guard shatters under the impact! (Armor reduced from {amount} to 0)",
+    "force_through": "The force carries through, dealing {amount} HP damage to {actor}.",
+    "armor_untouched": "{actor}'s armor remains untouched. (0 Armor lost)",
+    "armor_no_damage": "{actor}'s armor takes no damage. (0 Armor lost)",
+    "enemy_focus": "{actor} looks more focused. (+1 Vigor)",
+    "player_resolve": "{actor} steels their resolve. (+1 Vigor)",
+    "critical_hit": "Critical hit! {actor} takes {amount} HP damage.",
+    "chip_damage": "{actor} takes {amount} chip damage.",
+    "unexpected": "Nothing happens... (unexpected combo)",
+    # Attack vs Attack
+    "player_heavy_through": (
+        "{target} steps in with a standard strike, but "
+        "{actor}'s heavy swing blows straight through!"
+    ),
+    "enemy_heavy_through": (
+        "{target} rushes in with a quick attack, but "
+        "{actor}'s heavy swing smashes straight through!"
+    ),
+    "heavy_armor_stagger": (
+        "{actor}'s armor staggers under the weight of the blow. (-{armor_loss} Armor)"
+    ),
+    "heavy_armor_shatter_wound": (
+        "{actor}'s armor shatters and the strike bites into flesh. "
+        "(-{armor_loss} Armor, -{hp_loss} HP)"
+    ),
+    "heavy_armor_shatter": (
+        "{actor}'s armor shatters, leaving them exposed. (-{armor_loss} Armor)"
+    ),
+    "parry_clash": "Steel clashes against steel as both sides lunge in!",
+    "parry_tension": "No clean hit is landed, but tension rises.",
+    # Attack vs Block (player attacking)
+    "player_heavy_windup": "{actor} channels their strength into a devastating swing!",
+    "enemy_fortify_vs_heavy": (
+        "{actor} braces behind a fortified guard, absorbing even the heavy strike!"
+    ),
+    "player_strike_into_guard": "{actor} strikes, but {target} braces behind its guard!",
+    "enemy_fortify_vs_attack": (
+        "{actor}'s fortified stance turns the blow aside. (0 Armor lost)"
+    ),
+    "enemy_block_no_armor": (
+        "{actor} has no armor left; the blow crashes into its body. "
+        "(-{hp_loss} HP, +1 Vigor)"
+    ),
+    "enemy_block_armor_holds": (
+        "{actor}'s armor absorbs part of the blow but strains under pressure. "
+        "(-{armor_loss} Armor, +1 Vigor)"
+    ),
+    "enemy_block_armor_wound": (
+        "{actor}'s armor shatters, and the strike bites into flesh. "
+        "(-{armor_loss} Armor, -{hp_loss} HP, +1 Vigor)"
+    ),
+    "enemy_block_armor_break": (
+        "{actor}'s armor shatters, leaving it exposed. (-{armor_loss} Armor, +1 Vigor)"
+    ),
+    # Block vs Attack (enemy attacking)
+    "enemy_heavy_windup": "{actor} swings with a brutal, committed strike!",
+    "player_fortify_vs_heavy": "{actor}'s fortified guard absorbs even the heavy blow!",
+    "player_fortify_vs_attack": (
+        "{target} lunges, but {actor}'s fortified stance deflects the blow!"
+    ),
+    "enemy_lunge_into_guard": "{actor} lunges, but {target} raises their guard just in time!",
+    "player_block_no_armor": (
+        "{actor} has no armor left; the blow crashes into their body. "
+        "(-{hp_loss} HP, +1 Vigor)"
+    ),
+    "player_block_armor_holds": (
+        "{actor}'s armor rattles but holds. (-{armor_loss} Armor, +1 Vigor)"
+    ),
+    "player_block_armor_wound": (
+        "{actor}'s armor shatters, and pain follows through. "
+        "(-{armor_loss} Armor, -{hp_loss} HP, +1 Vigor)"
+    ),
+    "player_block_armor_break": (
+        "{actor}'s armor shatters under the blow. (-{armor_loss} Armor, +1 Vigor)"
+    ),
+    # Attack vs Feint / Feint vs Attack
+    "player_reads_feint": "{target} tries something clever, but {actor} reads it perfectly!",
+    "player_feint_caught": "{actor} overextends with a feint and gets caught clean!",
+    # Block vs Block
+    "both_circle": "Both fighters circle, shields up, waiting for an opening.",
+    # Block vs Feint (enemy feinting)
+    "player_fortify_vs_feint": (
+        "{actor} turtles up, and {target}'s feint crashes harmlessly off a fortified guard!"
+    ),
+    "enemy_feint_slips_past": "{target} turtles up, but {actor}'s feint slips past the guard!",
+    "player_feinted_no_armor": "The blow crashes straight into {actor}'s body. (-{hp_loss} HP)",
+    "player_feinted_armor_holds": "{actor}'s armor takes the full force. (-{armor_loss} Armor)",
+    "player_feinted_armor_wound": (
+        "{actor}'s armor shatters, and the impact bruises flesh beneath. "
+        "(-{armor_loss} Armor, -{hp_loss} HP)"
+    ),
+    "player_feinted_armor_break": (
+        "{actor}'s armor shatters under the trickery. (-{armor_loss} Armor)"
+    ),
+    # Feint vs Block (player feinting)
+    "enemy_fortify_vs_feint": (
+        "{actor} braces behind a fortified shield, shrugging off {target}'s trick."
+    ),
+    "player_feint_punishes": "{target} braces, but {actor}'s feint punishes its guard!",
+    "enemy_feinted_no_armor": (
+        "With no armor left, {actor} takes the feint full on. (-{hp_loss} HP)"
+    ),
+    "enemy_feinted_armor_holds": "{actor}'s armor buckles under the trick. (-{armor_loss} Armor)",
+    "enemy_feinted_armor_wound": (
+        "{actor}'s armor shatters and the feint leaves a real wound. "
+        "(-{armor_loss} Armor, -{hp_loss} HP)"
+    ),
+    "enemy_feinted_armor_break": (
+        "{actor}'s armor shatters under the sudden angle. (-{armor_loss} Armor)"
+    ),
+    # Feint vs Feint
+    "feint_stumble": "Both fighters feint at the same time, stumbling into each other awkwardly.",
+}
+
+
+def render_event(event):
+    """Turn one CombatEvent into the line of text the player reads."""
+    return EVENT_TEXT[event.kind].format(
+        actor=event.actor.name if event.actor is not None else "",
+        target=event.target.name if event.target is not None else "",
+        armor_loss=-event.armor,
+        hp_loss=-event.hp,
+        amount=event.amount,
+    )
+
+
+def render_events(events):
+    return [render_event(event) for event in events]
 
 
 class Combat:
+    def __init__(self, hard_mode=False, solve_in_background=True):
+        # Hard mode: enemies play the solved optimal strategy (Solver.py)
+        # instead of their preference weights. A solve takes seconds to
+        # minutes, so by default it runs on Solver's background thread
+        # and the regular AI fights until the solution is ready;
+        # solve_in_background=False waits for it at battle start instead.
+        self.hard_mode = hard_mode
+        self.solve_in_background = solve_in_background
+        self.solution = None
+        self._solution_future = None
+
+    def begin_battle(self, player, enemy):
+        """Per-battle setup. In hard mode, solve (or fetch) this matchup once."""
+        if not self.hard_mode:
+            return
+        from Solver import request_solution, solution_for  # Solver is built on top of Combat
+        if self.solve_in_background:
+            self.solution = None
+            self._solution_future = request_solution(player, enemy)
+        else:
+            self.solution = solution_for(player, enemy)
+
+    def _collect_solution(self):
+        """Switch to the solved strategy once the background solve is done."""
+        future = self._solution_future
+        if future.done():
+            self._solution_future = None
+            if not future.cancelled() and future.exception() is None:
+                self.solution = future.result()
+
     # ------------------------
     # BASIC DAMAGE HELPERS
     # ------------------------
@@ -31,18 +296,20 @@ class Combat:
         """
         Helper to describe vigor gains for two combatants.
 
-        Simplified to a single line so it doesn't feel like
+        Simplified to a single event so it doesn't feel like
         the same flavor text is repeated twice every time.
         """
-        return [f"Both {a.name} and {b.name} steel themselves. (+1 Vigor each)"]
+        return CombatEvent("vigor_both", a, b, 0, 0, 1, 0)
 
     # ------------------------------------------------------------------
     # MATCHUP HELPERS
-    # Each of these handles ONE (effective_action_player, effective_action_enemy) combo
+    # Each of these handles ONE (effective_action_player, effective_action_enemy) combo.
+    # They mutate the fighters and, when `events` is a list, append one
+    # CombatEvent per line of text. events=None skips recording entirely.
     # ------------------------------------------------------------------
 
     # --- Attack vs Attack (including heavy vs normal) ---
-    def _attack_vs_attack(self, p, e, base_p_dmg, base_e_dmg, p_heavy, e_heavy):
+    def _attack_vs_attack(self, p, e, base_p_dmg, base_e_dmg, p_heavy, e_heavy, events):
         """
         Special rule:
 
@@ -53,45 +320,29 @@ class Combat:
         - If both use Heavy Attack OR both use normal Attack:
           it's a parry: no damage, both gain +1 Vigor.
         """
-        messages = []
-
         # Player heavy vs enemy normal
         if p_heavy and not e_heavy:
-            messages.append(
-                f"{e.name} steps in with a standard strike, but "
-                f"{p.name}'s heavy swing blows straight through!"
-            )
-            self._apply_heavy_vs_normal_damage(
-                attacker=p,
-                defender=e,
-                base_dmg=base_p_dmg,
-                messages=messages,
-            )
-            return messages
+            if events is not None:
+                events.append(CombatEvent("player_heavy_through", p, e, 0, 0, 0, 0))
+            self._apply_heavy_vs_normal_damage(defender=e, base_dmg=base_p_dmg, events=events)
+            return
 
         # Enemy heavy vs player normal
         if e_heavy and not p_heavy:
-            messages.append(
-                f"{p.name} rushes in with a quick attack, but "
-                f"{e.name}'s heavy swing smashes straight through!"
-            )
-            self._apply_heavy_vs_normal_damage(
-                attacker=e,
-                defender=p,
-                base_dmg=base_e_dmg,
-                messages=messages,
-            )
-            return messages
+            if events is not None:
+                events.append(CombatEvent("enemy_heavy_through", e, p, 0, 0, 0, 0))
+            self._apply_heavy_vs_normal_damage(defender=p, base_dmg=base_e_dmg, events=events)
+            return
 
         # Normal vs normal OR heavy vs heavy: parry
-        messages.append("Steel clashes against steel as both sides lunge in!")
-        messages.append("No clean hit is landed, but tension rises.")
         p.vigor += 1
         e.vigor += 1
-        messages.extend(self._describe_vigor_gain(p, e))
-        return messages
+        if events is not None:
+            events.append(CombatEvent("parry_clash", None, None, 0, 0, 0, 0))
+            events.append(CombatEvent("parry_tension", None, None, 0, 0, 0, 0))
+            events.append(self._describe_vigor_gain(p, e))
 
-    def _apply_heavy_vs_normal_damage(self, attacker, defender, base_dmg, messages):
+    def _apply_heavy_vs_normal_damage(self, defender, base_dmg, events):
         """Shared helper: heavy vs normal attack, base damage to armor/HP."""
         prev_armor = defender.armor
         prev_health = defender.health
@@ -99,349 +350,296 @@ class Combat:
         # heavy vs attack: base damage only (no 2x), into armor/HP
         self.apply_armor_damage(defender, base_dmg)
 
-        armor_loss = prev_armor - defender.armor
-        hp_loss = prev_health - defender.health
+        if events is None:
+            return
+
+        armor_delta = defender.armor - prev_armor
+        hp_delta = defender.health - prev_health
 
         if prev_armor > 0 and defender.armor > 0:
-            messages.append(
-                f"{defender.name}'s armor staggers under the weight of the blow. "
-                f"(-{armor_loss} Armor)"
-            )
+            kind = "heavy_armor_stagger"
         elif prev_armor > 0 and defender.armor == 0:
-            if hp_loss > 0:
-                messages.append(
-                    f"{defender.name}'s armor shatters and the strike bites into flesh. "
-                    f"(-{armor_loss} Armor, -{hp_loss} HP)"
-                )
-            else:
-                messages.append(
-                    f"{defender.name}'s armor shatters, leaving them exposed. "
-                    f"(-{armor_loss} Armor)"
-                )
+            kind = "heavy_armor_shatter_wound" if hp_delta < 0 else "heavy_armor_shatter"
         else:
-            messages.append(
-                f"{defender.name} has no guard left and takes {hp_loss} HP damage directly!"
-            )
+            kind = "no_guard_hit"
+        events.append(CombatEvent(kind, defender, None, armor_delta, hp_delta, 0, -hp_delta))
 
     # --- Attack vs Block (player attacking, enemy blocking) ---
-    def _attack_vs_block(self, p, e, base_p_dmg, p_heavy, e_fortify):
-        messages = []
-
+    def _attack_vs_block(self, p, e, base_p_dmg, p_heavy, e_fortify, events):
         # Player Heavy Attack vs enemy Block
         if p_heavy:
             prev_armor = e.armor
-            messages.append(f"{p.name} channels their strength into a devastating swing!")
+            if events is not None:
+                events.append(CombatEvent("player_heavy_windup", p, e, 0, 0, 0, 0))
 
             # Fortified block: perfect guard, even against heavy
             if e_fortify:
-                messages.append(
-                    f"{e.name} braces behind a fortified guard, absorbing even the heavy strike!"
-                )
-                messages.append(f"{e.name}'s armor remains untouched. (0 Armor lost)")
                 e.vigor += 1
-                messages.append(f"{e.name} looks more focused. (+1 Vigor)")
-                return messages
+                if events is not None:
+                    events.append(CombatEvent("enemy_fortify_vs_heavy", e, p, 0, 0, 0, 0))
+                    events.append(CombatEvent("armor_untouched", e, None, 0, 0, 0, 0))
+                    events.append(CombatEvent("enemy_focus", e, None, 0, 0, 1, 0))
+                return
 
             # Normal heavy vs block
             if prev_armor > 0:
                 e.armor = 0  # guard always breaks
-                messages.append(
-                    f"{e.name}'s guard shatters under the impact! "
-                    f"(Armor reduced from {prev_armor} to 0)"
-                )
+                if events is not None:
+                    events.append(
+                        CombatEvent("guard_shatter", e, None, -prev_armor, 0, 0, prev_armor)
+                    )
                 overflow = base_p_dmg - prev_armor
                 if overflow > 0:
                     hp_dmg = overflow * 2
                     self.apply_hp_damage(e, hp_dmg)
-                    messages.append(
-                        f"The force carries through, dealing {hp_dmg} HP damage to {e.name}."
-                    )
+                    if events is not None:
+                        events.append(CombatEvent("force_through", e, None, 0, -hp_dmg, 0, hp_dmg))
             else:
                 # No armor left: just apply a big hit to HP
                 hp_dmg = base_p_dmg * 2
+                prev_health = e.health
                 self.apply_hp_damage(e, hp_dmg)
-                messages.append(
-                    f"{e.name} has no guard left and takes {hp_dmg} HP damage directly!"
-                )
+                if events is not None:
+                    events.append(
+                        CombatEvent("no_guard_hit", e, None, 0, e.health - prev_health, 0, hp_dmg)
+                    )
 
             # Blocker still gains +1 Vigor for reading the attack
             e.vigor += 1
-            messages.append(f"{e.name} looks more focused. (+1 Vigor)")
-            return messages
+            if events is not None:
+                events.append(CombatEvent("enemy_focus", e, None, 0, 0, 1, 0))
+            return
 
         # Normal Attack vs Block
         armor_hit = max(1, base_p_dmg // 2)
-        messages.append(f"{p.name} strikes, but {e.name} braces behind its guard!")
+        if events is not None:
+            events.append(CombatEvent("player_strike_into_guard", p, e, 0, 0, 0, 0))
 
         if e_fortify:
-            messages.append(
-                f"{e.name}'s fortified stance turns the blow aside. (0 Armor lost)"
-            )
             e.vigor += 1
-            messages.append(f"{e.name} looks more focused. (+1 Vigor)")
-            return messages
+            if events is not None:
+                events.append(CombatEvent("enemy_fortify_vs_attack", e, p, 0, 0, 0, 0))
+                events.append(CombatEvent("enemy_focus", e, None, 0, 0, 1, 0))
+            return
 
         prev_armor = e.armor
         prev_health = e.health
         self.apply_armor_damage(e, armor_hit)
         e.vigor += 1
 
-        armor_loss = prev_armor - e.armor
-        hp_loss = prev_health - e.health
+        if events is None:
+            return
+
+        armor_delta = e.armor - prev_armor
+        hp_delta = e.health - prev_health
 
         if prev_armor <= 0:
-            messages.append(
-                f"{e.name} has no armor left; the blow crashes into its body. "
-                f"(-{hp_loss} HP, +1 Vigor)"
-            )
+            kind = "enemy_block_no_armor"
         elif e.armor > 0:
-            messages.append(
-                f"{e.name}'s armor absorbs part of the blow but strains under pressure. "
-                f"(-{armor_loss} Armor, +1 Vigor)"
-            )
+            kind = "enemy_block_armor_holds"
+        elif hp_delta < 0:
+            kind = "enemy_block_armor_wound"
         else:
-            if hp_loss > 0:
-                messages.append(
-                    f"{e.name}'s armor shatters, and the strike bites into flesh. "
-                    f"(-{armor_loss} Armor, -{hp_loss} HP, +1 Vigor)"
-                )
-            else:
-                messages.append(
-                    f"{e.name}'s armor shatters, leaving it exposed. "
-                    f"(-{armor_loss} Armor, +1 Vigor)"
-                )
-
-        return messages
+            kind = "enemy_block_armor_break"
+        events.append(CombatEvent(kind, e, p, armor_delta, hp_delta, 1, 0))
 
     # --- Block vs Attack (enemy attacking, player blocking) ---
-    def _block_vs_attack(self, p, e, base_e_dmg, e_heavy, p_fortify):
-        messages = []
+    def _block_vs_attack(self, p, e, base_e_dmg, e_heavy, p_fortify, events):
         armor_hit = max(1, base_e_dmg // 2)
 
         # Enemy Heavy Attack vs player Block
         if e_heavy:
             prev_armor = p.armor
-            messages.append(f"{e.name} swings with a brutal, committed strike!")
+            if events is not None:
+                events.append(CombatEvent("enemy_heavy_windup", e, p, 0, 0, 0, 0))
 
             if p_fortify:
-                messages.append(
-                    f"{p.name}'s fortified guard absorbs even the heavy blow!"
-                )
-                messages.append(f"{p.name}'s armor remains untouched. (0 Armor lost)")
                 p.vigor += 1
-                messages.append(f"{p.name} steels their resolve. (+1 Vigor)")
-                return messages
+                if events is not None:
+                    events.append(CombatEvent("player_fortify_vs_heavy", p, e, 0, 0, 0, 0))
+                    events.append(CombatEvent("armor_untouched", p, None, 0, 0, 0, 0))
+                    events.append(CombatEvent("player_resolve", p, None, 0, 0, 1, 0))
+                return
 
             if prev_armor > 0:
                 p.armor = 0
-                messages.append(
-                    f"{p.name}'s guard shatters under the impact! "
-                    f"(Armor reduced from {prev_armor} to 0)"
-                )
+                if events is not None:
+                    events.append(
+                        CombatEvent("guard_shatter", p, None, -prev_armor, 0, 0, prev_armor)
+                    )
                 overflow = base_e_dmg - prev_armor
                 if overflow > 0:
                     hp_dmg = overflow * 2
                     self.apply_hp_damage(p, hp_dmg)
-                    messages.append(
-                        f"The force carries through, dealing {hp_dmg} HP damage to {p.name}."
-                    )
+                    if events is not None:
+                        events.append(CombatEvent("force_through", p, None, 0, -hp_dmg, 0, hp_dmg))
             else:
                 # No armor left: just HP
                 hp_dmg = base_e_dmg * 2
+                prev_health = p.health
                 self.apply_hp_damage(p, hp_dmg)
-                messages.append(
-                    f"{p.name} has no guard left and takes {hp_dmg} HP damage directly!"
-                )
+                if events is not None:
+                    events.append(
+                        CombatEvent("no_guard_hit", p, None, 0, p.health - prev_health, 0, hp_dmg)
+                    )
 
             p.vigor += 1
-            messages.append(f"{p.name} steels their resolve. (+1 Vigor)")
-            return messages
+            if events is not None:
+                events.append(CombatEvent("player_resolve", p, None, 0, 0, 1, 0))
+            return
 
         # Normal Attack vs Block
         if p_fortify:
-            messages.append(
-                f"{e.name} lunges, but {p.name}'s fortified stance deflects the blow!"
-            )
-            messages.append(f"{p.name}'s armor remains untouched. (0 Armor lost)")
             p.vigor += 1
-            messages.append(f"{p.name} steels their resolve. (+1 Vigor)")
-            return messages
+            if events is not None:
+                events.append(CombatEvent("player_fortify_vs_attack", p, e, 0, 0, 0, 0))
+                events.append(CombatEvent("armor_untouched", p, None, 0, 0, 0, 0))
+                events.append(CombatEvent("player_resolve", p, None, 0, 0, 1, 0))
+            return
 
-        messages.append(f"{e.name} lunges, but {p.name} raises their guard just in time!")
+        if events is not None:
+            events.append(CombatEvent("enemy_lunge_into_guard", e, p, 0, 0, 0, 0))
 
         prev_armor = p.armor
         prev_health = p.health
         self.apply_armor_damage(p, armor_hit)
         p.vigor += 1
 
-        armor_loss = prev_armor - p.armor
-        hp_loss = prev_health - p.health
+        if events is None:
+            return
+
+        armor_delta = p.armor - prev_armor
+        hp_delta = p.health - prev_health
 
         if prev_armor <= 0:
-            messages.append(
-                f"{p.name} has no armor left; the blow crashes into their body. "
-                f"(-{hp_loss} HP, +1 Vigor)"
-            )
+            kind = "player_block_no_armor"
         elif p.armor > 0:
-            messages.append(
-                f"{p.name}'s armor rattles but holds. (-{armor_loss} Armor, +1 Vigor)"
-            )
+            kind = "player_block_armor_holds"
+        elif hp_delta < 0:
+            kind = "player_block_armor_wound"
         else:
-            if hp_loss > 0:
-                messages.append(
-                    f"{p.name}'s armor shatters, and pain follows through. "
-                    f"(-{armor_loss} Armor, -{hp_loss} HP, +1 Vigor)"
-                )
-            else:
-                messages.append(
-                    f"{p.name}'s armor shatters under the blow. "
-                    f"(-{armor_loss} Armor, +1 Vigor)"
-                )
-
-        return messages
+            kind = "player_block_armor_break"
+        events.append(CombatEvent(kind, p, e, armor_delta, hp_delta, 1, 0))
 
     # --- Attack vs Feint / Feint vs Attack ---
-    def _attack_vs_feint(self, p, e, base_p_dmg, p_heavy):
-        messages = []
+    def _attack_vs_feint(self, p, e, base_p_dmg, p_heavy, events):
         crit_mult = 2
         if p_heavy:
             crit_mult *= 2  # Heavy makes crit even worse
         crit = base_p_dmg * crit_mult
-        messages.append(f"{e.name} tries something clever, but {p.name} reads it perfectly!")
+        prev_health = e.health
         self.apply_hp_damage(e, crit)
-        messages.append(f"Critical hit! {e.name} takes {crit} HP damage.")
-        return messages
+        if events is not None:
+            events.append(CombatEvent("player_reads_feint", p, e, 0, 0, 0, 0))
+            events.append(CombatEvent("critical_hit", e, p, 0, e.health - prev_health, 0, crit))
 
-    def _feint_vs_attack(self, p, e, base_e_dmg, e_heavy):
-        messages = []
+    def _feint_vs_attack(self, p, e, base_e_dmg, e_heavy, events):
         crit_mult = 2
         if e_heavy:
             crit_mult *= 2
         crit = base_e_dmg * crit_mult
-        messages.append(f"{p.name} overextends with a feint and gets caught clean!")
+        prev_health = p.health
         self.apply_hp_damage(p, crit)
-        messages.append(f"Critical hit! {p.name} takes {crit} HP damage.")
-        return messages
+        if events is not None:
+            events.append(CombatEvent("player_feint_caught", p, e, 0, 0, 0, 0))
+            events.append(CombatEvent("critical_hit", p, e, 0, p.health - prev_health, 0, crit))
 
     # --- Block vs Block ---
-    def _block_vs_block(self, p, e):
-        messages = []
-        messages.append("Both fighters circle, shields up, waiting for an opening.")
+    def _block_vs_block(self, p, e, events):
         p.vigor += 1
         e.vigor += 1
-        messages.extend(self._describe_vigor_gain(p, e))
-        return messages
+        if events is not None:
+            events.append(CombatEvent("both_circle", None, None, 0, 0, 0, 0))
+            events.append(self._describe_vigor_gain(p, e))
 
     # --- Block vs Feint / Feint vs Block ---
-    def _block_vs_feint(self, p, e, base_e_dmg, p_fortify):
-        messages = []
+    def _block_vs_feint(self, p, e, base_e_dmg, p_fortify, events):
         armor_hit = max(1, base_e_dmg)
 
         if p_fortify:
-            messages.append(
-                f"{p.name} turtles up, and {e.name}'s feint crashes harmlessly off a fortified guard!"
-            )
-            messages.append(f"{p.name}'s armor takes no damage. (0 Armor lost)")
-            return messages
+            if events is not None:
+                events.append(CombatEvent("player_fortify_vs_feint", p, e, 0, 0, 0, 0))
+                events.append(CombatEvent("armor_no_damage", p, None, 0, 0, 0, 0))
+            return
 
-        messages.append(f"{p.name} turtles up, but {e.name}'s feint slips past the guard!")
+        if events is not None:
+            events.append(CombatEvent("enemy_feint_slips_past", e, p, 0, 0, 0, 0))
 
         prev_armor = p.armor
         prev_health = p.health
         self.apply_armor_damage(p, armor_hit)
 
-        armor_loss = prev_armor - p.armor
-        hp_loss = prev_health - p.health
+        if events is None:
+            return
+
+        armor_delta = p.armor - prev_armor
+        hp_delta = p.health - prev_health
 
         # Handle no-armor / armor-break text correctly
         if prev_armor <= 0:
-            messages.append(
-                f"The blow crashes straight into {p.name}'s body. (-{hp_loss} HP)"
-            )
+            kind = "player_feinted_no_armor"
         elif p.armor > 0:
-            messages.append(
-                f"{p.name}'s armor takes the full force. (-{armor_loss} Armor)"
-            )
+            kind = "player_feinted_armor_holds"
+        elif hp_delta < 0:
+            kind = "player_feinted_armor_wound"
         else:
-            if hp_loss > 0:
-                messages.append(
-                    f"{p.name}'s armor shatters, and the impact bruises flesh beneath. "
-                    f"(-{armor_loss} Armor, -{hp_loss} HP)"
-                )
-            else:
-                messages.append(
-                    f"{p.name}'s armor shatters under the trickery. (-{armor_loss} Armor)"
-                )
-
-        return messages
+            kind = "player_feinted_armor_break"
+        events.append(CombatEvent(kind, p, e, armor_delta, hp_delta, 0, 0))
 
-    def _feint_vs_block(self, p, e, base_p_dmg, e_fortify):
-        messages = []
+    def _feint_vs_block(self, p, e, base_p_dmg, e_fortify, events):
         armor_hit = max(1, base_p_dmg)
 
         if e_fortify:
-            messages.append(
-                f"{e.name} braces behind a fortified shield, shrugging off {p.name}'s trick."
-            )
-            messages.append(f"{e.name}'s armor takes no damage. (0 Armor lost)")
-            return messages
+            if events is not None:
+                events.append(CombatEvent("enemy_fortify_vs_feint", e, p, 0, 0, 0, 0))
+                events.append(CombatEvent("armor_no_damage", e, None, 0, 0, 0, 0))
+            return
 
-        messages.append(f"{e.name} braces, but {p.name}'s feint punishes its guard!")
+        if events is not None:
+            events.append(CombatEvent("player_feint_punishes", p, e, 0, 0, 0, 0))
 
         prev_armor = e.armor
         prev_health = e.health
         self.apply_armor_damage(e, armor_hit)
 
-        armor_loss = prev_armor - e.armor
-        hp_loss = prev_health - e.health
+        if events is None:
+            return
+
+        armor_delta = e.armor - prev_armor
+        hp_delta = e.health - prev_health
 
         # Handle no-armor / armor-break text correctly
         if prev_armor <= 0:
-            messages.append(
-                f"With no armor left, {e.name} takes the feint full on. (-{hp_loss} HP)"
-            )
+            kind = "enemy_feinted_no_armor"
         elif e.armor > 0:
-            messages.append(
-                f"{e.name}'s armor buckles under the trick. (-{armor_loss} Armor)"
-            )
+            kind = "enemy_feinted_armor_holds"
+        elif hp_delta < 0:
+            kind = "enemy_feinted_armor_wound"
         else:
-            if hp_loss > 0:
-                messages.append(
-                    f"{e.name}'s armor shatters and the feint leaves a real wound. "
-                    f"(-{armor_loss} Armor, -{hp_loss} HP)"
-                )
-            else:
-                messages.append(
-                    f"{e.name}'s armor shatters under the sudden angle. (-{armor_loss} Armor)"
-                )
-
-        return messages
+            kind = "enemy_feinted_armor_break"
+        events.append(CombatEvent(kind, e, p, armor_delta, hp_delta, 0, 0))
 
     # --- Feint vs Feint ---
-    def _feint_vs_feint(self, p, e, base_p_dmg, base_e_dmg):
-        messages = []
+    def _feint_vs_feint(self, p, e, base_p_dmg, base_e_dmg, events):
         chip_p = max(1, base_e_dmg // 4)
         chip_e = max(1, base_p_dmg // 4)
-        messages.append(
-            "Both fighters feint at the same time, stumbling into each other awkwardly."
-        )
+        prev_p_health = p.health
+        prev_e_health = e.health
         self.apply_hp_damage(p, chip_p)
         self.apply_hp_damage(e, chip_e)
-        messages.append(f"{p.name} takes {chip_p} chip damage.")
-        messages.append(f"{e.name} takes {chip_e} chip damage.")
-        return messages
+        if events is not None:
+            events.append(CombatEvent("feint_stumble", None, None, 0, 0, 0, 0))
+            events.append(CombatEvent("chip_damage", p, e, 0, p.health - prev_p_health, 0, chip_p))
+            events.append(CombatEvent("chip_damage", e, p, 0, e.health - prev_e_health, 0, chip_e))
 
     # ------------------------
     # TURN RESOLUTION DISPATCHER
     # ------------------------
-    def resolve_turn(self, player, enemy, player_action, enemy_action):
+    def _resolve(self, p, e, player_action, enemy_action, events):
         """
-        Dispatcher: figures out which matchup helper to call
-        and returns a list of message strings for that turn.
+        Dispatcher: figures out which matchup helper to call.
+        Shared by every public entry point below.
         """
-        p = player
-        e = enemy
-
         # Flags for specials
         p_heavy = (player_action == "heavy_attack")
         p_fortify = (player_action == "fortify")
@@ -449,55 +647,53 @@ class Combat:
         e_fortify = (enemy_action == "fortify")
 
         # Map heavy/fortify to their base action for the RPS logic
-        def effective_action(action, is_heavy, is_fortify):
-            if is_heavy:
-                return "attack"
-            if is_fortify:
-                return "block"
-            return action
-
-        pa = effective_action(player_action, p_heavy, p_fortify)
-        ea = effective_action(enemy_action, e_heavy, e_fortify)
+        pa = "attack" if p_heavy else "block" if p_fortify else player_action
+        ea = "attack" if e_heavy else "block" if e_fortify else enemy_action
 
         # Base (non-multiplied) damage values
         base_p_dmg = p.damage
         base_e_dmg = e.damage
 
-        # Dispatch table for (player_action, enemy_action)
-        handlers = {
-            ("attack", "attack"): lambda: self._attack_vs_attack(
-                p, e, base_p_dmg, base_e_dmg, p_heavy, e_heavy
-            ),
-            ("attack", "block"): lambda: self._attack_vs_block(
-                p, e, base_p_dmg, p_heavy, e_fortify
-            ),
-            ("block", "attack"): lambda: self._block_vs_attack(
-                p, e, base_e_dmg, e_heavy, p_fortify
-            ),
-            ("attack", "feint"): lambda: self._attack_vs_feint(
-                p, e, base_p_dmg, p_heavy
-            ),
-            ("feint", "attack"): lambda: self._feint_vs_attack(
-                p, e, base_e_dmg, e_heavy
-            ),
-            ("block", "block"): lambda: self._block_vs_block(p, e),
-            ("block", "feint"): lambda: self._block_vs_feint(
-                p, e, base_e_dmg, p_fortify
-            ),
-            ("feint", "block"): lambda: self._feint_vs_block(
-                p, e, base_p_dmg, e_fortify
-            ),
-            ("feint", "feint"): lambda: self._feint_vs_feint(
-                p, e, base_p_dmg, base_e_dmg
-            ),
-        }
-
-        handler = handlers.get((pa, ea))
-        if handler is not None:
-            return handler()
+        # Dispatch on (player_action, enemy_action)
+        if pa == "attack":
+            if ea == "attack":
+                return self._attack_vs_attack(p, e, base_p_dmg, base_e_dmg, p_heavy, e_heavy, events)
+            if ea == "block":
+                return self._attack_vs_block(p, e, base_p_dmg, p_heavy, e_fortify, events)
+            if ea == "feint":
+                return self._attack_vs_feint(p, e, base_p_dmg, p_heavy, events)
+        elif pa == "block":
+            if ea == "attack":
+                return self._block_vs_attack(p, e, base_e_dmg, e_heavy, p_fortify, events)
+            if ea == "block":
+                return self._block_vs_block(p, e, events)
+            if ea == "feint":
+                return self._block_vs_feint(p, e, base_e_dmg, p_fortify, events)
+        elif pa == "feint":
+            if ea == "attack":
+                return self._feint_vs_attack(p, e, base_e_dmg, e_heavy, events)
+            if ea == "block":
+                return self._feint_vs_block(p, e, base_p_dmg, e_fortify, events)
+            if ea == "feint":
+                return self._feint_vs_feint(p, e, base_p_dmg, base_e_dmg, events)
 
         # Safety fallback (should never hit)
-        return ["Nothing happens... (unexpected combo)"]
+        if events is not None:
+            events.append(CombatEvent("unexpected", None, None, 0, 0, 0, 0))
+
+    def resolve_events(self, player, enemy, player_action, enemy_action):
+        """Resolve one turn and return its CombatEvent records (no text yet)."""
+        events = []
+        self._resolve(player, enemy, player_action, enemy_action, events)
+        return events
+
+    def apply_turn(self, player, enemy, player_action, enemy_action):
+        """Zero-render mode: resolve one turn without recording anything."""
+        self._resolve(player, enemy, player_action, enemy_action, None)
+
+    def resolve_turn(self, player, enemy, player_action, enemy_action):
+        """Resolve one turn and return the list of message strings for it."""
+        return render_events(self.resolve_events(player, enemy, player_action, enemy_action))
 
     # ------------------------
     # INPUT / AI
@@ -520,7 +716,7 @@ class Combat:
             delay=0.02,
         )
 
-        choice = input("> ").strip().lower()
+        choice = read_line("> ").strip().lower()
         if choice in ("1", "heavy", "heavy attack"):
             player.vigor = max(0, player.vigor - 2)
             return "heavy_attack"
@@ -548,7 +744,7 @@ class Combat:
             delay=0.02,
         )
 
-        choice = input("> ").strip().lower()
+        choice = read_line("> ").strip().lower()
         if choice in ("1", "a", "attack"):
             return "attack"
         if choice in ("2", "b", "block"):
@@ -568,63 +764,67 @@ class Combat:
 
         return self._get_player_action_basic(player)
 
-    def _get_enemy_action(self, enemy):
+    def _get_enemy_action(self, enemy, player=None):
         """
         Simple enemy AI with per-enemy preferences.
 
         Each enemy may have `enemy.preferred_action` set to "attack", "block",
         or "feint". That action is more likely, but everything stays random.
+        In hard mode (and given the player) the move is drawn from the
+        solved optimal strategy for the current state instead, as soon as
+        that strategy has been solved.
         """
-        preferred = getattr(enemy, "preferred_action", None)
-
-        # Base weights for normal actions
-        if preferred == "attack":
-            base_weights = {"attack": 0.5, "block": 0.25, "feint": 0.25}
-        elif preferred == "block":
-            base_weights = {"attack": 0.25, "block": 0.5, "feint": 0.25}
-        elif preferred == "feint":
-            base_weights = {"attack": 0.25, "block": 0.25, "feint": 0.5}
-        else:
-            base_weights = {"attack": 1 / 3, "block": 1 / 3, "feint": 1 / 3}
-
-        # If it has 2+ Vigor, it can use specials. Preference nudges those too.
-        if enemy.vigor >= 2:
-            if preferred == "attack":
-                choices = ["heavy_attack", "fortify", "feint"]
-                probs = [0.5, 0.25, 0.25]
-            elif preferred == "block":
-                choices = ["fortify", "heavy_attack", "feint"]
-                probs = [0.5, 0.25, 0.25]
-            elif preferred == "feint":
-                choices = ["feint", "heavy_attack", "fortify"]
-                probs = [0.5, 0.25, 0.25]
-            else:
-                choices = ["heavy_attack", "fortify", "feint"]
-                probs = [0.4, 0.3, 0.3]
-
-            action = random.choices(choices, weights=probs, k=1)[0]
+        if self._solution_future is not None:
+            self._collect_solution()
+        if self.solution is not None and player is not None:
+            action = self.solution.enemy_action(player, enemy)
             if action in ("heavy_attack", "fortify"):
                 enemy.vigor = max(0, enemy.vigor - 2)
             return action
 
-        # Not enough Vigor: choose a basic action according to base_weights
-        actions = list(base_weights.keys())
-        weights = list(base_weights.values())
-        return random.choices(actions, weights=weights, k=1)[0]
+        # Weights per preference live in ENEMY_BASIC_WEIGHTS / ENEMY_VIGOR_WEIGHTS,
+        # compiled once into ENEMY_SAMPLERS
+        action = enemy_sampler(enemy).draw(Rng.stream(Rng.ENEMY_AI))
+        if action == "heavy_attack" or action == "fortify":
+            enemy.vigor = max(0, enemy.vigor - 2)
+        return action
+
+    def _death_ending(self, double_ko):
+        """Death (or double KO) text and the "another criminal?" prompt."""
+        if double_ko:
+            slow_print("Both you and your foe collapse to the ground...", delay=0.03)
+            slow_print(
+                "The crowd erupts, delighted by the double fall—blood is blood, and they got their share.",
+                delay=0.03,
+            )
+        else:
+            slow_print("Your vision fades. The dungeon claims another soul.", delay=0.03)
+            slow_print(
+                "The stands shake with joy as coins and curses rain down in your honorless name.",
+                delay=0.03,
+            )
+        write_line()
+        answer = read_line('???: "Do you wish to see the story of another criminal?" (y/n) ').strip().lower()
+        if answer in ("n", "no", "q", "quit", "exit"):
+            return "quit"
+        return "double_ko" if double_ko else "player_dead"
 
     # ------------------------
     # MAIN BATTLE LOOP
     # ------------------------
     def run_battle(self, player, enemy):
         """Main battle loop: handles turns until either side drops to 0 HP."""
+        self.begin_battle(player, enemy)
         slow_print("\nYou step into the corridor...", delay=0.03)
-        time.sleep(0.5)
+        sleep(0.5)
         slow_print(f"You encountered a {enemy.name}!", delay=0.03)
         slow_print(f"{enemy.name} — HP: {enemy.health} | Armor: {enemy.armor}", delay=0.03)
 
         while player.health > 0 and enemy.health > 0:
+            turn_started = perf_counter()
+
             # Turn status
-            print()
+            write_line()
             slow_print(
                 "=== STATUS ===\n"
                 f"{player.name} — HP: {player.health} | Armor: {player.armor} | Vigor: {player.vigor}\n"
@@ -632,12 +832,14 @@ class Combat:
                 delay=0.01,
             )
 
+            # Enemy choice first: both sides pick from the same pre-turn
+            # state, before the player pays Vigor for a special
+            with timed("enemy_ai"):
+                enemy_action = self._get_enemy_action(enemy, player)
+
             # Player choice
             player_action = self._get_player_action(player)
 
-            # Enemy choice
-            enemy_action = self._get_enemy_action(enemy)
-
             # Separate action text for player vs enemy to avoid grammar issues
             player_action_text = {
                 "attack": "attack",
@@ -655,59 +857,41 @@ class Combat:
                 "fortify": "braces behind a fortified guard",
             }
 
-            print()
+            write_line()
             slow_print(
                 f"You {player_action_text[player_action]} and the {enemy.name} "
                 f"{enemy_action_text[enemy_action]}...",
                 delay=0.03,
             )
-            time.sleep(0.3)
+            sleep(0.3)
 
             # Resolve the turn
-            outcome_lines = self.resolve_turn(player, enemy, player_action, enemy_action)
-            for line in outcome_lines:
-                slow_print(line, delay=0.02)
-                time.sleep(0.05)
+            with timed("resolution"):
+                events = self.resolve_events(player, enemy, player_action, enemy_action)
+            for event in events:
+                slow_print(render_event(event), delay=0.02)
+                sleep(0.05)
 
             # Short pause before next round
-            time.sleep(0.3)
+            sleep(0.3)
+            record("turn", perf_counter() - turn_started)
 
             # Check for defeat
             if player.health <= 0 or enemy.health <= 0:
                 break
 
         # End of battle
-        print()
-        if player.health <= 0 and enemy.health <= 0:
-            slow_print("Both you and your foe collapse to the ground...", delay=0.03)
-            slow_print(
-                "The crowd erupts, delighted by the double fall—blood is blood, and they got their share.",
-                delay=0.03,
-            )
-            print()
-            answer = input('???: "Do you wish to see the story of another criminal?" (y/n) ').strip().lower()
-            if answer in ("n", "no", "q", "quit", "exit"):
-                return "quit"
-            return "double_ko"
-
+        write_line()
         if player.health <= 0:
-            slow_print("Your vision fades. The dungeon claims another soul.", delay=0.03)
-            slow_print(
-                "The stands shake with joy as coins and curses rain down in your honorless name.",
-                delay=0.03,
-            )
-            print()
-            answer = input('???: "Do you wish to see the story of another criminal?" (y/n) ').strip().lower()
-            if answer in ("n", "no", "q", "quit", "exit"):
-                return "quit"
-            return "player_dead"
+            with phase("ending"):
+                return self._death_ending(enemy.health <= 0)
 
         slow_print(f"The {enemy.name} falls. You stand victorious.", delay=0.03)
         # handle gold loot if enemy has gold range
         gold_min = getattr(enemy, "gold_min", 0)
         gold_max = getattr(enemy, "gold_max", 0)
         if gold_max > gold_min:
-            gold_loot = random.randint(gold_min, gold_max)
+            gold_loot = Rng.stream(Rng.LOOT).randint(gold_min, gold_max)
         else:
             gold_loot = gold_min
         player.money += gold_loot
@@ -0,0 +1,201 @@
+# CombatTable.py
+
+from array import array
+from collections import deque
+from functools import lru_cache
+
+from Characters import Character
+from Combat import ACTIONS, ACTION_CODES, Combat
+
+# 5 player actions x 5 enemy actions; pair code = player_code * 5 + enemy_code
+PAIR_COUNT = len(ACTIONS) * len(ACTIONS)
+
+# Vigor keeps growing while fighters parry, so the state space is only
+# bounded if we stop counting somewhere. Nothing in the rules reads more
+# than "2+ Vigor", so a generous cap keeps the tables exact in practice.
+VIGOR_CAP = 10
+
+# How many compiled matchups to keep around (one per stat signature)
+TABLE_CACHE_SIZE = 64
+
+
+class TransitionTable:
+    """
+    Every reachable combat state for one player/enemy stat signature.
+
+    Vigor never changes how much armor/HP a hit removes, so the table is
+    split in two parts that are compiled separately:
+
+        - combat states (p_health, p_armor, e_health, e_armor), found by
+          running the real resolve_turn from the starting stats
+        - vigor states (p_vigor, e_vigor), every pair up to vigor_cap
+
+    A full state index is combat_index * vigor_span + vigor_index, and
+    one simulated turn is two array lookups (see step_index). Health is
+    clamped at 0 once a side drops, since the fight is over then.
+    """
+
+    def __init__(self, combat_states, next_combat, next_vigor, p_damage, e_damage, vigor_cap, start, signature=None):
+        self.combat_states = combat_states
+        self.next_combat = next_combat
+        self.next_vigor = next_vigor
+        self.p_damage = p_damage
+        self.e_damage = e_damage
+        self.vigor_cap = vigor_cap
+        self.vigor_span = (vigor_cap + 1) * (vigor_cap + 1)
+        self.start = start
+        # compile_table arguments that rebuild this table
+        self.signature = signature
+        # 1 for combat states where at least one side is down
+        self.terminal = bytearray(
+            1 if s[0] <= 0 or s[2] <= 0 else 0 for s in combat_states
+        )
+
+    def __len__(self):
+        return len(self.combat_states) * self.vigor_span
+
+    def step_index(self, index, pair):
+        """Next full state index for a pair code (player_code * 5 + enemy_code)."""
+        combat_index, vigor_index = divmod(index, self.vigor_span)
+        return (
+            self.next_combat[combat_index * PAIR_COUNT + pair] * self.vigor_span
+            + self.next_vigor[vigor_index * PAIR_COUNT + pair]
+        )
+
+    def step(self, index, player_action, enemy_action):
+        """Next state index for two action strings (convenience wrapper)."""
+        pair = ACTION_CODES[player_action] * 5 + ACTION_CODES[enemy_action]
+        return self.step_index(index, pair)
+
+    def is_terminal(self, index):
+        return self.terminal[index // self.vigor_span]
+
+    def state(self, index):
+        """Decode an index into (p_health, p_armor, p_vigor, e_health, e_armor, e_vigor)."""
+        combat_index, vigor_index = divmod(index, self.vigor_span)
+        p_health, p_armor, e_health, e_armor = self.combat_states[combat_index]
+        p_vigor, e_vigor = divmod(vigor_index, self.vigor_cap + 1)
+        return (p_health, p_armor, p_vigor, e_health, e_armor, e_vigor)
+
+    def outcome(self, index):
+        """Battle result for a state, using Combat.run_battle's names."""
+        p_health, _, e_health, _ = self.combat_states[index // self.vigor_span]
+        if p_health <= 0 and e_health <= 0:
+            return "double_ko"
+        if p_health <= 0:
+            return "player_dead"
+        if e_health <= 0:
+            return "enemy_dead"
+        return "ongoing"
+
+
+def _run_pair(combat, p, e, player_action, enemy_action):
+    """One real resolve_turn on scratch characters (Vigor starts at 0)."""
+    p.vigor = 0
+    e.vigor = 0
+    combat.apply_turn(p, e, player_action, enemy_action)
+    return p.vigor, e.vigor
+
+
+def _compile_vigor(combat, vigor_cap):
+    """
+    Next-vigor lookups for all 25 pairs. Specials are paid for when
+    chosen (max(0, vigor - 2), like the menus / enemy AI), then the
+    matchup's Vigor gain is added.
+    """
+    # Gains depend only on the matchup, so measure them once on sturdy dummies
+    gains = []
+    for player_action in ACTIONS:
+        for enemy_action in ACTIONS:
+            p = Character("Player", 1000, 0, 1000, 1)
+            e = Character("Enemy", 1000, 0, 1000, 1)
+            gains.append(_run_pair(combat, p, e, player_action, enemy_action))
+
+    side = vigor_cap + 1
+    next_vigor = array("l")
+    for p_vigor in range(side):
+        for e_vigor in range(side):
+            pair = 0
+            for player_action in ACTIONS:
+                pv = max(0, p_vigor - 2) if player_action in ("heavy_attack", "fortify") else p_vigor
+                for enemy_action in ACTIONS:
+                    ev = max(0, e_vigor - 2) if enemy_action in ("heavy_attack", "fortify") else e_vigor
+                    p_gain, e_gain = gains[pair]
+                    next_vigor.append(
+                        min(vigor_cap, pv + p_gain) * side + min(vigor_cap, ev + e_gain)
+                    )
+                    pair += 1
+    return next_vigor
+
+
+@lru_cache(maxsize=TABLE_CACHE_SIZE)
+def compile_table(
+    p_health, p_armor, p_vigor, p_damage,
+    e_health, e_armor, e_vigor, e_damage,
+    vigor_cap=VIGOR_CAP,
+):
+    """
+    Enumerate every state reachable from the starting stats and
+    precompute next-state lookups for all 25 action pairs.
+
+    Memoized per stat signature; the LRU cap keeps memory bounded when
+    sweeping many enemy scalings (see compile_table.cache_info()).
+    """
+    combat = Combat()
+    p = Character("Player", p_health, 0, p_armor, p_damage)
+    e = Character("Enemy", e_health, 0, e_armor, e_damage)
+
+    start = (p_health, p_armor, e_health, e_armor)
+    combat_states = [start]
+    index = {start: 0}
+    next_combat = array("l")
+    queue = deque([0])
+
+    while queue:
+        current = queue.popleft()
+        state = combat_states[current]
+        row = [current] * PAIR_COUNT  # terminal states loop onto themselves
+
+        if state[0] > 0 and state[2] > 0:
+            pair = 0
+            for player_action in ACTIONS:
+                for enemy_action in ACTIONS:
+                    p.health, p.armor, e.health, e.armor = state
+                    _run_pair(combat, p, e, player_action, enemy_action)
+                    nxt = (max(0, p.health), p.armor, max(0, e.health), e.armor)
+                    target = index.get(nxt)
+                    if target is None:
+                        target = index[nxt] = len(combat_states)
+                        combat_states.append(nxt)
+                        queue.append(target)
+                    row[pair] = target
+                    pair += 1
+
+        # BFS assigns indices in order, so rows land in index order too
+        next_combat.extend(row)
+
+    side = vigor_cap + 1
+    start_vigor = min(vigor_cap, p_vigor) * side + min(vigor_cap, e_vigor)
+    return TransitionTable(
+        combat_states,
+        next_combat,
+        _compile_vigor(combat, vigor_cap),
+        p_damage,
+        e_damage,
+        vigor_cap,
+        start=start_vigor,  # combat index 0 is the starting state
+        signature=(
+            p_health, p_armor, p_vigor, p_damage,
+            e_health, e_armor, e_vigor, e_damage,
+            vigor_cap,
+        ),
+    )
+
+
+def table_for(player, enemy, vigor_cap=VIGOR_CAP):
+    """Compiled table for the current stats of two Character objects."""
+    return compile_table(
+        player.health, player.armor, player.vigor, player.damage,
+        enemy.health, enemy.armor, enemy.vigor, enemy.damage,
+        vigor_cap,
+    )
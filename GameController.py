@@ -1,15 +1,14 @@
-import os
-import random
-import time
-
-from UI import slow_print, slow_input, print_block
-from Characters import Character, enemy_templates
+import Rng
+from UI import clear_screen, print_block, read_line, sleep, slow_input, slow_print, write_line
+from Characters import Character, EnemyPool, create_enemy
 from Combat import Combat
-from Shopkeeper import Shopkeeper, greedy, polite
+from Backends import warm_up_in_background
+from Instrumentation import Instrumentation, metrics_path_from_env, phase, use_instrumentation
+from Telemetry import NegotiationTelemetry, telemetry_path_from_env, use_telemetry
 
 
 class GameController:
-    def __init__(self):
+    def __init__(self, hard_mode=False, metrics_path=None, telemetry_path=None):
         # Number of enemies defeated in this run
         self.round_counter = 0
         # After your first death, intros run in "fast" mode
@@ -18,14 +17,28 @@ class GameController:
         self.debt = 0
 
         # Core systems
-        self.combat = Combat()
+        # Hard mode: enemies play the solved optimal strategy (Solver.py)
+        self.combat = Combat(hard_mode=hard_mode)
+        # Enemies are recycled between rounds instead of reallocated
+        self.enemy_pool = EnemyPool()
         # We no longer fix a single shopkeeper for the whole run;
         # merchants are randomized per shop visit.
 
+        # Opt-in phase timings (Instrumentation.py), appended to this file
+        # when the session ends; defaults to $GAME_METRICS
+        self.metrics_path = metrics_path or metrics_path_from_env()
+        # Opt-in per-call shopkeeper telemetry (Telemetry.py), appended as
+        # JSON lines when the session ends; defaults to $NEGOTIATION_TELEMETRY
+        self.telemetry_path = telemetry_path or telemetry_path_from_env()
+
     # ----------------------------------------------------------------------
     # INTRO
     # ----------------------------------------------------------------------
     def show_intro(self) -> str:
+        with phase("intro"):
+            return self._show_intro()
+
+    def _show_intro(self) -> str:
         """
         Show the intro.
 
@@ -38,75 +51,75 @@ class GameController:
             return 0.01 if self.is_retry else original_delay
 
         # New debt each time the intro runs and store it on the controller
-        self.debt = random.randint(250, 350)  # Debt is a random number from 250 to 350
+        self.debt = Rng.stream(Rng.DEBT).randint(250, 350)  # Debt is a random number from 250 to 350
 
         # Clear screen (works on Windows, Mac, Linux)
-        os.system("cls" if os.name == "nt" else "clear")
+        clear_screen()
 
         slow_print("[The arena is dark. Footsteps echo.]", delay=d(0.02))
-        time.sleep(0.5)
+        sleep(0.5)
 
-        print()
+        write_line()
         print_block('???: "Wake up. You’re on in five."', delay=d(0.04))
-        time.sleep(0.5)
+        sleep(0.5)
 
-        print()
+        write_line()
         print_block(
             '???: "You remember why you’re here, right? '
             f'Not for glory. Not for honor. For debt. {self.debt} gold, to be exact..."',
             delay=d(0.04),
         )
-        time.sleep(0.7)
+        sleep(0.7)
 
-        print()
+        write_line()
         slow_print("[A door creaks open. Light spills in.]", delay=d(0.04))
-        time.sleep(0.5)
+        sleep(0.5)
 
-        print()
+        write_line()
         print_block(
             '???: "Out there, nobody cares how you swing a sword. '
             'They care if you choose right. '
             'Attack, Block, Feint—three little moves between you and the grave."',
             delay=d(0.04),
         )
-        time.sleep(0.9)
+        sleep(0.9)
 
-        print()
+        write_line()
         print_block(
             '???: "Read them, break them, survive them. '
             'Every duel you win buys you one more day. Every mistake… well."',
             delay=d(0.04),
         )
-        time.sleep(0.9)
+        sleep(0.9)
 
-        print()
+        write_line()
         slow_print("[The crowd roars in the distance.]", delay=d(0.02))
-        time.sleep(0.7)
+        sleep(0.7)
 
-        print()
+        write_line()
         slow_print('???: "Enough talk. Step into the circle."', delay=d(0.04))
-        time.sleep(0.9)
+        sleep(0.9)
 
-        print()
+        write_line()
         slow_print("VIGOR RISES WHEN BLADES MEET.", delay=d(0.03))
         slow_print("ARMOR CRACKS WHEN GUARDS FAIL.", delay=d(0.03))
         slow_print("ONLY YOUR CHOICES DECIDE THE REST.", delay=d(0.03))
-        time.sleep(0.7)
+        sleep(0.7)
 
-        print()
+        write_line()
         player_name = slow_input(
             '???: "Whether you live or die, who do you wish to be known as?"',
             delay=d(0.04),
         ).strip()
         if not player_name:
             player_name = "Unknown Challenger"
-        time.sleep(0.7)
+        sleep(0.7)
 
-        print()
+        write_line()
         slow_print(f'???: "Give them hell, {player_name}!"', delay=d(0.06))
 
-        print()
-        input("Press Enter to enter the arena... ")
+        write_line()
+        read_line("Press Enter to enter the arena... ")
 
         return player_name
 
@@ -117,76 +130,36 @@ class GameController:
         """
         Create a new enemy based on a weighted random template, scaled by round.
 
-        Spawn weights (from enemy_templates['spawn_weight']):
+        Spawn weights (spawn_weight in enemies.json):
             - Goblin Cutthroat: 45%
             - Skeleton Knight : 35%
             - Bandit Raider   : 20%
 
         self.round_counter = number of enemies defeated so far in this run.
 
-        Fight index (for the next enemy) is:
-            fight_index = self.round_counter + 1
-
-        Scaling:
-            - Round 1: pure template stats (no scaling)
-            - From round 2 onward:
-                * +3 HP per round
-                * +2 Armor per round
-                * +1 base Damage per round
-                * Gold: grows very slowly (barely increasing)
-            - Starting Vigor:
-                * Rounds 1–3: 0 Vigor
-                * Rounds 4–7: 1 Vigor
-                * Rounds 8+: 2 Vigor
+        The round scaling itself lives in Characters.create_enemy so the
+        headless Simulator spawns exactly the same enemies.
         """
-        # Pull weights from the templates so data & logic stay together
-        weights = [tpl.get("spawn_weight", 1) for tpl in enemy_templates]
-        template = random.choices(enemy_templates, weights=weights, k=1)[0]
-
-        fight_index = self.round_counter + 1  # 1,2,3,...
-        scale = max(0, fight_index - 1)       # 0,1,2,...
-
-        # --- STAT SCALING ---
-        scaled_health = template["health"] + scale * 3
-        scaled_armor = template["armor"] + scale * 2   # more armor per round
-        scaled_damage = template["damage"] + scale     # damage ramps each round
-
-        enemy = Character(
-            name=template["name"],
-            health=scaled_health,
-            money=0,
-            armor=scaled_armor,
-            damage=scaled_damage,
-        )
-
-        # --- GOLD SCALING (BARELY INCREASING) ---
-        base_min = template["gold_min"]
-        base_max = template["gold_max"]
+        return create_enemy(self.round_counter, pool=self.enemy_pool)
 
-        # Very gentle gold growth
-        bonus_min = scale // 2
-        bonus_max = scale
-
-        enemy.gold_min = base_min + bonus_min
-        enemy.gold_max = base_max + bonus_max
-
-        # Preferred action for AI
-        enemy.preferred_action = template.get("preferred_action")
-
-        # --- STARTING VIGOR BASED ON ROUND ---
-        if fight_index >= 8:
-            enemy.vigor = 2
-        elif fight_index >= 4:
-            enemy.vigor = 1
-        else:
-            enemy.vigor = 0  # already default, but explicit for clarity
-
-        return enemy
+    def _presolve_next_fight(self, player: Character):
+        """
+        Hard mode: start solving every matchup the next fight could be.
+        Solves take seconds to minutes and run on a background thread;
+        until a fight's solution is ready its enemy uses the regular AI.
+        """
+        if self.combat.hard_mode:
+            from Solver import presolve  # only hard mode needs the solver
+            presolve(player, self.round_counter + 1)
 
     # ----------------------------------------------------------------------
     # DEBT-CLEARED ENDING
     # ----------------------------------------------------------------------
     def _run_debt_cleared_ending(self, player: Character) -> str:
+        with phase("ending"):
+            return self._debt_cleared_ending(player)
+
+    def _debt_cleared_ending(self, player: Character) -> str:
         """
         Narrative + ending when the player has enough gold to pay their debt.
         Consumes the debt in gold, plays a cinematic text sequence,
@@ -206,7 +179,7 @@ class GameController:
             "smothered by the stone of the tunnel.",
             delay=0.03,
         )
-        time.sleep(0.5)
+        sleep(0.5)
 
         slow_print(
             "For the first time, the noise behind you isn’t what you’re listening to.",
@@ -216,7 +189,7 @@ class GameController:
             "It’s the sound in front of you — the dry scrape of a ledger being opened.",
             delay=0.03,
         )
-        time.sleep(0.6)
+        sleep(0.6)
 
         slow_print(
             "A clerk in ink-stained robes waits at a small iron table, "
@@ -228,7 +201,7 @@ class GameController:
             f"the {debt} you owe.",
             delay=0.03,
         )
-        time.sleep(0.6)
+        sleep(0.6)
 
         slow_print(
             '"By the terms of your sentence," the clerk drones, '
@@ -239,14 +212,14 @@ class GameController:
             "The words hang in the air like a blade about to fall.",
             delay=0.03,
         )
-        time.sleep(0.7)
+        sleep(0.7)
 
         slow_print(
             "The guards shift uneasily. This corridor is meant to funnel fighters "
             "back to the blood and sand, not spit them out into the world.",
             delay=0.03,
         )
-        time.sleep(0.6)
+        sleep(0.6)
 
         slow_print(
             "One coin. Then another. You lay them out slowly, each clink echoing "
@@ -265,7 +238,7 @@ class GameController:
             'The ledger slams shut with a sound like a coffin lid. "Debt satisfied."',
             delay=0.03,
         )
-        time.sleep(0.7)
+        sleep(0.7)
 
         slow_print(
             "At the far end of the hall, the arena master appears — "
@@ -276,13 +249,13 @@ class GameController:
             "They study you, as if sheer will might turn coin back into chains.",
             delay=0.03,
         )
-        time.sleep(0.6)
+        sleep(0.6)
 
         slow_print(
             'But law is law, even here. Finally, the master spits the word like poison: "Release them."',
             delay=0.03,
         )
-        time.sleep(0.6)
+        sleep(0.6)
 
         slow_print(
             "A gate that has only ever opened to swallow you now grinds upward, "
@@ -294,7 +267,7 @@ class GameController:
             "only to find the sand empty, the circle waiting for a fighter who will never return.",
             delay=0.03,
         )
-        time.sleep(0.8)
+        sleep(0.8)
 
         if leftover > 0:
             slow_print(
@@ -308,15 +281,15 @@ class GameController:
                 "finally belongs only to you.",
                 delay=0.03,
             )
-        time.sleep(0.7)
+        sleep(0.7)
 
-        print()
+        write_line()
         slow_print("YOU HAVE PAID YOUR DEBT.", delay=0.05)
         slow_print("THE ARENA REMEMBERS YOUR NAME.", delay=0.05)
-        print()
+        write_line()
 
         # Same style as death prompt:
-        answer = input(
+        answer = read_line(
             '???: "Do you wish to see the story of another criminal?" (y/n) '
         ).strip().lower()
 
@@ -328,6 +301,10 @@ class GameController:
     # SHOP PHASE
     # ----------------------------------------------------------------------
     def run_shop_phase(self, player: Character):
+        with phase("shop"):
+            self._shop_phase(player)
+
+    def _shop_phase(self, player: Character):
         """
         Runs the shop phase after a victory.
 
@@ -341,31 +318,32 @@ class GameController:
         - Let the player choose whether to haggle or leave
         - Then give a single, clean exit line and move on.
         """
-        print()
+        write_line()
         slow_print(
             "Between matches, you find your way to a cramped little shop "
             "wedged into the arena tunnels...",
             delay=0.03,
         )
 
+        # Imported on the first visit: nothing shop-related should slow
+        # down startup (the backend itself warms up during the intro)
+        from Shopkeeper import Shopkeeper, greedy, polite
+
         # Randomize merchant *per round*
-        personality = random.choice([greedy, polite])
-        shopkeeper = Shopkeeper(personality["name"], personality)
+        personality = Rng.stream(Rng.SHOP).choice([greedy, polite])
+        shopkeeper = Shopkeeper(personality["name"], personality, stream=True)
 
         while True:
             slow_print("\nYou are in the shop. What do you do?", delay=0.02)
             slow_print("1. Haggle for an item", delay=0.02)
             slow_print("2. Leave shop", delay=0.02)
-            choice = input("> ").strip()
-            print()  # blank line after the player's choice
+            choice = read_line("> ").strip()
+            write_line()  # blank line after the player's choice
 
             if choice == "2":
                 break
             if choice == "1":
-                # Reset shopkeeper state at the start of each haggle
-                shopkeeper.is_accepted = False
-                shopkeeper.last_counter_offer = None
-
+                # Each sell() starts a fresh negotiation session.
                 # The shopkeeper handles all flavor + timeouts.
                 # Pass the current round so items scale with progression.
                 shopkeeper.sell(player, self.round_counter)
@@ -383,6 +361,19 @@ class GameController:
     # MAIN LOOP
     # ----------------------------------------------------------------------
     def run(self):
+        """Play the game; export whatever metrics were asked for when it ends."""
+        instrumentation = Instrumentation() if self.metrics_path else None
+        telemetry = NegotiationTelemetry() if self.telemetry_path else None
+        try:
+            with use_instrumentation(instrumentation), use_telemetry(telemetry):
+                return self._run_rounds()
+        finally:
+            if instrumentation is not None:
+                instrumentation.export(self.metrics_path)
+            if telemetry is not None:
+                telemetry.export_jsonl(self.telemetry_path)
+
+    def _run_rounds(self):
         """
         Overall game loop.
 
@@ -397,18 +388,23 @@ class GameController:
               and asks if you want another criminal.
             * If Combat.run_battle returns "quit", we stop everything here.
         """
+        # Connect to the shopkeeper model while the intro plays
+        warm_up_in_background()
+
         while True:  # Outer loop: full runs
             self.round_counter = 0
 
-            # --- New Run: Intro + Player creation ---
-            player_name = self.show_intro()
+            # --- New Run: Player creation + Intro ---
             player = Character(
-                name=player_name,
+                name="",
                 health=15,
                 money=0,
                 armor=5,
                 damage=5,
             )
+            # Hard mode: the first fight's matchups solve while the intro plays
+            self._presolve_next_fight(player)
+            player.name = self.show_intro()
 
             # --- Inner loop: Rounds within this run ---
             while True:
@@ -416,7 +412,9 @@ class GameController:
                 slow_print(f"\n[ROUND: {current_round} BEGINS!]", delay=0.03)
 
                 enemy = self._create_enemy()
-                result = self.combat.run_battle(player, enemy)
+                with phase("battle"):
+                    result = self.combat.run_battle(player, enemy)
+                self.enemy_pool.release(enemy)
 
                 if result == "enemy_dead":
                     # Completed a round
@@ -437,8 +435,13 @@ class GameController:
                         self.is_retry = True
                         break  # break inner loop, outer while restarts
 
-                    # Shop between rounds
+                    # Shop between rounds (the next fight solves meanwhile,
+                    # and again for the new stats if something was bought)
+                    self._presolve_next_fight(player)
+                    stats = (player.armor, player.damage)
                     self.run_shop_phase(player)
+                    if (player.armor, player.damage) != stats:
+                        self._presolve_next_fight(player)
 
                     # After shopping, it’s *possible* they still have enough to pay
                     # (if they didn’t buy anything or negotiated well).
@@ -0,0 +1,204 @@
+# Instrumentation.py
+
+import contextvars
+import json
+import math
+import os
+import threading
+import time
+from contextlib import contextmanager, nullcontext
+
+# Set to a file path to record phase timings for every game session
+# (one JSON line per session is appended when the session ends)
+METRICS_ENV_VAR = "GAME_METRICS"
+
+# Histogram buckets: 4 per doubling, starting at 1 microsecond. Bucket
+# 120 tops out around 20 minutes; anything longer lands in the last one.
+_BUCKET_FLOOR = 1e-6
+_BUCKETS_PER_DOUBLING = 4
+_BUCKET_COUNT = 122
+
+# Appends from concurrent server sessions must not interleave
+_export_lock = threading.Lock()
+
+_NULL_SPAN = nullcontext()
+
+
+# ------------------------
+# HISTOGRAM
+# ------------------------
+class Histogram:
+    """
+    Log-bucketed latency histogram: O(1) to record, fixed size, and
+    quantiles good to about 10% (bucket width) within [min, max].
+    """
+
+    __slots__ = ("count", "total", "min", "max", "buckets")
+
+    def __init__(self):
+        self.count = 0
+        self.total = 0.0
+        self.min = math.inf
+        self.max = 0.0
+        self.buckets = [0] * _BUCKET_COUNT
+
+    def record(self, seconds):
+        self.count += 1
+        self.total += seconds
+        if seconds < self.min:
+            self.min = seconds
+        if seconds > self.max:
+            self.max = seconds
+        if seconds <= _BUCKET_FLOOR:
+            index = 0
+        else:
+            index = min(_BUCKET_COUNT - 1, 1 + int(math.log2(seconds / _BUCKET_FLOOR) * _BUCKETS_PER_DOUBLING))
+        self.buckets[index] += 1
+
+    @staticmethod
+    def _bucket_bounds(index):
+        if index == 0:
+            return 0.0, _BUCKET_FLOOR
+        low = _BUCKET_FLOOR * 2 ** ((index - 1) / _BUCKETS_PER_DOUBLING)
+        return low, low * 2 ** (1 / _BUCKETS_PER_DOUBLING)
+
+    def quantile(self, q):
+        """Approximate q-quantile (bucket midpoint, clamped to min/max)."""
+        if not self.count:
+            return 0.0
+        target = q * (self.count - 1)
+        seen = 0
+        for index, hits in enumerate(self.buckets):
+            seen += hits
+            if seen > target:
+                low, high = self._bucket_bounds(index)
+                return min(self.max, max(self.min, (low + high) / 2))
+        return self.max
+
+    def summary(self):
+        return {
+            "count": self.count,
+            "total": self.total,
+            "mean": self.total / self.count if self.count else 0.0,
+            "min": self.min if self.count else 0.0,
+            "max": self.max,
+            "p50": self.quantile(0.5),
+            "p95": self.quantile(0.95),
+            "p99": self.quantile(0.99),
+        }
+
+
+# ------------------------
+# SESSION RECORDER
+# ------------------------
+class _Span:
+    """Times its `with` block into one histogram of a recorder."""
+
+    __slots__ = ("recorder", "name", "started")
+
+    def __init__(self, recorder, name):
+        self.recorder = recorder
+        self.name = name
+
+    def __enter__(self):
+        self.started = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        self.recorder.record(self.name, time.perf_counter() - self.started)
+        return False
+
+
+class Instrumentation:
+    """
+    Wall-time histograms for one game session.
+
+    Time is filed under "<phase>.<kind>": the phase is whatever part
+    of the game is running (intro, battle, shop, ending) and the kind is
+    what the game was doing in it (render, input_wait, enemy_ai, llm...).
+    Each phase also gets one sample per visit under its bare name.
+    """
+
+    def __init__(self):
+        self.started = time.time()
+        self.histograms = {}
+        self._phases = []
+
+    @property
+    def current_phase(self):
+        return self._phases[-1] if self._phases else "other"
+
+    def record(self, name, seconds):
+        histogram = self.histograms.get(name)
+        if histogram is None:
+            histogram = self.histograms[name] = Histogram()
+        histogram.record(seconds)
+
+    def timed(self, kind):
+        return _Span(self, f"{self.current_phase}.{kind}")
+
+    @contextmanager
+    def phase(self, name):
+        self._phases.append(name)
+        started = time.perf_counter()
+        try:
+            yield self
+        finally:
+            self._phases.pop()
+            self.record(name, time.perf_counter() - started)
+
+    def summary(self):
+        return {name: self.histograms[name].summary() for name in sorted(self.histograms)}
+
+    def export(self, path):
+        """Append this session's summary as one JSON line to `path`."""
+        line = json.dumps({
+            "started": time.strftime("%Y-%m-%dT%H:%M:%S", time.localtime(self.started)),
+            "seconds": time.time() - self.started,
+            "timings": self.summary(),
+        })
+        with _export_lock, open(path, "a", encoding="utf-8") as handle:
+            handle.write(line + "\n")
+
+
+# ------------------------
+# CURRENT SESSION
+# ------------------------
+# None = instrumentation off (the default); every hook is then a no-op
+_current = contextvars.ContextVar("instrumentation", default=None)
+
+
+def get_instrumentation():
+    return _current.get()
+
+
+@contextmanager
+def use_instrumentation(instrumentation):
+    """Record timings for the current thread or task into `instrumentation`."""
+    token = _current.set(instrumentation)
+    try:
+        yield instrumentation
+    finally:
+        _current.reset(token)
+
+
+def metrics_path_from_env():
+    """Where sessions should export, or None if nobody asked for metrics."""
+    return os.environ.get(METRICS_ENV_VAR) or None
+
+
+# Hooks for the game code: cheap no-ops while instrumentation is off
+def phase(name):
+    instrumentation = _current.get()
+    return _NULL_SPAN if instrumentation is None else instrumentation.phase(name)
+
+
+def timed(kind):
+    instrumentation = _current.get()
+    return _NULL_SPAN if instrumentation is None else instrumentation.timed(kind)
+
+
+def record(kind, seconds):
+    instrumentation = _current.get()
+    if instrumentation is not None:
+        instrumentation.record(f"{instrumentation.current_phase}.{kind}", seconds)
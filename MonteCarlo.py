@@ -0,0 +1,249 @@
+# MonteCarlo.py
+
+import argparse
+import csv
+import json
+import os
+import time
+from collections import Counter
+from concurrent.futures import ProcessPoolExecutor
+
+import Rng
+from Characters import create_enemy
+from Simulator import Simulator, aggressive_policy, defensive_policy, new_player, random_policy
+
+POLICIES = {
+    "random": random_policy,
+    "aggressive": aggressive_policy,
+    "defensive": defensive_policy,
+}
+
+# Runs per task handed to a worker process. Each chunk gets its own
+# spawned Rng registry, so results don't depend on the worker count.
+CHUNK_SIZE = 5000
+
+# Gold-at-death histogram bucket width
+GOLD_BUCKET = 10
+
+# Safety valve for a player who somehow never dies or pays
+MAX_ROUNDS = 1000
+
+
+# ------------------------
+# ONE RUN
+# ------------------------
+def simulate_run(sim, encounters=None, stalemates=None):
+    """
+    One headless GameController run: fresh player, new debt, then
+    rounds of create_enemy + battle (health, armor and Vigor carry over,
+    gold loot is paid out) until death, stalemate or the debt is paid.
+    The shop is skipped: buying needs a negotiation model.
+
+    Returns (outcome, rounds_won, gold, killer_template_name or None);
+    the killer is only set when the player died. `encounters` (a
+    Counter) is bumped for every enemy template fought, `stalemates`
+    for the template of a battle that hit max_turns ("timeout").
+    """
+    debt = Rng.stream(Rng.DEBT).randint(250, 350)
+    player = new_player()
+    rounds = 0
+
+    while rounds < MAX_ROUNDS:
+        enemy = create_enemy(rounds, pool=sim.enemy_pool)
+        result, _ = sim.run_battle(player, enemy)
+        killer = enemy.name
+        sim.enemy_pool.release(enemy)
+        if encounters is not None:
+            encounters[killer] += 1
+
+        if result == "enemy_dead":
+            rounds += 1
+            if player.money >= debt:
+                return "debt_cleared", rounds, player.money, None
+            continue
+        if result == "timeout":
+            # A stalemate is nobody's kill: keep it out of the death stats
+            if stalemates is not None:
+                stalemates[killer] += 1
+            return result, rounds, player.money, None
+        return result, rounds, player.money, killer
+
+    return "max_rounds", rounds, player.money, None
+
+
+def _new_totals():
+    return {
+        "runs": 0,
+        "outcomes": Counter(),
+        "rounds_survived": Counter(),
+        "gold_at_death": Counter(),
+        "deaths_by_template": Counter(),
+        "encounters_by_template": Counter(),
+        "timeouts_by_template": Counter(),
+    }
+
+
+def _merge(totals, part):
+    totals["runs"] += part["runs"]
+    for key in (
+        "outcomes",
+        "rounds_survived",
+        "gold_at_death",
+        "deaths_by_template",
+        "encounters_by_template",
+        "timeouts_by_template",
+    ):
+        totals[key].update(part[key])
+
+
+def _run_chunk(task):
+    """Worker entry point: (chunk_index, runs, seed, policy_name, max_turns)."""
+    chunk_index, runs, seed, policy_name, max_turns = task
+    sim = Simulator(policy=POLICIES[policy_name], max_turns=max_turns)
+    totals = _new_totals()
+
+    with Rng.use_registry(Rng.RngRegistry(seed).spawn(chunk_index)):
+        for _ in range(runs):
+            outcome, rounds, gold, killer = simulate_run(
+                sim, totals["encounters_by_template"], totals["timeouts_by_template"]
+            )
+            totals["runs"] += 1
+            totals["outcomes"][outcome] += 1
+            totals["rounds_survived"][rounds] += 1
+            if killer is not None:
+                totals["gold_at_death"][gold // GOLD_BUCKET * GOLD_BUCKET] += 1
+                totals["deaths_by_template"][killer] += 1
+    return totals
+
+
+# ------------------------
+# REPORT
+# ------------------------
+def _quantile(histogram, q):
+    """q-quantile of a {value: count} histogram."""
+    total = sum(histogram.values())
+    if not total:
+        return 0
+    target = q * (total - 1)
+    seen = 0
+    for value in sorted(histogram):
+        seen += histogram[value]
+        if seen > target:
+            return value
+    return max(histogram)
+
+
+def _summarize(totals, seconds, seed, policy_name, workers):
+    runs = totals["runs"]
+    rounds = totals["rounds_survived"]
+    deaths = sum(totals["deaths_by_template"].values())
+    return {
+        "runs": runs,
+        "seed": seed,
+        "policy": policy_name,
+        "workers": workers,
+        "seconds": round(seconds, 3),
+        "runs_per_second": round(runs / seconds, 1) if seconds else 0.0,
+        "debt_cleared_rate": totals["outcomes"]["debt_cleared"] / runs if runs else 0.0,
+        "timeout_rate": totals["outcomes"]["timeout"] / runs if runs else 0.0,
+        "outcomes": dict(totals["outcomes"]),
+        "rounds_survived": {
+            "mean": sum(k * v for k, v in rounds.items()) / runs if runs else 0.0,
+            "p50": _quantile(rounds, 0.5),
+            "p90": _quantile(rounds, 0.9),
+            "p99": _quantile(rounds, 0.99),
+            "histogram": {str(k): rounds[k] for k in sorted(rounds)},
+        },
+        "gold_at_death": {
+            "bucket": GOLD_BUCKET,
+            "p50": _quantile(totals["gold_at_death"], 0.5),
+            "p90": _quantile(totals["gold_at_death"], 0.9),
+            "histogram": {str(k): totals["gold_at_death"][k] for k in sorted(totals["gold_at_death"])},
+        },
+        "deaths_by_template": {
+            name: {
+                "deaths": count,
+                "share": count / deaths,
+                "death_rate_per_encounter": count / totals["encounters_by_template"][name],
+            }
+            for name, count in totals["deaths_by_template"].most_common()
+        },
+        # Battles that hit max_turns: neither a death nor a win
+        "timeouts_by_template": dict(totals["timeouts_by_template"].most_common()),
+    }
+
+
+def run_report(runs, workers=None, seed=0, policy="random", max_turns=500, chunk_size=CHUNK_SIZE):
+    """
+    Simulate `runs` full runs across a process pool and return the
+    aggregated report dict (same numbers for any worker count).
+    """
+    workers = workers or os.cpu_count() or 1
+    tasks = []
+    for chunk_index, start in enumerate(range(0, runs, chunk_size)):
+        tasks.append((chunk_index, min(chunk_size, runs - start), seed, policy, max_turns))
+
+    totals = _new_totals()
+    started = time.perf_counter()
+    if workers == 1:
+        for task in tasks:
+            _merge(totals, _run_chunk(task))
+    else:
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            for part in pool.map(_run_chunk, tasks):
+                _merge(totals, part)
+    return _summarize(totals, time.perf_counter() - started, seed, policy, workers)
+
+
+def write_json(report, path):
+    with open(path, "w", encoding="utf-8") as handle:
+        json.dump(report, handle, indent=2)
+
+
+def write_csv(report, path):
+    """Long format: one (section, key, value) row per number."""
+    rows = [
+        ("summary", key, report[key])
+        for key in ("runs", "seed", "policy", "seconds", "debt_cleared_rate", "timeout_rate")
+    ]
+    rows += [("outcome", key, value) for key, value in report["outcomes"].items()]
+    rows += [("rounds_survived", key, value) for key, value in report["rounds_survived"]["histogram"].items()]
+    rows += [("gold_at_death", key, value) for key, value in report["gold_at_death"]["histogram"].items()]
+    rows += [("deaths_by_template", name, row["deaths"]) for name, row in report["deaths_by_template"].items()]
+    rows += [("timeouts_by_template", name, count) for name, count in report["timeouts_by_template"].items()]
+    with open(path, "w", newline="", encoding="utf-8") as handle:
+        writer = csv.writer(handle)
+        writer.writerow(("section", "key", "value"))
+        writer.writerows(rows)
+
+
+# ----------------------------------------------------------------------
+# Entry point
+# ----------------------------------------------------------------------
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Monte Carlo balance report for full runs")
+    parser.add_argument("--runs", type=int, default=100_000)
+    parser.add_argument("--workers", type=int, default=None)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--policy", choices=sorted(POLICIES), default="random")
+    parser.add_argument("--json", help="write the report as JSON to this path")
+    parser.add_argument("--csv", help="write the report as CSV to this path")
+    args = parser.parse_args()
+
+    report = run_report(args.runs, args.workers, args.seed, args.policy)
+    if args.json:
+        write_json(report, args.json)
+    if args.csv:
+        write_csv(report, args.csv)
+
+    print(
+        f"{report['runs']} runs in {report['seconds']:.1f}s ({report['runs_per_second']:,.0f}/s), "
+        f"debt cleared {report['debt_cleared_rate']:.2%}, "
+        f"stalemates {report['timeout_rate']:.2%}, "
+        f"median rounds {report['rounds_survived']['p50']}"
+    )
+    for name, row in report["deaths_by_template"].items():
+        print(
+            f"  {name:<18} {row['deaths']:>8} deaths ({row['share']:.1%}), "
+            f"kills {row['death_rate_per_encounter']:.1%} of players who meet it"
+        )
@@ -0,0 +1,335 @@
+# Odds.py
+
+import threading
+import time
+from collections import namedtuple
+from functools import lru_cache
+
+import numpy as np
+
+from Characters import Character, create_enemy, enemy_templates
+from Combat import ACTION_CODES, enemy_sampler
+from CombatTable import PAIR_COUNT, VIGOR_CAP, compile_table, table_for
+from Simulator import (
+    BASIC_ACTIONS,
+    VIGOR_ACTIONS,
+    aggressive_policy,
+    defensive_policy,
+    new_player,
+    random_policy,
+)
+
+# Exact outcome probabilities for one battle. `stall` is the chance the
+# fight locks into a loop it can never leave (the Simulator would time
+# out); expected_turns counts turns until the fight ends or locks up.
+Odds = namedtuple("Odds", "win loss double_ko stall expected_turns")
+
+# How many (matchup, policy) answers to keep around. Must hold every
+# SHIPPED_POLICIES x template x DASHBOARD_ROUNDS answer, or warm_odds
+# would evict what it just solved.
+ODDS_CACHE_SIZE = 256
+
+# Rounds the balance dashboard covers (and warm_odds solves by default)
+DASHBOARD_ROUNDS = range(1, 9)
+
+# A state that keeps itself with this much probability never ends
+_STAY_EPS = 1e-15
+
+# (win, loss, double KO, stall, turns) for a fight that locked up
+_STALL = np.array([0.0, 0.0, 0.0, 1.0, 0.0])
+
+
+# ------------------------
+# POLICY DISTRIBUTIONS
+# ------------------------
+def _uniform_menu(player, enemy):
+    menu = VIGOR_ACTIONS if player.vigor >= 2 else BASIC_ACTIONS
+    return {action: 1 / len(menu) for action in menu}
+
+
+# Policies that roll dice, with the distribution they roll from.
+# Any other policy is assumed to be a deterministic function of the
+# state and is simply called once per state.
+MIXED_POLICIES = {random_policy: _uniform_menu}
+
+# The policies the game ships with, in dashboard order
+SHIPPED_POLICIES = (
+    ("random", random_policy),
+    ("aggressive", aggressive_policy),
+    ("defensive", defensive_policy),
+)
+
+
+def policy_distribution(policy, player, enemy):
+    """
+    {legal action: probability} for `policy` in the current state, after
+    Simulator.choose_player_action's menu rules (fumbles become Block).
+    """
+    mixed = MIXED_POLICIES.get(policy)
+    raw = mixed(player, enemy) if mixed is not None else {policy(player, enemy): 1.0}
+    menu = VIGOR_ACTIONS if player.vigor >= 2 else BASIC_ACTIONS
+    result = {}
+    for action, probability in raw.items():
+        action = action if action in menu else "block"
+        result[action] = result.get(action, 0.0) + probability
+    return result
+
+
+# ------------------------
+# MARKOV CHAIN
+# ------------------------
+def _transitions(table, policy, preferred_action):
+    """
+    Walk every state reachable from the table's start under `policy` and
+    the enemy AI; returns {state index: {next index: probability}}
+    for the non-terminal ones.
+    """
+    side = table.vigor_cap + 1
+    span = table.vigor_span
+    combat_states = table.combat_states
+    next_combat = table.next_combat
+    next_vigor = table.next_vigor
+    terminal = table.terminal
+
+    # Scratch fighters the policy and enemy AI look at
+    player = Character("Player", 1, 0, 0, table.p_damage)
+    enemy = Character("Enemy", 1, 0, 0, table.e_damage)
+    enemy.preferred_action = preferred_action
+
+    # (pair code, probability) lists, shared by every state where the
+    # policy and the AI roll the same distributions
+    pair_lists = {}
+
+    transitions = {}
+    stack = [table.start]
+    while stack:
+        index = stack.pop()
+        if index in transitions:
+            continue
+        combat_index, vigor_index = divmod(index, span)
+        if terminal[combat_index]:
+            continue
+
+        player.health, player.armor, enemy.health, enemy.armor = combat_states[combat_index]
+        player.vigor, enemy.vigor = divmod(vigor_index, side)
+        sampler = enemy_sampler(enemy)
+        player_moves = tuple(policy_distribution(policy, player, enemy).items())
+        pairs = pair_lists.get((player_moves, sampler))
+        if pairs is None:
+            pairs = pair_lists[(player_moves, sampler)] = [
+                (ACTION_CODES[player_action] * 5 + ACTION_CODES[enemy_action], p_prob * e_prob)
+                for player_action, p_prob in player_moves
+                for enemy_action, e_prob in sampler.probabilities().items()
+            ]
+
+        combat_row = combat_index * PAIR_COUNT
+        vigor_row = vigor_index * PAIR_COUNT
+        moves = {}
+        for pair, probability in pairs:
+            target = next_combat[combat_row + pair] * span + next_vigor[vigor_row + pair]
+            moves[target] = moves.get(target, 0.0) + probability
+        transitions[index] = moves
+        stack.extend(moves)
+    return transitions
+
+
+def _components(start, transitions):
+    """
+    Strongly connected components of the reachable chain (iterative
+    Tarjan), yielded sinks first: everything a component can move to
+    has been yielded before it.
+    """
+    order = {}
+    low = {}
+    on_stack = set()
+    stack = []
+    counter = 0
+    work = [(start, iter(transitions.get(start, ())))]
+    order[start] = low[start] = counter
+    stack.append(start)
+    on_stack.add(start)
+
+    while work:
+        node, children = work[-1]
+        for child in children:
+            if child not in transitions:
+                continue  # terminal: solved up front
+            if child not in order:
+                counter += 1
+                order[child] = low[child] = counter
+                stack.append(child)
+                on_stack.add(child)
+                work.append((child, iter(transitions[child])))
+                break
+            if child in on_stack and order[child] < low[node]:
+                low[node] = order[child]
+        else:
+            work.pop()
+            if work:
+                parent = work[-1][0]
+                if low[node] < low[parent]:
+                    low[parent] = low[node]
+            if low[node] == order[node]:
+                component = []
+                while True:
+                    member = stack.pop()
+                    on_stack.discard(member)
+                    component.append(member)
+                    if member == node:
+                        break
+                yield component
+
+
+def _solve_component(component, transitions, known):
+    """
+    Outcome vectors (win, loss, double KO, stall, turns) for one strongly
+    connected component; every move out of it lands on a `known` state.
+
+    Single states are closed-form; larger loops (Vigor cycles) are a
+    small linear system x = Q x + c. A component nothing leaves is a stall.
+    """
+    if len(component) == 1:
+        index = component[0]
+        stay = 0.0
+        outcome = np.array([0.0, 0.0, 0.0, 0.0, 1.0])
+        for target, probability in transitions[index].items():
+            if target == index:
+                stay += probability
+            else:
+                outcome += probability * known[target]
+        if stay >= 1.0 - _STAY_EPS:
+            known[index] = _STALL
+        else:
+            known[index] = np.array(outcome) / (1.0 - stay)
+        return
+
+    position = {index: i for i, index in enumerate(component)}
+    size = len(component)
+    # (I - Q) x = c, one right-hand column per outcome plus turns
+    system = np.identity(size)
+    constants = np.zeros((size, 5))
+    constants[:, 4] = 1.0
+    leaves = False
+    for row, index in enumerate(component):
+        for target, probability in transitions[index].items():
+            column = position.get(target)
+            if column is not None:
+                system[row, column] -= probability
+            else:
+                leaves = True
+                constants[row] += probability * known[target]
+    if not leaves:
+        for index in component:
+            known[index] = _STALL
+        return
+
+    for index, values in zip(component, np.linalg.solve(system, constants)):
+        known[index] = values
+
+
+@lru_cache(maxsize=ODDS_CACHE_SIZE)
+def _odds_for(signature, policy, preferred_action):
+    table = compile_table(*signature)
+    transitions = _transitions(table, policy, preferred_action)
+
+    known = {}
+    for moves in transitions.values():
+        for target in moves:
+            if target not in transitions and target not in known:
+                outcome = table.outcome(target)
+                known[target] = np.array([
+                    outcome == "enemy_dead",
+                    outcome == "player_dead",
+                    outcome == "double_ko",
+                    0.0,
+                    0.0,
+                ], dtype=float)
+
+    for component in _components(table.start, transitions):
+        _solve_component(component, transitions, known)
+    return Odds(*(float(value) for value in known[table.start]))
+
+
+def battle_odds(player, enemy, policy=random_policy, vigor_cap=VIGOR_CAP):
+    """
+    Exact win / loss / double KO probabilities (and expected turns) for
+    `player` using `policy` against `enemy` and its regular AI, from
+    their current stats. Memoized per (stats, policy, preference).
+
+    Vigor saturates at vigor_cap like in the compiled Simulator.
+
+    A cold call compiles the matchup and solves its whole Markov chain,
+    which takes about 0.1-1.5 s (most for random_policy, whose mixed
+    moves reach the most states); a memoized one is microseconds. Call
+    warm_odds first wherever the odds are shown to a player.
+    """
+    if player.health <= 0 or enemy.health <= 0:
+        won = player.health > 0
+        lost = enemy.health > 0
+        return Odds(float(won), float(lost), float(not won and not lost), 0.0, 0.0)
+    signature = table_for(player, enemy, vigor_cap).signature
+    return _odds_for(signature, policy, getattr(enemy, "preferred_action", None))
+
+
+def odds_table(rounds, policy=random_policy, player_factory=new_player):
+    """
+    Exact odds of a fresh player vs every template per round:
+    {template_name: {fight_index: Odds}}. The noise-free counterpart of
+    Simulator.balance_table.
+
+    Every cold matchup costs a full solve (see battle_odds), so a cold
+    table takes seconds; warm_odds pays that up front.
+    """
+    results = {}
+    for template in enemy_templates:
+        results[template["name"]] = {
+            fight_index: battle_odds(player_factory(), create_enemy(fight_index - 1, template), policy)
+            for fight_index in rounds
+        }
+    return results
+
+
+def warm_odds(rounds=DASHBOARD_ROUNDS, policies=SHIPPED_POLICIES):
+    """
+    Solve every template x round matchup for each (name, policy) up front
+    so later battle_odds / odds_table calls are cache hits. Returns
+    {name: seconds spent solving}.
+    """
+    spent = {}
+    for name, policy in policies:
+        started = time.perf_counter()
+        odds_table(rounds, policy)
+        spent[name] = time.perf_counter() - started
+    return spent
+
+
+def warm_odds_in_background(rounds=DASHBOARD_ROUNDS, policies=SHIPPED_POLICIES):
+    """Run warm_odds on a daemon thread."""
+    thread = threading.Thread(target=warm_odds, args=(rounds, policies), name="odds-warm-up", daemon=True)
+    thread.start()
+    return thread
+
+
+# ----------------------------------------------------------------------
+# Entry point: exact balance dashboard
+# ----------------------------------------------------------------------
+if __name__ == "__main__":
+    # Pay the cold solves first so they don't hide inside the first table
+    spent = warm_odds(DASHBOARD_ROUNDS)
+    matchups = len(enemy_templates) * len(DASHBOARD_ROUNDS)
+    for name, seconds in spent.items():
+        print(f"{name} policy: solved {matchups} matchups cold in {seconds * 1000:.0f} ms")
+
+    for name, policy in SHIPPED_POLICIES:
+        started = time.perf_counter()
+        table = odds_table(DASHBOARD_ROUNDS, policy)
+        seconds = time.perf_counter() - started
+        print(f"{name} policy ({seconds * 1000:.1f} ms warm for {matchups} matchups)")
+        for template_name, per_round in table.items():
+            print(f"  {template_name}")
+            for fight_index, odds in per_round.items():
+                print(
+                    f"    Round {fight_index:>2}: win {odds.win:6.1%} | loss {odds.loss:6.1%} | "
+                    f"double KO {odds.double_ko:5.1%} | stall {odds.stall:5.1%} | "
+                    f"avg turns {odds.expected_turns:5.2f}"
+                )
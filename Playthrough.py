@@ -0,0 +1,91 @@
+# Playthrough.py
+
+import random
+import time
+
+import Rng
+
+from UI import ScriptedIO, use_io
+from GameController import GameController
+from Backends import LocalRuleBackend, set_backend
+from ResponseCache import ResponseCache
+from Shopkeeper import set_response_cache
+
+
+# ------------------- Scripted players -------------------
+def bot_answer(text, rng, answered):
+    """Scripted reply to the prompt at the end of `text`."""
+    if answered == 0:
+        return "Bot"  # name
+    if "(y/n)" in text:
+        return "n"  # one run per session
+    if "Press Enter" in text:
+        return ""
+    if "item you want to buy" in text:
+        return str(rng.randint(1, 2))
+    if "How much gold" in text:
+        return str(rng.randint(5, 40))
+    if "new offer" in text:
+        return str(rng.randint(10, 60))
+    if "What do you do?" in text:
+        return rng.choice("12")
+    return rng.choice("123")  # combat menu
+
+
+def scripted_player(seed=0):
+    """A bot_answer script with its own random stream."""
+    rng = random.Random(seed)
+    return lambda text, answered: bot_answer(text, rng, answered)
+
+
+# ------------------- Driver -------------------
+def use_offline_services():
+    """Rule-engine shopkeepers and a fresh in-memory reply cache."""
+    set_backend(LocalRuleBackend())
+    set_response_cache(ResponseCache())
+
+
+def play_scripted(script, seed=None):
+    """
+    One full game (intro to ending) driven by `script` (see
+    UI.ScriptedIO), with no real pauses. All game randomness comes
+    from an Rng registry built from `seed`, so the run is repeatable.
+    Returns the ScriptedIO, which holds the transcript, the number of
+    prompts and the virtual clock.
+    """
+    io = ScriptedIO(script)
+    with use_io(io), Rng.use_seed(seed):
+        try:
+            GameController().run()
+        except EOFError:
+            pass  # script ran out
+    return io
+
+
+def check_reproducible(seed=0):
+    """Two runs from the same seed and script must print the same thing."""
+    use_offline_services()
+    first = play_scripted(scripted_player(seed), seed=seed).text()
+    use_offline_services()
+    second = play_scripted(scripted_player(seed), seed=seed).text()
+    return first == second
+
+
+def throughput(runs=200, seed=0):
+    """Full scripted games per second. Returns (runs_per_second, prompts)."""
+    use_offline_services()
+    prompts = 0
+    start = time.perf_counter()
+    for index in range(runs):
+        prompts += play_scripted(scripted_player(seed + index), seed=seed + index).prompts
+    seconds = time.perf_counter() - start
+    return runs / seconds, prompts
+
+
+# ----------------------------------------------------------------------
+# Entry point: end-to-end smoke run + throughput
+# ----------------------------------------------------------------------
+if __name__ == "__main__":
+    print("reproducible:", check_reproducible())
+    runs_per_second, prompts = throughput()
+    print(f"{runs_per_second:.1f} full games/s ({prompts} prompts answered)")
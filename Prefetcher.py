@@ -0,0 +1,145 @@
+# Prefetcher.py
+
+import threading
+from concurrent.futures import CancelledError, ThreadPoolExecutor
+
+from Backends import is_cacheable
+
+# Background workers per negotiation session, so one busy session can't
+# starve speculation for every other player on a server
+MAX_SPECULATIVE_WORKERS = 3
+
+# Process-wide counters, summed over every ReplyPrefetcher
+_totals = {"speculated": 0, "hits": 0, "misses": 0, "wasted": 0, "cancelled": 0}
+_totals_lock = threading.Lock()
+
+
+def _count(key, amount=1):
+    with _totals_lock:
+        _totals[key] += amount
+
+
+def likely_offers(offer, last_counter_offer):
+    """
+    Offers the player is most likely to type next: the shopkeeper's
+    last counter-offer, the midpoint between it and the current offer,
+    and a small (~10%) raise.
+    """
+    candidates = []
+    if last_counter_offer:
+        candidates.append(last_counter_offer)
+        candidates.append((offer + last_counter_offer) // 2)
+    candidates.append(max(offer + 1, round(offer * 1.1)))
+    return candidates
+
+
+class ReplyPrefetcher:
+    """
+    Generates shopkeeper replies for likely next offers while the
+    player is still typing.
+
+    Speculations are keyed by the same normalized negotiation key the
+    ResponseCache uses, so "close enough" offers share a reply. Finished
+    but unused speculations still land in the cache; ones that never
+    started are cancelled. Each prefetcher has its own small worker
+    pool, started on first use and shut down by close().
+    """
+
+    def __init__(self, cache):
+        self.cache = cache
+        self._pending = {}
+        self._executor = None
+        self.speculated = 0
+        self.hits = 0
+        self.misses = 0
+        self.wasted = 0
+        self.cancelled = 0
+
+    def speculate(self, requests, generate):
+        """
+        Start background generation for (cache_key, prompt, turn) requests
+        that aren't cached or already in flight. `generate(prompt, turn)` -> text.
+        """
+        if self._executor is None:
+            self._executor = ThreadPoolExecutor(
+                max_workers=MAX_SPECULATIVE_WORKERS, thread_name_prefix="prefetch"
+            )
+        for cache_key, prompt, turn in requests:
+            # contains() rather than get(): a probe is not a player lookup
+            # and must not count in the cache's hit-rate stats
+            if cache_key in self._pending or self.cache.contains(cache_key):
+                continue
+            self._pending[cache_key] = self._executor.submit(self._run, cache_key, prompt, turn, generate)
+            self.speculated += 1
+            _count("speculated")
+
+    def _run(self, cache_key, prompt, turn, generate):
+        text = generate(prompt, turn)
+        if is_cacheable(text):
+            self.cache.put(cache_key, text)
+        return text
+
+    def take(self, cache_key, timeout=None):
+        """
+        Reply for the offer the player actually made, or None.
+        Waits (at most `timeout` seconds) for an in-flight speculation if
+        it matches; every other speculation is abandoned.
+        """
+        if not self._pending:
+            return None  # nothing was guessed for this step
+        future = self._pending.pop(cache_key, None)
+        self.discard()
+        if future is None:
+            self.misses += 1
+            _count("misses")
+            return None
+        try:
+            text = future.result(timeout=timeout)
+        except (CancelledError, Exception):  # includes running out of time
+            text = None
+        if text is None or not is_cacheable(text):
+            # A fallback reply was made for the guessed offer, not this one
+            self.misses += 1
+            _count("misses")
+            return None
+        self.hits += 1
+        _count("hits")
+        return text
+
+    def discard(self):
+        """Cancel queued speculations; running ones finish into the cache."""
+        for future in self._pending.values():
+            if future.cancel():
+                self.cancelled += 1
+                _count("cancelled")
+            else:
+                self.wasted += 1
+                _count("wasted")
+        self._pending.clear()
+
+    def close(self):
+        """discard() and stop the worker pool once running work finishes."""
+        self.discard()
+        if self._executor is not None:
+            self._executor.shutdown(wait=False)
+            self._executor = None
+
+    def stats(self):
+        lookups = self.hits + self.misses
+        return {
+            "speculated": self.speculated,
+            "hits": self.hits,
+            "misses": self.misses,
+            "wasted": self.wasted,
+            "cancelled": self.cancelled,
+            "hit_rate": self.hits / lookups if lookups else 0.0,
+        }
+
+
+def report():
+    """Prefetch counters summed over the whole process."""
+    with _totals_lock:
+        totals = dict(_totals)
+    lookups = totals["hits"] + totals["misses"]
+    totals["hit_rate"] = totals["hits"] / lookups if lookups else 0.0
+    return totals
@@ -0,0 +1,212 @@
+# ResponseCache.py
+
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+
+# Where shopkeeper replies persist between runs (next to the game files)
+DEFAULT_CACHE_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), ".cache", "negotiations.sqlite3")
+
+# Offers / counter-offers are compared as a fraction of the hidden price,
+# in steps of this size (0.1 = 10% buckets). Prices round to PRICE_STEP gold.
+RATIO_STEP = 0.1
+PRICE_STEP = 5
+# Anything above this ratio is "way over the price" and shares one bucket
+MAX_RATIO_BUCKET = 20
+
+
+def _ratio_bucket(value, price):
+    if value is None:
+        return "none"
+    if price <= 0:
+        return str(MAX_RATIO_BUCKET)
+    return str(min(MAX_RATIO_BUCKET, int(value / price / RATIO_STEP)))
+
+
+def negotiation_key(personality_name, mood, item_name, price, offer, last_counter_offer):
+    """
+    Normalized negotiation state used as the cache key.
+
+    Two haggles share a reply when they have the same merchant, mood tier
+    and item, a similar hidden price, and offer / previous counter-offer
+    in the same band relative to that price.
+    """
+    price_bucket = int(round(price / PRICE_STEP)) * PRICE_STEP
+    return "|".join(
+        (
+            personality_name,
+            mood,
+            item_name,
+            f"p{price_bucket}",
+            f"o{_ratio_bucket(offer, price)}",
+            f"c{_ratio_bucket(last_counter_offer, price)}",
+        )
+    )
+
+
+class LRUCache:
+    """Small in-memory least-recently-used map."""
+
+    def __init__(self, max_entries=256):
+        self.max_entries = max_entries
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._data)
+
+    def get(self, key):
+        with self._lock:
+            value = self._data.get(key)
+            if value is not None:
+                self._data.move_to_end(key)
+            return value
+
+    def contains(self, key):
+        """Membership test that leaves the LRU order alone."""
+        with self._lock:
+            return key in self._data
+
+    def put(self, key, value):
+        with self._lock:
+            self._data[key] = value
+            self._data.move_to_end(key)
+            while len(self._data) > self.max_entries:
+                self._data.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+
+
+class DiskCache:
+    """
+    SQLite-backed store with a time-to-live and a total size cap.
+
+    Expired rows are dropped on read; when the stored text grows past
+    max_bytes the oldest rows are evicted first.
+    """
+
+    def __init__(self, path=DEFAULT_CACHE_PATH, ttl_seconds=7 * 24 * 3600, max_bytes=5 * 1024 * 1024):
+        self.path = path
+        self.ttl_seconds = ttl_seconds
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+
+        if path != ":memory:":
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS replies ("
+            " key TEXT PRIMARY KEY,"
+            " value TEXT NOT NULL,"
+            " created REAL NOT NULL,"
+            " size INTEGER NOT NULL)"
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS replies_created ON replies (created)")
+        self._conn.commit()
+
+    def get(self, key):
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT value, created FROM replies WHERE key = ?", (key,)
+            ).fetchone()
+            if row is None:
+                return None
+            value, created = row
+            if time.time() - created > self.ttl_seconds:
+                self._conn.execute("DELETE FROM replies WHERE key = ?", (key,))
+                self._conn.commit()
+                return None
+            return value
+
+    def contains(self, key):
+        """True if `key` has an unexpired row."""
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT 1 FROM replies WHERE key = ? AND created >= ?",
+                (key, time.time() - self.ttl_seconds),
+            ).fetchone()
+            return row is not None
+
+    def put(self, key, value):
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO replies (key, value, created, size) VALUES (?, ?, ?, ?)",
+                (key, value, time.time(), len(value.encode("utf-8"))),
+            )
+            self._evict()
+            self._conn.commit()
+
+    def _evict(self):
+        self._conn.execute(
+            "DELETE FROM replies WHERE created < ?", (time.time() - self.ttl_seconds,)
+        )
+        total = self._conn.execute("SELECT COALESCE(SUM(size), 0) FROM replies").fetchone()[0]
+        if total <= self.max_bytes:
+            return
+        for key, size in self._conn.execute(
+            "SELECT key, size FROM replies ORDER BY created ASC"
+        ).fetchall():
+            if total <= self.max_bytes:
+                break
+            self._conn.execute("DELETE FROM replies WHERE key = ?", (key,))
+            total -= size
+
+    def clear(self):
+        with self._lock:
+            self._conn.execute("DELETE FROM replies")
+            self._conn.commit()
+
+
+class ResponseCache:
+    """
+    Two-level cache: in-memory LRU in front of an optional DiskCache.
+
+    Disk hits are promoted into memory. Counters track where each lookup
+    was answered so the hit rate can be reported.
+    """
+
+    def __init__(self, memory=None, disk=None):
+        self.memory = memory if memory is not None else LRUCache()
+        self.disk = disk
+        self.memory_hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+
+    def get(self, key):
+        value = self.memory.get(key)
+        if value is not None:
+            self.memory_hits += 1
+            return value
+        if self.disk is not None:
+            value = self.disk.get(key)
+            if value is not None:
+                self.disk_hits += 1
+                self.memory.put(key, value)
+                return value
+        self.misses += 1
+        return None
+
+    def contains(self, key):
+        """Like get() is not None, but not counted in stats()."""
+        if self.memory.contains(key):
+            return True
+        return self.disk is not None and self.disk.contains(key)
+
+    def put(self, key, value):
+        self.memory.put(key, value)
+        if self.disk is not None:
+            self.disk.put(key, value)
+
+    def stats(self):
+        lookups = self.memory_hits + self.disk_hits + self.misses
+        hits = self.memory_hits + self.disk_hits
+        return {
+            "memory_hits": self.memory_hits,
+            "disk_hits": self.disk_hits,
+            "misses": self.misses,
+            "hit_rate": hits / lookups if lookups else 0.0,
+        }
@@ -0,0 +1,95 @@
+# Rng.py
+
+import contextvars
+import hashlib
+import random
+import threading
+from contextlib import contextmanager
+
+# Subsystems with their own random stream. Each one draws only from its
+# own stream, so e.g. extra shopkeeper chatter can't shift enemy spawns.
+ENEMY_SPAWN = "enemy_spawn"    # which template the next enemy uses
+ENEMY_AI = "enemy_ai"          # Combat._get_enemy_action
+LOOT = "loot"                  # gold dropped after a win
+DEBT = "debt"                  # debt rolled in the intro
+SHOP = "shop"                  # merchant and hidden price per visit
+DIALOGUE = "dialogue"          # catchphrases in shopkeeper prompts
+PLAYER_POLICY = "player_policy"  # simulated players (Simulator policies)
+
+
+def derive_seed(seed, *names):
+    """Stable 128-bit seed for the stream `names` under `seed`."""
+    digest = hashlib.blake2b(repr((seed,) + names).encode("utf-8"), digest_size=16).digest()
+    return int.from_bytes(digest, "big")
+
+
+class RngRegistry:
+    """
+    One random.Random per subsystem, all derived from a single seed.
+
+    Stream seeds are hashes of (seed, name), so streams are independent,
+    and adding a new subsystem never changes what the others draw.
+    spawn(i) gives worker i a registry of its own for parallel runs.
+    """
+
+    def __init__(self, seed=None):
+        if seed is None:
+            seed = random.SystemRandom().getrandbits(64)
+        self.seed = seed
+        self._streams = {}
+        self._lock = threading.Lock()
+
+    def stream(self, name):
+        rng = self._streams.get(name)
+        if rng is None:
+            with self._lock:
+                rng = self._streams.setdefault(name, random.Random(derive_seed(self.seed, name)))
+        return rng
+
+    def seed_for(self, name):
+        """Integer seed for generators outside this registry (e.g. numpy)."""
+        return derive_seed(self.seed, name)
+
+    def spawn(self, index):
+        """Registry for parallel worker `index`; workers never share streams."""
+        return RngRegistry(derive_seed(self.seed, "worker", index))
+
+
+_default = RngRegistry()
+_current = contextvars.ContextVar("rng_registry", default=None)
+
+
+def get_registry():
+    """Registry for the current context (the process-wide one by default)."""
+    registry = _current.get()
+    return registry if registry is not None else _default
+
+
+def stream(name):
+    """The current context's random stream for subsystem `name`."""
+    # Called on every enemy move, so skip the method calls when we can
+    registry = _current.get() or _default
+    rng = registry._streams.get(name)
+    return rng if rng is not None else registry.stream(name)
+
+
+def set_seed(seed):
+    """Reseed the process-wide registry (every subsystem at once)."""
+    global _default
+    _default = RngRegistry(seed)
+    return _default
+
+
+@contextmanager
+def use_registry(registry):
+    """Draw from `registry` in the current thread or task."""
+    token = _current.set(registry)
+    try:
+        yield registry
+    finally:
+        _current.reset(token)
+
+
+def use_seed(seed):
+    """use_registry() with a fresh registry built from `seed`."""
+    return use_registry(RngRegistry(seed))
@@ -0,0 +1,281 @@
+# Server.py
+
+import argparse
+import asyncio
+import queue
+import random
+import re
+import threading
+import time
+import traceback
+
+import Rng
+from UI import InstantRenderer, Renderer, SystemClock, VirtualClock, discard_queued_lines, use_io
+from GameController import GameController
+from Backends import LocalRuleBackend, set_backend
+from Playthrough import bot_answer
+
+DEFAULT_HOST = "127.0.0.1"
+DEFAULT_PORT = 4000
+
+# Telnet "Go Ahead": sent after every prompt so clients (and the load
+# test bots) know the game is waiting for a line
+PROMPT_MARK = b"\xff\xf9"
+
+# Game threads spend nearly all their time waiting for input, so small
+# stacks are enough and let thousands of sessions fit in one process.
+# Only session threads get them (see _start_session_thread).
+SESSION_STACK_BYTES = 256 * 1024
+
+# Pending connections the OS queues for us; the default (100) drops
+# players when a crowd connects at once
+LISTEN_BACKLOG = 4096
+
+# A player who sends nothing for this long is disconnected
+IDLE_TIMEOUT_SECONDS = 600
+
+# Telnet option negotiation sent by real telnet clients (IAC ...)
+_TELNET_COMMAND = re.compile(rb"\xff[\xfb-\xfe].|\xff[\xf0-\xfa]")
+
+
+# ------------------- Per-player I/O -------------------
+class SocketIO:
+    """
+    Game I/O for one network player (same interface as UI.ConsoleIO).
+
+    The game runs on its own thread; output is handed to the event loop,
+    and input lines arrive from it through a queue.
+    """
+
+    def __init__(self, loop, writer, typewriter=False, pauses=True):
+        self._loop = loop
+        self._writer = writer
+        self._lines = queue.Queue()
+        # Set when a timed prompt gave up: lines typed for it are dropped
+        self._timed_out = False
+        # Without pauses the game's dramatic sleeps are skipped
+        self.clock = SystemClock() if pauses else VirtualClock()
+        # The typewriter pauses on the same clock, so --no-pauses skips them too
+        if typewriter:
+            self.renderer = Renderer(stream=self, skip_on_key=False, clock=self.clock)
+        else:
+            self.renderer = InstantRenderer(stream=self, skip_on_key=False, clock=self.clock)
+
+    def _send(self, data):
+        if not self._writer.is_closing():
+            self._writer.write(data)
+
+    def write(self, text):
+        data = text.replace("\n", "\r\n").encode("utf-8")
+        self._loop.call_soon_threadsafe(self._send, data)
+
+    def flush(self):
+        pass
+
+    def feed(self, line):
+        self._lines.put(line)
+
+    def feed_eof(self):
+        self._lines.put(EOFError)
+
+    def read_line(self, prompt="", timeout=None):
+        if self._timed_out:
+            discard_queued_lines(self._lines)
+            self._timed_out = False
+        self.write(prompt)
+        self._loop.call_soon_threadsafe(self._send, PROMPT_MARK)
+        try:
+            line = self._lines.get(timeout=IDLE_TIMEOUT_SECONDS if timeout is None else timeout)
+        except queue.Empty:
+            if timeout is None:
+                raise EOFError  # idle player: end the session
+            self._timed_out = True
+            return None
+        if line is EOFError:
+            self._lines.put(EOFError)  # every later read sees the hang-up too
+            raise EOFError
+        return line
+
+    def clear_screen(self):
+        self.write("\x1b[2J\x1b[H")
+
+
+# ------------------- Server -------------------
+def _start_session_thread(target, args):
+    """
+    Start a game-session thread with a SESSION_STACK_BYTES stack.
+    threading.stack_size() is process-wide, so it is restored right
+    after the start; prefetch, SDK and other threads keep the default.
+    """
+    thread = threading.Thread(target=target, args=args, name="game-session", daemon=True)
+    previous = threading.stack_size(SESSION_STACK_BYTES)
+    try:
+        thread.start()
+    finally:
+        threading.stack_size(previous)
+    return thread
+
+
+class GameServer:
+    """
+    Hosts many independent GameController runs over TCP (or a Unix
+    socket). Networking is asyncio; each run keeps its blocking game
+    loop on a thread of its own with a SocketIO in its context.
+    """
+
+    def __init__(self, typewriter=False, pauses=True):
+        self.typewriter = typewriter
+        self.pauses = pauses
+        self.active = 0
+        self.finished = 0
+        self.failed = 0
+        # Session threads report failures concurrently
+        self._failed_lock = threading.Lock()
+
+    def _play(self, io, loop, done):
+        try:
+            # Own I/O and own random streams for every player
+            with use_io(io), Rng.use_registry(Rng.RngRegistry()):
+                GameController().run()
+        except (EOFError, ConnectionError):
+            pass  # player left
+        except Exception:
+            with self._failed_lock:
+                self.failed += 1
+            traceback.print_exc()
+        finally:
+            loop.call_soon_threadsafe(done.set_result, None)
+
+    async def _pump_input(self, reader, io):
+        while True:
+            data = await reader.readline()
+            if not data:
+                io.feed_eof()
+                return
+            data = _TELNET_COMMAND.sub(b"", data)
+            io.feed(data.decode("utf-8", errors="ignore").rstrip("\r\n"))
+
+    async def handle(self, reader, writer):
+        loop = asyncio.get_running_loop()
+        io = SocketIO(loop, writer, typewriter=self.typewriter, pauses=self.pauses)
+        done = loop.create_future()
+        self.active += 1
+        _start_session_thread(self._play, (io, loop, done))
+        pump = asyncio.create_task(self._pump_input(reader, io))
+        try:
+            await done
+        finally:
+            pump.cancel()
+            io.feed_eof()  # unblocks the game thread if we got here some other way
+            self.active -= 1
+            self.finished += 1
+            writer.close()
+            try:
+                await writer.wait_closed()
+            except ConnectionError:
+                pass
+
+    async def start(self, host=DEFAULT_HOST, port=DEFAULT_PORT, unix_path=None):
+        if unix_path:
+            return await asyncio.start_unix_server(self.handle, path=unix_path, backlog=LISTEN_BACKLOG)
+        return await asyncio.start_server(self.handle, host, port, backlog=LISTEN_BACKLOG)
+
+
+async def serve(host=DEFAULT_HOST, port=DEFAULT_PORT, unix_path=None, typewriter=False, pauses=True):
+    server = await GameServer(typewriter=typewriter, pauses=pauses).start(host, port, unix_path)
+    where = unix_path or f"{host}:{port}"
+    print(f"Arena open on {where}")
+    async with server:
+        await server.serve_forever()
+
+
+# ------------------- Load test client -------------------
+async def _bot(index, host, port, unix_path, seed, stats, max_answers=5000):
+    rng = random.Random(seed + index)
+    if unix_path:
+        reader, writer = await asyncio.open_unix_connection(unix_path, limit=1 << 20)
+    else:
+        reader, writer = await asyncio.open_connection(host, port, limit=1 << 20)
+    answered = 0
+    started = time.perf_counter()
+    sent_at = None
+    try:
+        while answered < max_answers:
+            try:
+                chunk = await reader.readuntil(PROMPT_MARK)
+            except asyncio.IncompleteReadError:
+                break  # run over, server hung up
+            if sent_at is not None:
+                stats["latencies"].append(time.perf_counter() - sent_at)
+            text = chunk.decode("utf-8", errors="ignore")
+            writer.write((bot_answer(text, rng, answered) + "\r\n").encode("utf-8"))
+            sent_at = time.perf_counter()
+            answered += 1
+            await writer.drain()
+        stats["completed"] += 1
+    except ConnectionError:
+        stats["errors"] += 1
+    finally:
+        stats["answers"] += answered
+        stats["durations"].append(time.perf_counter() - started)
+        writer.close()
+
+
+async def load_test(sessions=100, host=DEFAULT_HOST, port=DEFAULT_PORT, unix_path=None, seed=0):
+    """
+    Drive `sessions` scripted players at once against a running server.
+    Returns a summary dict (completed runs, answers, prompt latencies).
+    """
+    stats = {"completed": 0, "errors": 0, "answers": 0, "latencies": [], "durations": []}
+    start = time.perf_counter()
+    await asyncio.gather(*(_bot(i, host, port, unix_path, seed, stats) for i in range(sessions)))
+    seconds = time.perf_counter() - start
+
+    latencies = sorted(stats["latencies"]) or [0.0]
+    return {
+        "sessions": sessions,
+        "completed": stats["completed"],
+        "errors": stats["errors"],
+        "answers": stats["answers"],
+        "seconds": seconds,
+        "answers_per_second": stats["answers"] / seconds if seconds else 0.0,
+        "latency_p50": latencies[len(latencies) // 2],
+        "latency_p95": latencies[int(len(latencies) * 0.95)],
+        "longest_session": max(stats["durations"], default=0.0),
+    }
+
+
+async def _serve_and_load(sessions, seed, pauses):
+    game_server = GameServer(pauses=pauses)
+    server = await game_server.start(DEFAULT_HOST, 0)
+    port = server.sockets[0].getsockname()[1]
+    async with server:
+        summary = await load_test(sessions, port=port, seed=seed)
+    summary["failed_runs"] = game_server.failed
+    return summary
+
+
+# ----------------------------------------------------------------------
+# Entry point
+# ----------------------------------------------------------------------
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Multi-player arena server")
+    parser.add_argument("--host", default=DEFAULT_HOST)
+    parser.add_argument("--port", type=int, default=DEFAULT_PORT)
+    parser.add_argument("--unix", help="listen on a Unix socket path instead of TCP")
+    parser.add_argument("--typewriter", action="store_true", help="slow-print text to players")
+    parser.add_argument("--no-pauses", action="store_true", help="skip the game's dramatic pauses")
+    parser.add_argument("--local-negotiator", action="store_true", help="shopkeepers use the rule engine only")
+    parser.add_argument("--load-test", type=int, metavar="N", help="run N scripted players against an in-process server")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    if args.local_negotiator or args.load_test:
+        set_backend(LocalRuleBackend())
+
+    if args.load_test:
+        summary = asyncio.run(_serve_and_load(args.load_test, args.seed, not args.no_pauses))
+        for key, value in summary.items():
+            print(f"{key:>18}: {value:.3f}" if isinstance(value, float) else f"{key:>18}: {value}")
+    else:
+        asyncio.run(serve(args.host, args.port, args.unix, args.typewriter, not args.no_pauses))
@@ -1,43 +1,179 @@
-import google.generativeai as genai
-from dotenv import load_dotenv
-import os
-import random
+import re
 import time
-from UI import slow_print
+from UI import now, slow_print, slow_stream, timed_input, write_line
+from Instrumentation import record, timed
+from Telemetry import get_telemetry, negotiation_call
+from Backends import DeadlineExceeded, NegotiationTurn, Reply, call_before, get_backend, is_cacheable, stream_before
+from Prefetcher import ReplyPrefetcher, likely_offers
+from ResponseCache import DiskCache, ResponseCache, negotiation_key
+import Rng
+
+# Mood tops out here: "Refuses to negotiate further"
+MAX_STEPS = 7
+
+# Shared reply cache (memory LRU + on-disk store), opened on first use
+_response_cache = None
+
+
+def get_response_cache():
+    global _response_cache
+    if _response_cache is None:
+        _response_cache = ResponseCache(disk=DiskCache())
+    return _response_cache
+
+
+def set_response_cache(cache):
+    """Use a different cache for every new Shopkeeper (e.g. memory-only)."""
+    global _response_cache
+    _response_cache = cache
+
+
+def mood_for(step):
+    """Mood tier for negotiation step number `step` (patience runs out)."""
+    if step <= 2:
+        return "Default personality"
+    elif step <= 4:
+        return "Slightly annoyed"
+    elif step <= 6:
+        return "Very annoyed"
+    return "Refuses to negotiate further"
+
+
+# ------------------- Streaming helper -------------------
+class DecisionFilter:
+    """
+    Passes streamed reply text through for display, minus the
+    "DECISION: ..." line, and trims surrounding blank space the same
+    way the non-streaming path does with strip().
+
+    A partial line is held only while it could still turn out to be
+    the DECISION line, so normal text reaches the screen immediately.
+    """
+
+    MARKER = "DECISION:"
+
+    def __init__(self):
+        self._raw = []
+        self._line = ""           # current (unfinished) line
+        self._line_shown = 0      # how much of it was already displayed
+        self._started = False     # any visible text yet?
+        self._newlines = 0        # line breaks waiting for more text
+
+    def _show(self, text, out):
+        if not self._started:
+            text = text.lstrip()
+            if not text:
+                return
+            self._started = True
+        elif self._newlines:
+            out.append("\n" * self._newlines)
+        self._newlines = 0
+        out.append(text)
+
+    def _could_be_marker(self, line):
+        head = line.strip().upper()
+        return self.MARKER.startswith(head) or head.startswith(self.MARKER)
+
+    def _end_line(self, out):
+        line, shown = self._line, self._line_shown
+        self._line, self._line_shown = "", 0
+        if shown:
+            if line[shown:]:
+                out.append(line[shown:])
+        elif line.strip().upper().startswith(self.MARKER) or not line.strip():
+            if self._started and not line.strip():
+                self._newlines += 1
+            return
+        else:
+            self._show(line, out)
+        self._newlines += 1
+
+    def feed(self, chunk):
+        """Add streamed text; returns whatever can be displayed now."""
+        self._raw.append(chunk)
+        out = []
+        pieces = chunk.split("\n")
+        for i, piece in enumerate(pieces):
+            self._line += piece
+            if i < len(pieces) - 1:
+                self._end_line(out)
+
+        # Show the unfinished line unless it might still be the DECISION line
+        if self._line_shown:
+            new_text = self._line[self._line_shown:]
+            if new_text:
+                out.append(new_text)
+                self._line_shown = len(self._line)
+        elif self._line.strip() and not self._could_be_marker(self._line):
+            before = len(out)
+            self._show(self._line, out)
+            if len(out) > before:
+                self._line_shown = len(self._line)
+        return "".join(out)
+
+    def close(self):
+        """End of stream: flush anything still held that isn't the decision."""
+        out = []
+        if self._line:
+            self._end_line(out)
+        return "".join(out)
+
+    def text(self):
+        """The complete reply exactly as the model sent it (stripped)."""
+        return "".join(self._raw).strip()
+
+
+# ------------------- Negotiation session -------------------
+class NegotiationSession:
+    """
+    State of one haggle over one item. Each shop visit gets its own, so
+    any number of sessions can share a Shopkeeper, cache and backend.
+    """
+
+    def __init__(self, item_name, price, cache):
+        self.item_name = item_name
+        self.price = price            # hidden base price for this visit
+        self.step = 0                 # rough 'patience / mood' counter
+        self.last_counter_offer = None
+        self.is_accepted = False
+        # Background guesses at the next reply while the player types
+        self.prefetcher = ReplyPrefetcher(cache)
 
-# ------------------- Setup -------------------
-load_dotenv()
-genai.configure(api_key=os.getenv("GEMINI_API_KEY"))
+    @property
+    def mood(self):
+        return mood_for(self.step)
 
-# global negotiation counter
-var = 0
+    @property
+    def out_of_patience(self):
+        return self.step >= MAX_STEPS
 
 
 # ------------------- Shopkeeper Class -------------------
 class Shopkeeper:
-    def __init__(self, name, personality):
+    def __init__(self, name, personality, cache=None, backend=None, stream=False, telemetry=None):
         self.name = name
         self.personality = personality
-        self.is_accepted = False
-        self.last_counter_offer = None
-
-    def negotiate(self, item_name, price, offer, prevoffer):
+        # Near-identical haggles reuse a cached reply instead of a new LLM call
+        self.cache = cache if cache is not None else get_response_cache()
+        # None = the process-wide backend from Backends.get_backend()
+        self.backend = backend
+        # Stream replies to the screen as they are generated
+        self.stream = stream
+        # Per-call NegotiationTelemetry; None = the current game session's
+        # (Telemetry.use_telemetry), if it has one
+        self.telemetry = telemetry
+
+    def new_session(self, item_name, price):
+        return NegotiationSession(item_name, price, self.cache)
+
+    def _build_step(self, session, step, offer, prevoffer):
         """
-        One negotiation step with the LLM.
-        Uses global var as a rough 'patience / mood' counter.
+        Build the prompt for negotiation step number `step` of `session`
+        without changing any state. Returns (prompt, cache_key, turn).
         """
-        global var
-        var += 1
-        catch = random.choice(self.personality["catchphrases"])
-
-        if var <= 2:
-            mood = "Default personality"
-        elif var <= 4:
-            mood = "Slightly annoyed"
-        elif var <= 6:
-            mood = "Very annoyed"
-        else:
-            mood = "Refuses to negotiate further"
+        item_name, price = session.item_name, session.price
+        catch = Rng.stream(Rng.DIALOGUE).choice(self.personality["catchphrases"])
+        mood = mood_for(step)
 
         prompt = f"""
         You are a shopkeeper named {self.name}.
@@ -47,7 +183,7 @@ class Shopkeeper:
         Current mood: {mood}.
 
         The player is offering {offer} gold for a {item_name}, base price {price} gold.
-        Previous counter-offer you made: {self.last_counter_offer if self.last_counter_offer else "None"}.
+        Previous counter-offer you made: {session.last_counter_offer if session.last_counter_offer else "None"}.
         Respond in character and negotiate naturally.
         Be polite or aggressive depending on your personality.
         Also consider the player's previous offer {prevoffer}. If it's 0 disregard it.
@@ -62,46 +198,198 @@ class Shopkeeper:
         The entire decision must be on that single line.
         """
 
-        model = genai.GenerativeModel("gemini-2.5-flash")
-        response = model.generate_content(prompt)
-        text = response.text.strip()
+        cache_key = negotiation_key(
+            self.personality["name"], mood, item_name, price, offer, session.last_counter_offer
+        )
+        turn = NegotiationTurn(
+            self.name, self.personality, mood, step, item_name, price,
+            offer, prevoffer, session.last_counter_offer, catch,
+        )
+        return prompt, cache_key, turn
+
+    def _begin_step(self, session, offer, prevoffer):
+        """Advance the session's patience counter and build this step's prompt."""
+        session.step += 1
+        return self._build_step(session, session.step, offer, prevoffer)
+
+    def _uses_cache(self):
+        """False for exact backends (the rule engine) that opt out of the reply cache."""
+        return getattr(self._backend(), "cacheable", True)
+
+    def _lookup(self, session, cache_key, deadline=None):
+        """Reply already known for this step (cache or finished speculation)."""
+        if not self._uses_cache():
+            return None
+        timeout = None if deadline is None else max(0.0, deadline - time.perf_counter())
+        text = session.prefetcher.take(cache_key, timeout)
+        if text is None:
+            text = self.cache.get(cache_key)
+        return text
 
+    def speculate(self, session, offer):
+        """
+        While the player thinks about a new offer, start generating
+        replies for the offers they are most likely to make.
+        """
+        if not self._uses_cache():
+            return  # nothing to gain: the guesses could never be served
+        requests = []
+        for guess in likely_offers(offer, session.last_counter_offer):
+            prompt, cache_key, turn = self._build_step(session, session.step + 1, guess, offer)
+            requests.append((cache_key, prompt, turn))
+        session.prefetcher.speculate(requests, self._backend().generate)
+
+    def _apply_reply(self, session, text):
+        """
+        Update counter-offer / acceptance from a full reply. Returns the
+        counter-offer found in this reply (None if it named no number).
+        """
         # Remember last counter-offer by scraping a number from the text
-        import re
-
         numbers = re.findall(r"\d+", text)
-        if numbers:
-            self.last_counter_offer = int(numbers[-1])
+        counter_offer = int(numbers[-1]) if numbers else None
+        if counter_offer is not None:
+            session.last_counter_offer = counter_offer
 
         # Detect acceptance ONLY from the final decision line
         lines = text.splitlines()
         decision_line = lines[-1].strip().lower() if lines else ""
 
         if "decision: accept" in decision_line:
-            self.is_accepted = True
+            session.is_accepted = True
         else:
-            self.is_accepted = False
+            session.is_accepted = False
+        return counter_offer
+
+    def _report(self, session, offer, prompt, text, counter_offer, latency, cached, streamed):
+        """Hand one finished step to the negotiation telemetry, if any."""
+        telemetry = self.telemetry if self.telemetry is not None else get_telemetry()
+        if telemetry is not None:
+            telemetry.add(negotiation_call(
+                self, session, offer, prompt, text, counter_offer, latency, cached, streamed,
+            ))
 
+    def _backend(self):
+        return self.backend if self.backend is not None else get_backend()
+
+    def negotiate(self, session, offer, prevoffer, deadline=None):
+        """
+        One negotiation step with the backend. Returns the full reply text.
+        With a time.perf_counter() `deadline`, raises DeadlineExceeded
+        instead of waiting past it.
+        """
+        prompt, cache_key, turn = self._begin_step(session, offer, prevoffer)
+
+        started = time.perf_counter()
+        with timed("llm"):
+            cached = self._lookup(session, cache_key, deadline)
+            if cached is not None:
+                text = cached
+            elif deadline is None:
+                text = self._backend().generate(prompt, turn)
+            else:
+                text = call_before(deadline, self._backend().generate, prompt, turn)
+        latency = time.perf_counter() - started
+        if cached is None and self._uses_cache() and is_cacheable(text):
+            self.cache.put(cache_key, text)
+
+        with timed("parse"):
+            counter_offer = self._apply_reply(session, text)
+        self._report(session, offer, prompt, text, counter_offer, latency, cached is not None, False)
         return text
 
+    def negotiate_stream(self, session, offer, prevoffer, deadline=None):
+        """
+        Streaming version of negotiate(): yields displayable text as the
+        model produces it. The trailing DECISION line is held back and
+        only parsed once the stream ends. Past `deadline` the stream is
+        cancelled and DeadlineExceeded raised.
+        """
+        prompt, cache_key, turn = self._begin_step(session, offer, prevoffer)
+        reply = DecisionFilter()
+
+        # Waiting on the model and parsing its reply, summed over the
+        # stream (time spent displaying the pieces is the caller's)
+        started = time.perf_counter()
+        cached = self._lookup(session, cache_key, deadline)
+        if cached is not None:
+            chunks = iter([cached])
+        elif deadline is None:
+            chunks = iter(self._backend().stream(prompt, turn))
+        else:
+            chunks = iter(stream_before(self._backend().stream(prompt, turn), deadline))
+        llm_seconds = time.perf_counter() - started
+        parse_seconds = 0.0
+        # The last chunk that reported token counts has the totals
+        usage = None
+        # Any fallback piece keeps the whole reply out of the cache
+        cacheable = True
+
+        while True:
+            started = time.perf_counter()
+            chunk = next(chunks, None)
+            fetched = time.perf_counter()
+            llm_seconds += fetched - started
+            if chunk is None:
+                break
+            if getattr(chunk, "prompt_tokens", None) is not None:
+                usage = chunk
+            cacheable = cacheable and is_cacheable(chunk)
+            visible = reply.feed(chunk)
+            parse_seconds += time.perf_counter() - fetched
+            if visible:
+                yield visible
+        record("llm", llm_seconds)
+
+        started = time.perf_counter()
+        visible = reply.close()
+        parse_seconds += time.perf_counter() - started
+        if visible:
+            yield visible
+
+        started = time.perf_counter()
+        text = reply.text()
+        if cached is None and cacheable and self._uses_cache():
+            self.cache.put(cache_key, text)
+        counter_offer = self._apply_reply(session, text)
+        record("parse", parse_seconds + time.perf_counter() - started)
+
+        if usage is not None:
+            text = Reply(text, usage.prompt_tokens, usage.response_tokens)
+        self._report(session, offer, prompt, text, counter_offer, llm_seconds, cached is not None, True)
+
+    def _ask(self, prompt, deadline):
+        """Player input that raises DeadlineExceeded once the visit is out of time."""
+        answer = timed_input(prompt, max(0.0, deadline - now()))
+        if answer is None:
+            raise DeadlineExceeded
+        return answer
+
+    def _wall_deadline(self, deadline):
+        """Game-clock deadline -> time.perf_counter() deadline for backend calls."""
+        return time.perf_counter() + max(0.0, deadline - now())
+
+    def _time_up(self):
+        # Time out flavor – this is the ONLY closing line for timeout
+        slow_print(
+            f'\n{self.name}: "If you stare any longer, I\'ll start charging for the view. '
+            'Come back when you can decide."',
+            delay=0.02,
+        )
+
     def sell(self, character, round_number, time_limit_seconds=60):
         """
         Run one shop visit:
           - Player picks an item
           - Negotiation loop with:
-              * max 7 steps (global 'var')
-              * hard time limit (time_limit_seconds)
+              * max 7 steps (tracked per visit in a NegotiationSession)
+              * hard time limit (time_limit_seconds) for the whole visit,
+                enforced on every prompt and every backend call
           - Item has a randomized hidden "base price" for this visit,
             which scales aggressively with the current round_number.
           - On purchase, the item grants a stat buff that scales much more
             slowly than price (every few rounds) and prints a clear "+X" message.
           - Returns True if player bought something, False otherwise.
         """
-        global var
-        var = 0
-        self.is_accepted = False
-        self.last_counter_offer = None
-
         # Make sure round_number is at least 1
         tier = max(1, int(round_number))
 
@@ -111,6 +399,9 @@ class Shopkeeper:
         step_price = max(0, tier - 1)          # 0,1,2,3,...
         step_stats = max(0, (tier - 1) // 3)   # 0 for rounds 1–3, 1 for 4–6, etc.
 
+        # Game-clock deadline (UI.now), so scripted runs can fast-forward it
+        deadline = now() + time_limit_seconds
+
         slow_print(
             f'{self.name}: "Welcome, traveler! Take a look at my wares."',
             delay=0.02,
@@ -118,12 +409,15 @@ class Shopkeeper:
         for i, itm in enumerate(ITEMS, 1):
             slow_print(f"{i}. {itm['name']}", delay=0.01)
 
-        print()
+        write_line()
 
         try:
-            choice = int(input("Enter the number of the item you want to buy: ")) - 1
-            offer = int(input("How much gold do you offer? \n"))
-            print()
+            choice = int(self._ask("Enter the number of the item you want to buy: ", deadline)) - 1
+            offer = int(self._ask("How much gold do you offer? \n", deadline))
+            write_line()
+        except DeadlineExceeded:
+            self._time_up()
+            return False
         except ValueError:
             slow_print(
                 "You mumble something unintelligible. The merchant just sighs.",
@@ -146,44 +440,56 @@ class Shopkeeper:
         # Random range: 80% - 160% of the scaled base price, at least 1–2 gold wide
         min_hidden = max(1, int(base_price * 0.8))
         max_hidden = max(min_hidden + 1, int(base_price * 1.6))
-        hidden_price = random.randint(min_hidden, max_hidden)
+        hidden_price = Rng.stream(Rng.SHOP).randint(min_hidden, max_hidden)
+        session = self.new_session(selected_item["name"], hidden_price)
 
-        shop_entry_time = time.perf_counter()
         purchased = False
         ended_with_custom_line = False  # prevents double closing messages
 
-        while not self.is_accepted and var <= 7:
-            now = time.perf_counter()
-            elapsed = now - shop_entry_time
-
-            if elapsed >= time_limit_seconds:
-                # Time out flavor – this is the ONLY closing line for timeout
-                slow_print(
-                    f'\n{self.name}: "If you stare any longer, I\'ll start charging for the view. '
-                    'Come back when you can decide."',
-                    delay=0.02,
-                )
+        while not session.is_accepted and session.step <= MAX_STEPS:
+            if now() >= deadline:
+                self._time_up()
                 ended_with_custom_line = True
                 break
 
-            response_text = self.negotiate(
-                selected_item["name"],
-                hidden_price,  # scaled, randomized hidden base price for the LLM
-                offer,
-                prevoffer,
-            )
+            try:
+                if self.stream:
+                    # Text reaches the screen while the model is still writing
+                    slow_stream(
+                        self.negotiate_stream(
+                            session,
+                            offer,
+                            prevoffer,
+                            self._wall_deadline(deadline),
+                        ),
+                        delay=0.01,
+                        prefix=f"{self.name}: ",
+                    )
+                else:
+                    response_text = self.negotiate(
+                        session,
+                        offer,
+                        prevoffer,
+                        self._wall_deadline(deadline),
+                    )
+            except DeadlineExceeded:
+                # The shopkeeper was still talking when time ran out
+                self._time_up()
+                ended_with_custom_line = True
+                break
             prevoffer = offer
 
-            # Strip off the DECISION line before showing text to the player
-            lines = response_text.splitlines()
-            if lines and lines[-1].strip().upper().startswith("DECISION:"):
-                display_text = "\n".join(lines[:-1]).strip()
-            else:
-                display_text = response_text
+            if not self.stream:
+                # Strip off the DECISION line before showing text to the player
+                lines = response_text.splitlines()
+                if lines and lines[-1].strip().upper().startswith("DECISION:"):
+                    display_text = "\n".join(lines[:-1]).strip()
+                else:
+                    display_text = response_text
 
-            slow_print(f"{self.name}: {display_text}", delay=0.01)
+                slow_print(f"{self.name}: {display_text}", delay=0.01)
 
-            if self.is_accepted:
+            if session.is_accepted:
                 if character.money >= offer:
                     character.money -= offer
                     if not hasattr(character, "inventory"):
@@ -226,8 +532,8 @@ class Shopkeeper:
                     ended_with_custom_line = True
                 break
 
-            # Mood hard cap: var == 7 means 'Refuses to negotiate further'
-            if var >= 7:
+            # Mood hard cap: step 7 means 'Refuses to negotiate further'
+            if session.out_of_patience:
                 slow_print(
                     f'{self.name}: "Enough! Haggling with you is costing me coin. Out."',
                     delay=0.02,
@@ -235,8 +541,13 @@ class Shopkeeper:
                 ended_with_custom_line = True
                 break
 
+            self.speculate(session, offer)
             try:
-                offer = int(input("Make a new offer: \n"))
+                offer = int(self._ask("Make a new offer: \n", deadline))
+            except DeadlineExceeded:
+                self._time_up()
+                ended_with_custom_line = True
+                break
             except ValueError:
                 slow_print(
                     f'{self.name}: "If you can\'t count your own gold, we\'re done here."',
@@ -245,10 +556,13 @@ class Shopkeeper:
                 ended_with_custom_line = True
                 break
 
+        # Nobody will ask for the remaining guesses
+        session.prefetcher.close()
+
         # Generic "we're done" line, only if we DIDN'T already show a custom one
         if (
             not purchased
-            and not self.is_accepted
+            and not session.is_accepted
             and not ended_with_custom_line
         ):
             slow_print(
@@ -265,6 +579,12 @@ greedy = {
     "description": "Always trying to get the most money possible (within reason). Will gladly accept if you go over his offer.",
     "style": "Arrogant and quick-witted.",
     "catchphrases": ["Nice try, kid.", "You thought you had me, huh?"],
+    # Local rule engine: asks 140% of the hidden price, concedes 5% per
+    # step, never goes below 110%
+    "opening_ratio": 1.4,
+    "accept_ratio": 1.1,
+    "concession": 0.05,
+    "tone": "arrogant",
 }
 
 polite = {
@@ -275,6 +595,12 @@ polite = {
         "I'm sure we can work something out.",
         "Good luck on your adventure!",
     ],
+    # Local rule engine: asks 115% of the hidden price, concedes 10% per
+    # step, will go down to 90%
+    "opening_ratio": 1.15,
+    "accept_ratio": 0.9,
+    "concession": 0.1,
+    "tone": "warm",
 }
 
 PERSONALITIES = [greedy, polite]
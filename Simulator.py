@@ -0,0 +1,320 @@
+# Simulator.py
+
+from bisect import bisect
+from contextlib import nullcontext
+
+import Rng
+from Characters import Character, EnemyPool, create_enemy, enemy_templates
+from Combat import ACTION_CODES, ENEMY_SAMPLERS, Combat
+from CombatTable import PAIR_COUNT, VIGOR_CAP, table_for
+
+# Same menus the player sees in Combat._get_player_action_*:
+# with 2+ Vigor only the specials (and Feint) are offered.
+BASIC_ACTIONS = ("attack", "block", "feint")
+VIGOR_ACTIONS = ("heavy_attack", "fortify", "feint")
+
+
+# ------------------------
+# PLAYER POLICIES
+# ------------------------
+# A policy is any callable policy(player, enemy) -> action string.
+# It replaces input() in the interactive menus. Illegal answers are
+# treated exactly like a fumbled menu choice: the player defaults to Block.
+
+def random_policy(player, enemy):
+    """Picks uniformly among whatever the menu offers this turn."""
+    if player.vigor >= 2:
+        return Rng.stream(Rng.PLAYER_POLICY).choice(VIGOR_ACTIONS)
+    return Rng.stream(Rng.PLAYER_POLICY).choice(BASIC_ACTIONS)
+
+
+def aggressive_policy(player, enemy):
+    """Always swings: Heavy Attack when possible, Attack otherwise."""
+    if player.vigor >= 2:
+        return "heavy_attack"
+    return "attack"
+
+
+def defensive_policy(player, enemy):
+    """Always turtles: Fortify when possible, Block otherwise."""
+    if player.vigor >= 2:
+        return "fortify"
+    return "block"
+
+
+def fixed_policy(action):
+    """Build a policy that always answers `action` (may fall back to Block)."""
+    def policy(player, enemy):
+        return action
+    return policy
+
+
+# Policies that only look at whether the player has 2+ Vigor, as
+# (move without Vigor, move with Vigor) pickers taking the PLAYER_POLICY
+# stream. Compiled mode plays these straight off the table state.
+VIGOR_ONLY_POLICIES = {
+    random_policy: (
+        lambda rng: rng.choice(BASIC_ACTIONS),
+        lambda rng: rng.choice(VIGOR_ACTIONS),
+    ),
+    aggressive_policy: (lambda rng: "attack", lambda rng: "heavy_attack"),
+    defensive_policy: (lambda rng: "block", lambda rng: "fortify"),
+}
+
+
+# ------------------------
+# PLAYER FACTORY
+# ------------------------
+def new_player(name="Simulated Challenger"):
+    """Fresh player with the same starting stats as GameController.run."""
+    return Character(name=name, health=15, money=0, armor=5, damage=5)
+
+
+class Simulator:
+    """
+    Headless battle engine.
+
+    Uses the real Combat.resolve_turn and Combat._get_enemy_action rules,
+    but replaces input()/slow_print/time.sleep with a player policy and
+    plain return values, so thousands of fights run per second.
+    """
+
+    def __init__(self, policy=random_policy, max_turns=500, compiled=False, vigor_cap=VIGOR_CAP, seed=None, hard_mode=False):
+        # hard_mode: enemies play the solved optimal strategy (see Solver.py),
+        # solved before each battle so every turn of it is optimal
+        self.combat = Combat(hard_mode=hard_mode, solve_in_background=False)
+        self.policy = policy
+        # Safety valve: two turtling fighters could parry forever
+        self.max_turns = max_turns
+        # Compiled mode walks a precomputed CombatTable instead of
+        # calling resolve_turn (Vigor saturates at vigor_cap there).
+        # It is only faster for VIGOR_ONLY_POLICIES against the regular
+        # AI; anything else still goes through the Character objects.
+        self.compiled = compiled
+        self.vigor_cap = vigor_cap
+        self.enemy_pool = EnemyPool()
+        # With a seed, every battle draws from this simulator's own
+        # Rng streams, so results are reproducible and parallel
+        # simulators (see Rng.RngRegistry.spawn) never overlap
+        self.rng = Rng.RngRegistry(seed) if seed is not None else None
+
+    def _random(self):
+        return Rng.use_registry(self.rng) if self.rng is not None else nullcontext()
+
+    # ------------------------
+    # SINGLE BATTLE
+    # ------------------------
+    def choose_player_action(self, player, enemy):
+        """Headless stand-in for Combat._get_player_action (same Vigor costs)."""
+        action = self.policy(player, enemy)
+
+        if player.vigor >= 2:
+            if action in ("heavy_attack", "fortify"):
+                player.vigor = max(0, player.vigor - 2)
+                return action
+            if action == "feint":
+                return action
+            return "block"
+
+        if action in BASIC_ACTIONS:
+            return action
+        return "block"
+
+    def run_battle(self, player, enemy):
+        """
+        Fight until one side drops, mirroring Combat.run_battle.
+
+        Returns (result, turns) where result is "enemy_dead",
+        "player_dead", "double_ko" or "timeout" (max_turns reached).
+        Gold loot is paid out on a win exactly like the real battle.
+        """
+        with self._random():
+            self.combat.begin_battle(player, enemy)
+            if self.compiled:
+                turns = self._fight_compiled(player, enemy)
+            else:
+                turns = self._fight(player, enemy)
+            return self._finish_battle(player, enemy), turns
+
+    def _fight(self, player, enemy):
+        combat = self.combat
+        turns = 0
+
+        while player.health > 0 and enemy.health > 0:
+            if turns >= self.max_turns:
+                break
+            turns += 1
+
+            # Enemy first, like Combat.run_battle (pre-turn Vigor for both)
+            enemy_action = combat._get_enemy_action(enemy, player)
+            player_action = self.choose_player_action(player, enemy)
+            combat.apply_turn(player, enemy, player_action, enemy_action)
+
+        return turns
+
+    def _fight_compiled(self, player, enemy):
+        """
+        Same fight, but each turn is a TransitionTable lookup.
+
+        Enemy moves come straight from the compiled ActionSampler for the
+        table's Vigor state, and so do the player's for VIGOR_ONLY_POLICIES,
+        drawing the same numbers in the same order as the slow path. Any
+        other policy (or a hard-mode enemy) needs the live Character
+        objects, which are then refreshed from the table every turn.
+        """
+        table = table_for(player, enemy, self.vigor_cap)
+        picks = VIGOR_ONLY_POLICIES.get(self.policy)
+        if picks is None or self.combat.solution is not None:
+            combat_index, vigor_index, turns = self._walk_live(table, player, enemy)
+        else:
+            combat_index, vigor_index, turns = self._walk_table(
+                table, picks, getattr(enemy, "preferred_action", None)
+            )
+
+        # Health ends clamped at 0
+        player.health, player.armor, enemy.health, enemy.armor = table.combat_states[combat_index]
+        player.vigor, enemy.vigor = divmod(vigor_index, table.vigor_cap + 1)
+        return turns
+
+    def _walk_table(self, table, picks, preferred_action):
+        """Play the table without touching any Character: (combat, vigor, turns)."""
+        next_combat = table.next_combat
+        next_vigor = table.next_vigor
+        terminal = table.terminal
+        side = table.vigor_cap + 1
+        max_turns = self.max_turns
+        pick_basic, pick_vigor = picks
+        enemy_basic = ENEMY_SAMPLERS.get((preferred_action, False)) or ENEMY_SAMPLERS[(None, False)]
+        enemy_vigor = ENEMY_SAMPLERS.get((preferred_action, True)) or ENEMY_SAMPLERS[(None, True)]
+        enemy_rng = Rng.stream(Rng.ENEMY_AI)
+        player_rng = Rng.stream(Rng.PLAYER_POLICY)
+
+        combat_index = 0
+        vigor_index = table.start
+        turns = 0
+        while not terminal[combat_index] and turns < max_turns:
+            turns += 1
+            p_vigor, e_vigor = divmod(vigor_index, side)
+
+            # Enemy first, like Combat.run_battle; the table pays for specials
+            sampler = enemy_vigor if e_vigor >= 2 else enemy_basic
+            enemy_code = sampler.codes[bisect(sampler.cum_weights, enemy_rng.random() * sampler.total, 0, sampler.hi)]
+            player_action = pick_vigor(player_rng) if p_vigor >= 2 else pick_basic(player_rng)
+
+            pair = ACTION_CODES[player_action] * 5 + enemy_code
+            combat_index = next_combat[combat_index * PAIR_COUNT + pair]
+            vigor_index = next_vigor[vigor_index * PAIR_COUNT + pair]
+        return combat_index, vigor_index, turns
+
+    def _walk_live(self, table, player, enemy):
+        """
+        Play the table, refreshing the live Character objects from the
+        state before the policy / enemy AI look at them each turn.
+        """
+        combat_states = table.combat_states
+        next_combat = table.next_combat
+        next_vigor = table.next_vigor
+        terminal = table.terminal
+        side = table.vigor_cap + 1
+
+        combat_index = 0
+        vigor_index = table.start
+        turns = 0
+        while not terminal[combat_index]:
+            if turns >= self.max_turns:
+                break
+            turns += 1
+
+            player.health, player.armor, enemy.health, enemy.armor = combat_states[combat_index]
+            player.vigor, enemy.vigor = divmod(vigor_index, side)
+
+            enemy_code = ACTION_CODES[self.combat._get_enemy_action(enemy, player)]
+            pair = ACTION_CODES[self.choose_player_action(player, enemy)] * 5 + enemy_code
+            combat_index = next_combat[combat_index * PAIR_COUNT + pair]
+            vigor_index = next_vigor[vigor_index * PAIR_COUNT + pair]
+        return combat_index, vigor_index, turns
+
+    def _finish_battle(self, player, enemy):
+        if player.health > 0 and enemy.health > 0:
+            return "timeout"
+        if player.health <= 0 and enemy.health <= 0:
+            return "double_ko"
+        if player.health <= 0:
+            return "player_dead"
+
+        gold_min = getattr(enemy, "gold_min", 0)
+        gold_max = getattr(enemy, "gold_max", 0)
+        if gold_max > gold_min:
+            gold_loot = Rng.stream(Rng.LOOT).randint(gold_min, gold_max)
+        else:
+            gold_loot = gold_min
+        player.money += gold_loot
+        return "enemy_dead"
+
+    # ------------------------
+    # BATCHES
+    # ------------------------
+    def run_battles(self, count, round_counter=0, template=None, player_factory=new_player):
+        """
+        Run `count` independent fresh-player battles against enemies from
+        Characters.create_enemy (optionally pinned to one template).
+
+        Returns a summary dict with result counts, win rate,
+        average turns and average gold looted.
+        """
+        results = {"enemy_dead": 0, "player_dead": 0, "double_ko": 0, "timeout": 0}
+        total_turns = 0
+        total_gold = 0
+
+        with self._random():
+            for _ in range(count):
+                player = player_factory()
+                enemy = create_enemy(round_counter, template, pool=self.enemy_pool)
+                result, turns = self.run_battle(player, enemy)
+                self.enemy_pool.release(enemy)
+                results[result] += 1
+                total_turns += turns
+                total_gold += player.money
+
+        return {
+            "battles": count,
+            "results": results,
+            "win_rate": results["enemy_dead"] / count if count else 0.0,
+            "avg_turns": total_turns / count if count else 0.0,
+            "avg_gold": total_gold / count if count else 0.0,
+        }
+
+    def balance_table(self, rounds, count, player_factory=new_player):
+        """
+        Win rate of a fresh player vs every enemy template for each round.
+
+        Returns {template_name: {fight_index: summary_dict}}.
+        """
+        table = {}
+        for template in enemy_templates:
+            per_round = {}
+            for fight_index in rounds:
+                per_round[fight_index] = self.run_battles(
+                    count,
+                    round_counter=fight_index - 1,
+                    template=template,
+                    player_factory=player_factory,
+                )
+            table[template["name"]] = per_round
+        return table
+
+
+# ----------------------------------------------------------------------
+# Entry point: quick balance printout
+# ----------------------------------------------------------------------
+if __name__ == "__main__":
+    sim = Simulator(policy=random_policy)
+    table = sim.balance_table(rounds=range(1, 9), count=2000)
+    for name, per_round in table.items():
+        print(name)
+        for fight_index, summary in per_round.items():
+            print(
+                f"  Round {fight_index:>2}: win {summary['win_rate']:6.1%} | "
+                f"avg turns {summary['avg_turns']:5.2f} | "
+                f"avg gold {summary['avg_gold']:6.2f}"
+            )
@@ -0,0 +1,470 @@
+# Solver.py
+
+import argparse
+import json
+import os
+import threading
+import zlib
+from array import array
+from concurrent.futures import Future
+from functools import lru_cache
+
+import Rng
+from Characters import create_enemy, enemy_templates, spawn_table
+from CombatTable import PAIR_COUNT, VIGOR_CAP, compile_table, table_for
+from Combat import ACTION_CODES
+from Simulator import BASIC_ACTIONS, VIGOR_ACTIONS, new_player
+
+# Value iteration stops once no state moves by more than this
+TOLERANCE = 1e-6
+
+# Sweep cap per combat state. A few endgame positions only converge
+# sublinearly (the winning line needs ever longer Vigor cycles); values
+# grow from below, so stopping early slightly under-states the player.
+MAX_SWEEPS = 200
+
+# Strategies are stored as 0..255 weights per action
+STRATEGY_SCALE = 255
+
+# How many solved matchups to keep around (one per stat signature)
+SOLUTION_CACHE_SIZE = 32
+
+# Background requests waiting for the solver thread; older ones (stale
+# guesses at a fight that already happened) are dropped past this
+MAX_PENDING_SOLVES = 8
+
+# Exported lookup tables (see export_tables); solution_for loads from
+# here before falling back to solving on the spot
+SOLUTION_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "solutions")
+
+_EPS = 1e-12
+
+
+# ------------------------
+# MATRIX GAMES
+# ------------------------
+def _pure_saddle(matrix):
+    """(value, row, col) if the game has a pure saddle point, else None."""
+    row_mins = [min(row) for row in matrix]
+    col_maxes = [max(column) for column in zip(*matrix)]
+    lower = max(row_mins)
+    upper = min(col_maxes)
+    if upper - lower > _EPS:
+        return None
+    return lower, row_mins.index(lower), col_maxes.index(upper)
+
+
+def _simplex(matrix):
+    """
+    Mixed-strategy solve of a matrix game with no pure saddle point.
+
+    Standard LP form: shift payoffs positive, then
+        maximize sum(y) subject to A y <= 1, y >= 0
+    The column strategy is y / sum(y); the row strategy is the dual,
+    read off the slack columns of the objective row.
+    """
+    rows = len(matrix)
+    cols = len(matrix[0])
+    shift = 1.0 - min(min(row) for row in matrix)
+    width = cols + rows + 1
+    tableau = []
+    for i, row in enumerate(matrix):
+        line = [value + shift for value in row] + [0.0] * rows + [1.0]
+        line[cols + i] = 1.0
+        tableau.append(line)
+    objective = [-1.0] * cols + [0.0] * (rows + 1)
+    basis = [cols + i for i in range(rows)]
+
+    while True:
+        # Bland's rule (lowest index first) so degenerate games can't cycle
+        entering = next((j for j in range(width - 1) if objective[j] < -_EPS), None)
+        if entering is None:
+            break
+        leaving = None
+        best = None
+        for i in range(rows):
+            coefficient = tableau[i][entering]
+            if coefficient > _EPS:
+                ratio = tableau[i][-1] / coefficient
+                if best is None or ratio < best - _EPS or (ratio <= best + _EPS and basis[i] < basis[leaving]):
+                    best = ratio
+                    leaving = i
+
+        pivot_row = tableau[leaving]
+        pivot = pivot_row[entering]
+        pivot_row[:] = [value / pivot for value in pivot_row]
+        for line in tableau + [objective]:
+            if line is not pivot_row:
+                factor = line[entering]
+                if factor:
+                    line[:] = [a - factor * b for a, b in zip(line, pivot_row)]
+        basis[leaving] = entering
+
+    total = objective[-1]
+    column_weights = [0.0] * cols
+    for i, variable in enumerate(basis):
+        if variable < cols:
+            column_weights[variable] = tableau[i][-1] / total
+    row_weights = [objective[cols + i] / total for i in range(rows)]
+    return 1.0 / total - shift, row_weights, column_weights
+
+
+@lru_cache(maxsize=1 << 16)
+def solve_matrix_game(matrix):
+    """
+    Optimal mixed strategies for a zero-sum game. `matrix` is a tuple of
+    rows holding the row player's payoff; rows maximize, columns minimize.
+
+    Returns (value, row_strategy, column_strategy). Memoized, since most
+    positions in a fight share the same handful of payoff matrices.
+    """
+    saddle = _pure_saddle(matrix)
+    if saddle is None:
+        value, row_mix, col_mix = _simplex(matrix)
+        return value, tuple(row_mix), tuple(col_mix)
+    value, row, col = saddle
+    return (
+        value,
+        tuple(1.0 if i == row else 0.0 for i in range(len(matrix))),
+        tuple(1.0 if j == col else 0.0 for j in range(len(matrix[0]))),
+    )
+
+
+def _menu(vigor):
+    """Actions offered at this Vigor (same menus as the player and enemy AI)."""
+    return VIGOR_ACTIONS if vigor >= 2 else BASIC_ACTIONS
+
+
+def _quantize(strategy):
+    """Probabilities -> 0..255 weights, never dropping an action in the support."""
+    weights = [round(p * STRATEGY_SCALE) for p in strategy]
+    for i, p in enumerate(strategy):
+        if p > 1e-6 and weights[i] == 0:
+            weights[i] = 1
+    if not any(weights):
+        weights[0] = STRATEGY_SCALE
+    return weights
+
+
+# ------------------------
+# SOLVED MATCHUP
+# ------------------------
+class Solution:
+    """
+    Optimal play for one TransitionTable.
+
+    values[i] is the player's win chance from state i when both sides
+    play optimally (double KOs and endless stalls count as not winning).
+    strategies holds six 0..255 weights per state: the player's mix over
+    its menu followed by the enemy's, in _menu(vigor) order.
+    """
+
+    def __init__(self, table, values, strategies, sweeps=0):
+        self.table = table
+        self.values = values
+        self.strategies = strategies
+        self.sweeps = sweeps
+        self._combat_index = None
+
+    @property
+    def win_probability(self):
+        """Theoretical win rate from the table's starting state."""
+        return self.values[self.table.start]
+
+    def index_of(self, player, enemy):
+        """State index for two live Characters (Vigor saturates at the cap)."""
+        if self._combat_index is None:
+            self._combat_index = {state: i for i, state in enumerate(self.table.combat_states)}
+        cap = self.table.vigor_cap
+        combat_index = self._combat_index[(max(0, player.health), player.armor, max(0, enemy.health), enemy.armor)]
+        return combat_index * self.table.vigor_span + min(cap, player.vigor) * (cap + 1) + min(cap, enemy.vigor)
+
+    def player_strategy(self, index):
+        """{action: probability} for the player at state `index`."""
+        return self._strategy(index, 0, self.table.state(index)[2])
+
+    def enemy_strategy(self, index):
+        """{action: probability} for the enemy at state `index`."""
+        return self._strategy(index, 3, self.table.state(index)[5])
+
+    def _strategy(self, index, offset, vigor):
+        weights = self.strategies[index * 6 + offset:index * 6 + offset + 3]
+        total = sum(weights)
+        return {action: weight / total for action, weight in zip(_menu(vigor), weights)}
+
+    def enemy_action(self, player, enemy):
+        """Sample the enemy's optimal move for the current state (O(1))."""
+        index = self.index_of(player, enemy)
+        base = index * 6 + 3
+        return Rng.stream(Rng.ENEMY_AI).choices(
+            _menu(enemy.vigor), weights=self.strategies[base:base + 3], k=1
+        )[0]
+
+    # ------------------------
+    # EXPORT
+    # ------------------------
+    def save(self, path):
+        """
+        Write the lookup table: one JSON header line (the stat signature),
+        then zlib-compressed float32 values and uint8 strategy weights.
+        """
+        header = {
+            "signature": self.table.signature,
+            "states": len(self.table),
+            "sweeps": self.sweeps,
+        }
+        values = array("f", self.values)
+        with open(path, "wb") as handle:
+            handle.write(json.dumps(header).encode("utf-8") + b"\n")
+            handle.write(zlib.compress(values.tobytes() + bytes(self.strategies)))
+
+    @classmethod
+    def load(cls, path):
+        with open(path, "rb") as handle:
+            header = json.loads(handle.readline())
+            payload = zlib.decompress(handle.read())
+        table = compile_table(*header["signature"])
+        split = header["states"] * array("f").itemsize
+        values = array("f")
+        values.frombytes(payload[:split])
+        return cls(table, values, bytearray(payload[split:]), header["sweeps"])
+
+
+# ------------------------
+# VALUE ITERATION
+# ------------------------
+def solve(table, tolerance=TOLERANCE, max_sweeps=MAX_SWEEPS):
+    """
+    Solve the simultaneous-move game over every state of `table`.
+
+    Hits never restore HP or armor, so any action pair either leaves the
+    combat state (p_health, p_armor, e_health, e_armor) alone or moves
+    it to one with a smaller total. Combat states are therefore solved
+    from the smallest total up, each one exactly once; only the Vigor
+    states inside a combat state can loop, and those are value-iterated
+    (Gauss-Seidel) until they settle.
+    """
+    combat_states = table.combat_states
+    next_combat = table.next_combat
+    next_vigor = table.next_vigor
+    span = table.vigor_span
+    side = table.vigor_cap + 1
+
+    values = array("d", bytes(8 * len(table)))
+    strategies = bytearray(6 * len(table))
+    sweeps = 0
+
+    # For every vigor state, the nine legal (pair code, next vigor index)
+    # cells of its 3x3 matrix, rows/columns in _menu order
+    cells = []
+    for vigor_index in range(span):
+        p_vigor, e_vigor = divmod(vigor_index, side)
+        row = []
+        for p in _menu(p_vigor):
+            for e in _menu(e_vigor):
+                pair = ACTION_CODES[p] * 5 + ACTION_CODES[e]
+                row.append((pair, next_vigor[vigor_index * PAIR_COUNT + pair]))
+        cells.append(row)
+
+    order = sorted(range(len(combat_states)), key=lambda i: sum(combat_states[i]))
+    for combat_index in order:
+        p_health, _, e_health, _ = combat_states[combat_index]
+        base = combat_index * span
+        if p_health <= 0 or e_health <= 0:
+            won = 1.0 if p_health > 0 else 0.0
+            for vigor_index in range(span):
+                values[base + vigor_index] = won
+            continue
+
+        row = combat_index * PAIR_COUNT
+        targets = [next_combat[row + pair] * span for pair in range(PAIR_COUNT)]
+
+        def matrix_at(vigor_index):
+            flat = [values[targets[pair] + vigor] for pair, vigor in cells[vigor_index]]
+            return (tuple(flat[0:3]), tuple(flat[3:6]), tuple(flat[6:9]))
+
+        # Vigor states with a pair that keeps the combat state (only
+        # Vigor changes) read their own block, so they need iterating
+        looping = [
+            vigor_index for vigor_index in range(span)
+            if any(targets[pair] == base for pair, _ in cells[vigor_index])
+        ]
+        pending = range(span)
+        for block_sweep in range(1, max_sweeps + 1):
+            delta = 0.0
+            for vigor_index in pending:
+                value = solve_matrix_game(matrix_at(vigor_index))[0]
+                index = base + vigor_index
+                delta = max(delta, abs(value - values[index]))
+                values[index] = value
+            if not looping or delta <= tolerance:
+                break
+            pending = looping
+        sweeps += block_sweep
+
+        for vigor_index in range(span):
+            _, player_mix, enemy_mix = solve_matrix_game(matrix_at(vigor_index))
+            index = base + vigor_index
+            strategies[index * 6:index * 6 + 6] = bytes(_quantize(player_mix) + _quantize(enemy_mix))
+
+    return Solution(table, values, strategies, sweeps)
+
+
+def _solution_path(signature, directory=SOLUTION_DIR):
+    return os.path.join(directory, "-".join(str(n) for n in signature) + ".sol")
+
+
+@lru_cache(maxsize=SOLUTION_CACHE_SIZE)
+def _solve_signature(*signature):
+    path = _solution_path(signature)
+    if os.path.exists(path):
+        return Solution.load(path)
+    return solve(compile_table(*signature))
+
+
+def solution_for(player, enemy, vigor_cap=VIGOR_CAP):
+    """
+    Solved matchup for the current stats of two Characters (memoized).
+    A cold solve takes seconds to minutes (16 s for a fresh player vs a
+    round-1 Goblin Cutthroat); the game uses request_solution instead.
+    """
+    return _solve_signature(*table_for(player, enemy, vigor_cap).signature)
+
+
+def _signature(player, enemy, vigor_cap=VIGOR_CAP):
+    """compile_table arguments for two fighters, without compiling anything."""
+    return (
+        player.health, player.armor, player.vigor, player.damage,
+        enemy.health, enemy.armor, enemy.vigor, enemy.damage,
+        vigor_cap,
+    )
+
+
+# ------------------------
+# BACKGROUND SOLVING
+# ------------------------
+class BackgroundSolver:
+    """
+    Solves matchups one at a time on a daemon thread, newest request
+    first: the fight about to start beats guesses made earlier. Each
+    request gets a concurrent.futures.Future for its Solution.
+    """
+
+    def __init__(self, max_pending=MAX_PENDING_SOLVES):
+        self.max_pending = max_pending
+        self._futures = {}    # signature -> Future, until it is solved
+        self._pending = []    # signatures waiting, newest last
+        self._wake = threading.Condition()
+        self._thread = None
+
+    def request(self, signature):
+        with self._wake:
+            future = self._futures.get(signature)
+            if future is None:
+                future = self._futures[signature] = Future()
+            elif signature in self._pending:
+                self._pending.remove(signature)  # asked again: move it up
+            if not future.running():
+                self._pending.append(signature)
+                while len(self._pending) > self.max_pending:
+                    self._futures.pop(self._pending.pop(0)).cancel()
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._work, name="matchup-solver", daemon=True)
+                self._thread.start()
+            self._wake.notify()
+        return future
+
+    def _work(self):
+        while True:
+            with self._wake:
+                while not self._pending:
+                    self._wake.wait()
+                signature = self._pending.pop()
+                future = self._futures[signature]
+                future.set_running_or_notify_cancel()
+            try:
+                solution = _solve_signature(*signature)
+            except Exception as exc:
+                with self._wake:
+                    del self._futures[signature]
+                future.set_exception(exc)
+            else:
+                # Solved matchups stay in _solve_signature's LRU, so a
+                # repeat request comes straight back from there
+                with self._wake:
+                    del self._futures[signature]
+                future.set_result(solution)
+
+
+_background = BackgroundSolver()
+
+
+def request_solution(player, enemy, vigor_cap=VIGOR_CAP):
+    """Start solving this matchup in the background; returns a Future."""
+    return _background.request(_signature(player, enemy, vigor_cap))
+
+
+def presolve(player, fight_index, vigor_cap=VIGOR_CAP):
+    """
+    Start solving `player` (as they are now) against every enemy that
+    can spawn at `fight_index`, most likely spawn first.
+    """
+    table = spawn_table(fight_index)
+    weights = [
+        high - low for low, high in zip((0.0,) + table.cum_weights[:-1], table.cum_weights)
+    ]
+    # Requests are served newest first, so queue the likeliest last
+    for _, block in sorted(zip(weights, table.blocks), key=lambda pair: pair[0]):
+        _background.request(_signature(player, block, vigor_cap))
+
+
+# ------------------------
+# THEORETICAL WIN RATES
+# ------------------------
+def matchup_table(rounds, player_factory=new_player):
+    """
+    Optimal-play win chance of a fresh player vs every template per round.
+
+    Returns {template_name: {fight_index: win_probability}}: the exact
+    counterpart of Simulator.balance_table, without sampling noise.
+    """
+    results = {}
+    for template in enemy_templates:
+        per_round = {}
+        for fight_index in rounds:
+            enemy = create_enemy(fight_index - 1, template)
+            per_round[fight_index] = solution_for(player_factory(), enemy).win_probability
+        results[template["name"]] = per_round
+    return results
+
+
+def export_tables(rounds, directory=SOLUTION_DIR, player_factory=new_player):
+    """Solve and save a fresh player vs every template for each round."""
+    os.makedirs(directory, exist_ok=True)
+    paths = []
+    for template in enemy_templates:
+        for fight_index in rounds:
+            solution = solution_for(player_factory(), create_enemy(fight_index - 1, template))
+            path = _solution_path(solution.table.signature, directory)
+            solution.save(path)
+            paths.append(path)
+    return paths
+
+
+# ----------------------------------------------------------------------
+# Entry point: theoretical balance printout
+# ----------------------------------------------------------------------
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Optimal-play win rates per matchup")
+    parser.add_argument("--rounds", type=int, default=8)
+    parser.add_argument("--export", action="store_true", help=f"save lookup tables to {SOLUTION_DIR}")
+    args = parser.parse_args()
+
+    rounds = range(1, args.rounds + 1)
+    for name, per_round in matchup_table(rounds).items():
+        print(name)
+        for fight_index, win in per_round.items():
+            print(f"  Round {fight_index:>2}: optimal win {win:6.1%}")
+    if args.export:
+        for path in export_tables(rounds):
+            print(f"wrote {path}")
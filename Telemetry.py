@@ -0,0 +1,134 @@
+# Telemetry.py
+
+import contextvars
+import json
+import math
+import os
+import threading
+import time
+from collections import deque, namedtuple
+from contextlib import contextmanager
+
+# Set to a file path to append every negotiation call (plus a per-session
+# summary line) as JSON lines when a game session ends
+TELEMETRY_ENV_VAR = "NEGOTIATION_TELEMETRY"
+
+# Latency percentiles cover this many most recent calls of a session
+ROLLING_WINDOW = 200
+
+# Rough characters per token, for backends that don't report usage
+CHARS_PER_TOKEN = 4
+
+# Appends from concurrent server sessions must not interleave
+_export_lock = threading.Lock()
+
+# One Shopkeeper.negotiate / negotiate_stream call. `source` is "model"
+# for a backend call and "cache" for a cached or prefetched reply;
+# tokens_estimated is True when the backend didn't report token counts.
+NegotiationCall = namedtuple(
+    "NegotiationCall",
+    "timestamp shopkeeper item_name step mood offer counter_offer accepted "
+    "latency prompt_tokens response_tokens tokens_estimated source streamed",
+)
+
+
+def estimate_tokens(text):
+    return math.ceil(len(text) / CHARS_PER_TOKEN)
+
+
+def percentile(sorted_values, q):
+    """Nearest-rank q-quantile of an already sorted list."""
+    if not sorted_values:
+        return 0.0
+    rank = max(1, math.ceil(q * len(sorted_values)))
+    return sorted_values[rank - 1]
+
+
+class NegotiationTelemetry:
+    """
+    Every negotiation call of one game session, with running totals and
+    rolling latency percentiles (last ROLLING_WINDOW calls).
+    """
+
+    def __init__(self, window=ROLLING_WINDOW):
+        self.calls = []
+        self.latencies = deque(maxlen=window)
+        self.model_calls = 0
+        self.prompt_tokens = 0
+        self.response_tokens = 0
+        self.accepted = 0
+
+    def add(self, call):
+        self.calls.append(call)
+        self.latencies.append(call.latency)
+        self.accepted += call.accepted
+        if call.source == "model":
+            # Only real backend calls count against the model quota
+            self.model_calls += 1
+            self.prompt_tokens += call.prompt_tokens
+            self.response_tokens += call.response_tokens
+
+    def summary(self):
+        latencies = sorted(self.latencies)
+        return {
+            "calls": len(self.calls),
+            "model_calls": self.model_calls,
+            "prompt_tokens": self.prompt_tokens,
+            "response_tokens": self.response_tokens,
+            "accept_rate": self.accepted / len(self.calls) if self.calls else 0.0,
+            "latency_p50": percentile(latencies, 0.5),
+            "latency_p95": percentile(latencies, 0.95),
+            "latency_p99": percentile(latencies, 0.99),
+        }
+
+    def export_jsonl(self, path):
+        """Append one {"type": "call"} line per call and a {"type": "session"} summary."""
+        lines = [json.dumps({"type": "call", **call._asdict()}) for call in self.calls]
+        lines.append(json.dumps({"type": "session", **self.summary()}))
+        with _export_lock, open(path, "a", encoding="utf-8") as handle:
+            handle.write("\n".join(lines) + "\n")
+
+
+def negotiation_call(shopkeeper, session, offer, prompt, text, counter_offer, latency, cached, streamed):
+    """
+    NegotiationCall for one finished step. Token counts come from the
+    Reply when the backend reported them, otherwise from text length.
+    """
+    prompt_tokens = getattr(text, "prompt_tokens", None)
+    response_tokens = getattr(text, "response_tokens", None)
+    estimated = prompt_tokens is None or response_tokens is None
+    if estimated:
+        prompt_tokens = estimate_tokens(prompt)
+        response_tokens = estimate_tokens(text)
+    return NegotiationCall(
+        time.time(), shopkeeper.name, session.item_name, session.step, session.mood,
+        offer, counter_offer, session.is_accepted, latency,
+        prompt_tokens, response_tokens, estimated,
+        "cache" if cached else "model", streamed,
+    )
+
+
+# ------------------------
+# CURRENT SESSION
+# ------------------------
+# None = telemetry off (the default)
+_current = contextvars.ContextVar("negotiation_telemetry", default=None)
+
+
+def get_telemetry():
+    return _current.get()
+
+
+@contextmanager
+def use_telemetry(telemetry):
+    """Collect negotiation calls of the current thread or task into `telemetry`."""
+    token = _current.set(telemetry)
+    try:
+        yield telemetry
+    finally:
+        _current.reset(token)
+
+
+def telemetry_path_from_env():
+    """Where sessions should export, or None if nobody asked for telemetry."""
+    return os.environ.get(TELEMETRY_ENV_VAR) or None
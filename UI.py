@@ -1,20 +1,484 @@
 # UI.py
-import time
+import contextvars
+import os
+import queue
+import sys
 import textwrap
+import threading
+import time
+from contextlib import contextmanager
+
+from Instrumentation import timed
+
+# How often the renderer pushes a chunk of text to the terminal.
+# Each tick writes as many characters as `delay` would have printed
+# one by one, so pacing stays the same with ~30 writes per second.
+TICK_SECONDS = 1 / 30
+
+if os.name == "nt":
+    import msvcrt
+else:
+    import select
+    import termios
+    import tty
+
+
+class _KeyWatcher:
+    """
+    Non-blocking "was a key pressed?" check for the console.
+
+    On POSIX the terminal is switched to cbreak mode while a block is
+    rendering so single keypresses arrive without Enter; the pressed
+    keys are swallowed so they don't leak into the next prompt.
+    """
+
+    def __init__(self, stream=None):
+        self.stream = stream if stream is not None else sys.stdin
+        self._saved = None
+
+    def _enabled(self):
+        try:
+            return self.stream.isatty()
+        except (AttributeError, ValueError):
+            return False
+
+    def __enter__(self):
+        if os.name != "nt" and self._enabled():
+            fd = self.stream.fileno()
+            self._saved = termios.tcgetattr(fd)
+            tty.setcbreak(fd)
+        return self
+
+    def __exit__(self, *exc):
+        if self._saved is not None:
+            termios.tcsetattr(self.stream.fileno(), termios.TCSADRAIN, self._saved)
+            self._saved = None
+
+    def pressed(self):
+        if not self._enabled():
+            return False
+        if os.name == "nt":
+            hit = False
+            while msvcrt.kbhit():
+                msvcrt.getwch()
+                hit = True
+            return hit
+        hit = False
+        while select.select([self.stream], [], [], 0)[0]:
+            os.read(self.stream.fileno(), 1024)
+            hit = True
+        return hit
+
+
+class _NullWatcher:
+    """Stand-in when skipping is off: never reports a keypress."""
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+    def pressed(self):
+        return False
+
+
+class Renderer:
+    """
+    Typewriter-style text output, written in frame-sized chunks.
+
+    Instead of one print/flush/sleep per character, each tick writes a
+    whole chunk and sleeps once. A keypress finishes the current block
+    instantly. play() blocks the caller, pausing on `clock` (real time
+    unless the owning IO passes its own); play_async() does the same
+    from an asyncio task.
+    """
+
+    def __init__(self, stream=None, tick=TICK_SECONDS, skip_on_key=True, clock=None):
+        self.stream = stream if stream is not None else sys.stdout
+        self.tick = tick
+        self.skip_on_key = skip_on_key
+        self.clock = clock if clock is not None else SystemClock()
+
+    def _frames(self, text, delay):
+        """Split text into (chunk, seconds_to_wait_after_it) frames."""
+        if delay <= 0 or not text:
+            yield text, 0
+            return
+        per_frame = max(1, round(self.tick / delay))
+        for start in range(0, len(text), per_frame):
+            chunk = text[start:start + per_frame]
+            yield chunk, len(chunk) * delay
+
+    def _write(self, text):
+        self.stream.write(text)
+        self.stream.flush()
+
+    def _watcher(self):
+        return _KeyWatcher() if self.skip_on_key else _NullWatcher()
+
+    def play(self, text, delay=0.03, end=""):
+        with self._watcher() as watcher:
+            written = 0
+            for chunk, wait in self._frames(text, delay):
+                self._write(chunk)
+                written += len(chunk)
+                if watcher.pressed():
+                    self._write(text[written:])
+                    break
+                if wait:
+                    self.clock.sleep(wait)
+        if end:
+            self._write(end)
+
+    async def play_async(self, text, delay=0.03, end=""):
+        import asyncio  # only async callers (Server) pay for importing it
+
+        with self._watcher() as watcher:
+            written = 0
+            for chunk, wait in self._frames(text, delay):
+                self._write(chunk)
+                written += len(chunk)
+                if watcher.pressed():
+                    self._write(text[written:])
+                    break
+                if wait:
+                    await asyncio.sleep(wait)
+        if end:
+            self._write(end)
+
+
+class BackgroundRenderer(Renderer):
+    """
+    Renderer driven by its own daemon thread.
+
+    submit() queues text and returns at once, so the caller can keep
+    working (e.g. waiting on the shopkeeper) while the text plays.
+    play() keeps the blocking behaviour slow_print relies on.
+    """
+
+    def __init__(self, stream=None, tick=TICK_SECONDS, skip_on_key=True, clock=None):
+        super().__init__(stream=stream, tick=tick, skip_on_key=skip_on_key, clock=clock)
+        self._queue = queue.Queue()
+        self._thread = threading.Thread(target=self._worker, name="renderer", daemon=True)
+        self._thread.start()
+
+    def _worker(self):
+        while True:
+            text, delay, end, done = self._queue.get()
+            try:
+                Renderer.play(self, text, delay, end)
+            finally:
+                done.set()
+                self._queue.task_done()
+
+    def submit(self, text, delay=0.03, end=""):
+        done = threading.Event()
+        self._queue.put((text, delay, end, done))
+        return done
+
+    def play(self, text, delay=0.03, end=""):
+        self.submit(text, delay, end).wait()
+
+    def flush(self):
+        """Block until everything submitted so far has been written."""
+        self._queue.join()
+
+
+class InstantRenderer(Renderer):
+    """Writes each block at once instead of typewriter-style."""
+
+    def play(self, text, delay=0.03, end=""):
+        self._write(text + end)
+
+    async def play_async(self, text, delay=0.03, end=""):
+        self._write(text + end)
+
+
+# ------------------- Clocks -------------------
+class SystemClock:
+    """Real time."""
+
+    def now(self):
+        return time.perf_counter()
+
+    def sleep(self, seconds):
+        time.sleep(seconds)
+
+
+class VirtualClock:
+    """Time that only moves when the game pauses, so pauses cost nothing."""
+
+    def __init__(self, start=0.0):
+        self.time = start
+
+    def now(self):
+        return self.time
 
-# Print text character by character
+    def sleep(self, seconds):
+        self.time += max(0.0, seconds)
+
+
+# ------------------- Game I/O -------------------
+class ConsoleIO:
+    """
+    The real terminal. Everything the game shows or asks goes through
+    the current IO object (see use_io), so a server can give each
+    player their own.
+    """
+
+    def __init__(self, renderer=None, clock=None):
+        self.clock = clock if clock is not None else SystemClock()
+        self.renderer = renderer if renderer is not None else Renderer(clock=self.clock)
+
+    def write(self, text):
+        sys.stdout.write(text)
+        sys.stdout.flush()
+
+    def read_line(self, prompt="", timeout=None):
+        """input(); with a timeout, None if no line arrives in time."""
+        if not _is_console(sys.stdin):
+            # Pipes can't be polled: one reader thread serves every prompt
+            self.write(prompt)
+            return _line_reader.get(timeout)
+        if timeout is None:
+            return input(prompt)
+        self.write(prompt)
+        if os.name == "nt":
+            return _console_line_nt(timeout)
+        if not select.select([sys.stdin], [], [], timeout)[0]:
+            return None
+        line = sys.stdin.readline()
+        if not line:
+            raise EOFError
+        return line.rstrip("\n")
+
+    def clear_screen(self):
+        os.system("cls" if os.name == "nt" else "clear")
+
+
+def _is_console(stream):
+    try:
+        return stream.isatty()
+    except (AttributeError, ValueError):
+        return False
+
+
+def _console_line_nt(timeout):
+    deadline = time.perf_counter() + timeout
+    chars = []
+    while time.perf_counter() < deadline:
+        if not msvcrt.kbhit():
+            time.sleep(0.02)
+            continue
+        ch = msvcrt.getwche()
+        if ch in ("\r", "\n"):
+            msvcrt.putwch("\n")
+            return "".join(chars)
+        if ch == "\b":
+            if chars:
+                chars.pop()
+                msvcrt.putwch(" ")
+                msvcrt.putwch("\b")
+        else:
+            chars.append(ch)
+    return None
+
+
+def discard_queued_lines(lines):
+    """
+    Empty a queue of input lines after a timed-out prompt: anything in it
+    was typed for that prompt, not the next one. An end-of-input marker
+    (EOFError) is kept.
+    """
+    ended = None
+    while True:
+        try:
+            line = lines.get_nowait()
+        except queue.Empty:
+            break
+        if line is EOFError or isinstance(line, EOFError):
+            ended = line
+    if ended is not None:
+        lines.put(ended)
+
+
+class _LineReader:
+    """
+    Reads lines with input() on a daemon thread, for stdin that can't be
+    polled (pipes, redirected input). A line that arrives after a
+    timeout answered the prompt that gave up, so the next prompt drops it.
+    """
+
+    def __init__(self):
+        self._lines = queue.Queue()
+        self._thread = None
+        self._lock = threading.Lock()
+        self._timed_out = False
+
+    def _read(self):
+        try:
+            self._lines.put(input())
+        except EOFError as exc:
+            self._lines.put(exc)
+
+    def get(self, timeout):
+        with self._lock:
+            if self._timed_out:
+                discard_queued_lines(self._lines)
+                self._timed_out = False
+            if self._thread is None or not self._thread.is_alive():
+                if self._lines.empty():
+                    self._thread = threading.Thread(target=self._read, name="line-reader", daemon=True)
+                    self._thread.start()
+        try:
+            line = self._lines.get(timeout=timeout)
+        except queue.Empty:
+            self._timed_out = True
+            return None
+        if isinstance(line, EOFError):
+            raise line
+        return line
+
+
+_line_reader = _LineReader()
+
+
+class ScriptedIO:
+    """
+    Plays the game from a script, at full speed.
+
+    `script` is a list of reply lines, or a function
+    script(text_shown_since_last_prompt, prompts_answered) -> line.
+    A None reply lets a timed prompt run out. Output is collected in
+    `transcript`, pauses advance a VirtualClock, and running out of
+    script ends the run with EOFError.
+    """
+
+    def __init__(self, script, clock=None):
+        self.clock = clock if clock is not None else VirtualClock()
+        self.renderer = InstantRenderer(stream=self, skip_on_key=False, clock=self.clock)
+        self.transcript = []
+        self.prompts = 0
+        self._shown = []
+        self._script = script if callable(script) else iter(script)
+
+    def write(self, text):
+        self.transcript.append(text)
+        self._shown.append(text)
+
+    def flush(self):
+        pass
+
+    def _next_reply(self, shown):
+        if callable(self._script):
+            return self._script(shown, self.prompts)
+        try:
+            return next(self._script)
+        except StopIteration:
+            raise EOFError from None
+
+    def read_line(self, prompt="", timeout=None):
+        self.write(prompt)
+        shown = "".join(self._shown)
+        self._shown.clear()
+        reply = self._next_reply(shown)
+        self.prompts += 1
+        if reply is None:
+            if timeout is None:
+                raise EOFError
+            self.clock.sleep(timeout)
+            return None
+        self.write(f"{reply}\n")  # echo, like a terminal would
+        return reply
+
+    def clear_screen(self):
+        pass
+
+    def text(self):
+        return "".join(self.transcript)
+
+
+_console = ConsoleIO()
+_current_io = contextvars.ContextVar("game_io", default=_console)
+
+
+def get_io():
+    """IO for the current player (the console unless use_io() says otherwise)."""
+    return _current_io.get()
+
+
+@contextmanager
+def use_io(io):
+    """Route game output/input through `io` for the current thread or task."""
+    token = _current_io.set(io)
+    try:
+        yield io
+    finally:
+        _current_io.reset(token)
+
+
+def get_renderer():
+    return get_io().renderer
+
+
+def set_renderer(renderer):
+    """Swap the renderer used by slow_print / slow_input / print_block."""
+    get_io().renderer = renderer
+
+
+# print() replacement: one line of plain output
+def write_line(text=""):
+    get_io().write(f"{text}\n")
+
+# input() replacement
+def read_line(prompt=""):
+    with timed("input_wait"):
+        return get_io().read_line(prompt)
+
+# input() that gives up after `timeout` seconds and returns None
+def timed_input(prompt="", timeout=None):
+    with timed("input_wait"):
+        return get_io().read_line(prompt, timeout)
+
+def clear_screen():
+    get_io().clear_screen()
+
+# time.sleep() replacement: a pause in the current player's clock
+# (dramatic pauses count as rendering time)
+def sleep(seconds):
+    with timed("render"):
+        get_io().clock.sleep(seconds)
+
+# time.perf_counter() replacement for game timers
+def now():
+    return get_io().clock.now()
+
+# Print text typewriter-style through the active renderer
 # Delay determines how slow each character is printed after another
 def slow_print(text, delay=0.03):
-    for char in text:
-        print(char, end="", flush=True)
-        time.sleep(delay)
-    print()
+    with timed("render"):
+        get_renderer().play(text, delay=delay, end="\n")
+
+# slow_print for text that arrives in pieces (e.g. a streamed reply):
+# each piece is played as soon as it is available (only the playing
+# counts as rendering time, not the wait for the next piece)
+def slow_stream(pieces, delay=0.03, prefix=""):
+    renderer = get_renderer()
+    if prefix:
+        with timed("render"):
+            renderer.play(prefix, delay=delay)
+    for piece in pieces:
+        with timed("render"):
+            renderer.play(piece, delay=delay)
+    with timed("render"):
+        renderer.play("", delay=delay, end="\n")
 
 # Apply slow_print function
 # Then apply an input
 def slow_input(prompt, delay=0.03):
     slow_print(prompt, delay=delay)
-    return input("> ")
+    return read_line("> ")
 
 # slow_print function for long text
 def print_block(text, delay=0.03):
@@ -0,0 +1,410 @@
+# VectorCombat.py
+
+import numpy as np
+
+from Characters import Character, enemy_templates, spawn_table, stat_blocks
+from Combat import ACTIONS, ACTION_CODES, ENEMY_BASIC_WEIGHTS, ENEMY_VIGOR_WEIGHTS, Combat
+
+# Action codes, same order as Combat.ACTIONS so codes <-> strings round-trip.
+ATTACK, BLOCK, FEINT, HEAVY, FORTIFY = range(5)
+
+# Preferred action codes for the enemy AI (NO_PREFERENCE = plain 1/3 split)
+NO_PREFERENCE = 3
+PREFERENCE_CODES = {"attack": ATTACK, "block": BLOCK, "feint": FEINT, None: NO_PREFERENCE}
+
+# Combat's enemy AI tables as one row per preference code (columns
+# follow ACTIONS order), so both engines roll the same numbers.
+def _weight_rows(table):
+    rows = np.zeros((len(PREFERENCE_CODES), len(ACTIONS)))
+    for preferred, code in PREFERENCE_CODES.items():
+        actions, weights = table[preferred]
+        for action, weight in zip(actions, weights):
+            rows[code, ACTION_CODES[action]] = weight
+    return rows
+
+
+_BASIC_WEIGHTS = _weight_rows(ENEMY_BASIC_WEIGHTS)
+_VIGOR_WEIGHTS = _weight_rows(ENEMY_VIGOR_WEIGHTS)
+_BASIC_CUMULATIVE = np.cumsum(_BASIC_WEIGHTS, axis=1)
+_VIGOR_CUMULATIVE = np.cumsum(_VIGOR_WEIGHTS, axis=1)
+
+# Battle outcome codes (per pair)
+ONGOING, ENEMY_DEAD, PLAYER_DEAD, DOUBLE_KO = range(4)
+OUTCOMES = ("ongoing", "enemy_dead", "player_dead", "double_ko")
+
+
+class BattleBatch:
+    """
+    Struct-of-arrays state for N independent player/enemy pairs.
+
+    Every field is a NumPy array of length N; index i is one fight.
+    Health may go negative exactly like Character.health does.
+    """
+
+    FIELDS = (
+        "p_health", "p_armor", "p_vigor", "p_damage", "p_money",
+        "e_health", "e_armor", "e_vigor", "e_damage",
+        "e_gold_min", "e_gold_max", "e_preferred", "e_template",
+    )
+
+    def __init__(self, size):
+        self.size = size
+        for field in self.FIELDS:
+            setattr(self, field, np.zeros(size, dtype=np.int64))
+        self.e_preferred[:] = NO_PREFERENCE
+
+    # ------------------------
+    # CONSTRUCTION
+    # ------------------------
+    @classmethod
+    def from_characters(cls, players, enemies):
+        """Pack matching lists of Character objects into one batch."""
+        batch = cls(len(players))
+        for i, (p, e) in enumerate(zip(players, enemies)):
+            batch.p_health[i] = p.health
+            batch.p_armor[i] = p.armor
+            batch.p_vigor[i] = p.vigor
+            batch.p_damage[i] = p.damage
+            batch.p_money[i] = p.money
+            batch.e_health[i] = e.health
+            batch.e_armor[i] = e.armor
+            batch.e_vigor[i] = e.vigor
+            batch.e_damage[i] = e.damage
+            batch.e_gold_min[i] = getattr(e, "gold_min", 0)
+            batch.e_gold_max[i] = getattr(e, "gold_max", 0)
+            batch.e_preferred[i] = PREFERENCE_CODES[getattr(e, "preferred_action", None)]
+        batch.e_template[:] = -1
+        return batch
+
+    @classmethod
+    def spawn(cls, size, round_counter, rng, player=None, template_index=None):
+        """
+        Build `size` fights of a fresh player vs enemies scaled for
+        `round_counter`, using the same rules as Characters.create_enemy.
+        """
+        if player is None:
+            player = Character(name="Simulated Challenger", health=15, money=0, armor=5, damage=5)
+
+        batch = cls(size)
+        batch.p_health[:] = player.health
+        batch.p_armor[:] = player.armor
+        batch.p_vigor[:] = player.vigor
+        batch.p_damage[:] = player.damage
+        batch.p_money[:] = player.money
+
+        fight_index = round_counter + 1
+        if template_index is None:
+            table = spawn_table(fight_index)
+            weights = np.array([enemy_templates[i].get("spawn_weight", 1) for i in table.indices], dtype=float)
+            picks = np.array(table.indices, dtype=np.int64)[
+                rng.choice(len(table.indices), size=size, p=weights / weights.sum())
+            ]
+        else:
+            picks = np.full(size, template_index, dtype=np.int64)
+
+        # Per-template stats for this fight index, straight from the catalog tables
+        blocks = stat_blocks(fight_index)
+
+        def column(field):
+            return np.array([getattr(block, field) for block in blocks], dtype=np.int64)[picks]
+
+        batch.e_template[:] = picks
+        batch.e_health[:] = column("health")
+        batch.e_armor[:] = column("armor")
+        batch.e_damage[:] = column("damage")
+        batch.e_gold_min[:] = column("gold_min")
+        batch.e_gold_max[:] = column("gold_max")
+        batch.e_vigor[:] = column("vigor")
+        batch.e_preferred[:] = np.array(
+            [PREFERENCE_CODES[block.preferred_action] for block in blocks],
+            dtype=np.int64,
+        )[picks]
+
+        return batch
+
+    def select(self, index):
+        """Views of every field for a subset of pairs (boolean mask or index array)."""
+        sub = BattleBatch.__new__(BattleBatch)
+        for field in self.FIELDS:
+            setattr(sub, field, getattr(self, field)[index])
+        sub.size = len(sub.p_health)
+        return sub
+
+    def assign(self, index, sub):
+        """Write a subset produced by select() back into this batch."""
+        for field in self.FIELDS:
+            getattr(self, field)[index] = getattr(sub, field)
+
+
+# ------------------------
+# DAMAGE HELPERS (vectorised Combat.apply_*)
+# ------------------------
+def _apply_armor_damage(health, armor, dmg):
+    """Damage goes to armor first, then spills into health (dmg <= 0 is ignored)."""
+    dmg = np.maximum(dmg, 0)
+    absorbed = np.minimum(np.maximum(armor, 0), dmg)
+    armor -= absorbed
+    health -= dmg - absorbed
+
+
+def _apply_guard_break(health, armor, dmg, mask):
+    """Heavy Attack into an unfortified Block: guard goes to 0, overflow x2 into HP."""
+    overflow = np.maximum(dmg - armor, 0)
+    health -= np.where(mask, overflow * 2, 0)
+    armor[mask] = 0
+
+
+def resolve_turn(batch, player_actions, enemy_actions):
+    """
+    Vectorised Combat.resolve_turn for every pair at once.
+
+    Actions are code arrays (see ACTIONS) that already paid their Vigor
+    cost, exactly like the strings passed to the scalar resolve_turn.
+    Mutates the batch in place.
+    """
+    pa = np.asarray(player_actions)
+    ea = np.asarray(enemy_actions)
+
+    p_heavy = pa == HEAVY
+    e_heavy = ea == HEAVY
+    p_fortify = pa == FORTIFY
+    e_fortify = ea == FORTIFY
+
+    # Heavy/Fortify map onto Attack/Block for the rock-paper-scissors part
+    p_att = (pa == ATTACK) | p_heavy
+    p_blk = (pa == BLOCK) | p_fortify
+    p_fnt = pa == FEINT
+    e_att = (ea == ATTACK) | e_heavy
+    e_blk = (ea == BLOCK) | e_fortify
+    e_fnt = ea == FEINT
+
+    p_dmg = batch.p_damage
+    e_dmg = batch.e_damage
+
+    # The nine matchups, player action first
+    att_att = p_att & e_att
+    att_blk = p_att & e_blk
+    blk_att = p_blk & e_att
+    att_fnt = p_att & e_fnt
+    fnt_att = p_fnt & e_att
+    blk_blk = p_blk & e_blk
+    blk_fnt = p_blk & e_fnt
+    fnt_blk = p_fnt & e_blk
+    fnt_fnt = p_fnt & e_fnt
+
+    # --- Damage into the enemy's armor (spills into HP) ---
+    armor_dmg_e = (
+        np.where(att_att & p_heavy & ~e_heavy, p_dmg, 0)
+        + np.where(att_blk & ~p_heavy & ~e_fortify, np.maximum(1, p_dmg // 2), 0)
+        + np.where(fnt_blk & ~e_fortify, np.maximum(1, p_dmg), 0)
+    )
+    # --- Damage into the player's armor (spills into HP) ---
+    armor_dmg_p = (
+        np.where(att_att & e_heavy & ~p_heavy, e_dmg, 0)
+        + np.where(blk_att & ~e_heavy & ~p_fortify, np.maximum(1, e_dmg // 2), 0)
+        + np.where(blk_fnt & ~p_fortify, np.maximum(1, e_dmg), 0)
+    )
+    # --- Straight HP damage (crits and feint chip) ---
+    hp_dmg_e = (
+        np.where(att_fnt, p_dmg * np.where(p_heavy, 4, 2), 0)
+        + np.where(fnt_fnt, np.maximum(1, p_dmg // 4), 0)
+    )
+    hp_dmg_p = (
+        np.where(fnt_att, e_dmg * np.where(e_heavy, 4, 2), 0)
+        + np.where(fnt_fnt, np.maximum(1, e_dmg // 4), 0)
+    )
+    # --- Vigor: parries, blocks that read an attack, mutual guards ---
+    parry = att_att & (p_heavy == e_heavy)
+    vigor_e = (parry | att_blk | blk_blk).astype(np.int64)
+    vigor_p = (parry | blk_att | blk_blk).astype(np.int64)
+
+    _apply_armor_damage(batch.e_health, batch.e_armor, armor_dmg_e)
+    _apply_armor_damage(batch.p_health, batch.p_armor, armor_dmg_p)
+    _apply_guard_break(batch.e_health, batch.e_armor, p_dmg, att_blk & p_heavy & ~e_fortify)
+    _apply_guard_break(batch.p_health, batch.p_armor, e_dmg, blk_att & e_heavy & ~p_fortify)
+    batch.e_health -= np.maximum(hp_dmg_e, 0)
+    batch.p_health -= np.maximum(hp_dmg_p, 0)
+    batch.e_vigor += vigor_e
+    batch.p_vigor += vigor_p
+
+
+# ------------------------
+# ACTION SELECTION
+# ------------------------
+def _sample(cumulative, rows, rng):
+    draws = rng.random(len(rows))
+    table = cumulative[rows]
+    # Same "first bucket whose cumulative weight exceeds the draw" rule as random.choices
+    return np.minimum((draws[:, None] >= table).sum(axis=1), 4)
+
+
+def choose_enemy_actions(batch, rng):
+    """Vectorised Combat._get_enemy_action (also pays Vigor for specials)."""
+    has_vigor = batch.e_vigor >= 2
+    rows = batch.e_preferred
+    actions = np.where(
+        has_vigor,
+        _sample(_VIGOR_CUMULATIVE, rows, rng),
+        _sample(_BASIC_CUMULATIVE, rows, rng),
+    )
+    special = (actions == HEAVY) | (actions == FORTIFY)
+    batch.e_vigor -= np.where(special, np.minimum(batch.e_vigor, 2), 0)
+    return actions
+
+
+def legalize_player_actions(batch, actions):
+    """
+    Apply the player menu rules to raw policy output:
+    with 2+ Vigor only Heavy/Fortify/Feint are offered, otherwise only
+    Attack/Block/Feint; anything else fumbles into Block.
+    Specials pay their 2 Vigor here.
+    """
+    actions = np.asarray(actions)
+    has_vigor = batch.p_vigor >= 2
+    legal = np.where(
+        has_vigor,
+        (actions == HEAVY) | (actions == FORTIFY) | (actions == FEINT),
+        (actions == ATTACK) | (actions == BLOCK) | (actions == FEINT),
+    )
+    actions = np.where(legal, actions, BLOCK)
+    special = (actions == HEAVY) | (actions == FORTIFY)
+    batch.p_vigor -= np.where(special, np.minimum(batch.p_vigor, 2), 0)
+    return actions
+
+
+# ------------------------
+# VECTORISED PLAYER POLICIES
+# ------------------------
+# policy(batch, rng) -> array of action codes (one per pair)
+
+def random_policy(batch, rng):
+    """Uniform over whatever each player's menu offers (Simulator.random_policy)."""
+    pick = rng.integers(0, 3, size=batch.size)
+    basic = np.array([ATTACK, BLOCK, FEINT])[pick]
+    vigor = np.array([HEAVY, FORTIFY, FEINT])[pick]
+    return np.where(batch.p_vigor >= 2, vigor, basic)
+
+
+def aggressive_policy(batch, rng):
+    return np.where(batch.p_vigor >= 2, HEAVY, ATTACK)
+
+
+def defensive_policy(batch, rng):
+    return np.where(batch.p_vigor >= 2, FORTIFY, BLOCK)
+
+
+# ------------------------
+# BATTLE LOOP
+# ------------------------
+def run_battles(batch, policy, rng, max_turns=500):
+    """
+    Fight every pair in the batch to the end.
+
+    Returns (outcomes, turns): outcome codes (see OUTCOMES; ONGOING means
+    max_turns ran out) and the number of turns each fight took.
+    Winners loot gold into batch.p_money like Combat.run_battle.
+    """
+    outcomes = np.full(batch.size, ONGOING, dtype=np.int64)
+    turns = np.zeros(batch.size, dtype=np.int64)
+    active = np.flatnonzero((batch.p_health > 0) & (batch.e_health > 0))
+
+    for _ in range(max_turns):
+        if active.size == 0:
+            break
+        sub = batch.select(active)
+        player_actions = legalize_player_actions(sub, policy(sub, rng))
+        enemy_actions = choose_enemy_actions(sub, rng)
+        resolve_turn(sub, player_actions, enemy_actions)
+        batch.assign(active, sub)
+        turns[active] += 1
+
+        still = (sub.p_health > 0) & (sub.e_health > 0)
+        active = active[still]
+
+    p_dead = batch.p_health <= 0
+    e_dead = batch.e_health <= 0
+    outcomes[e_dead & ~p_dead] = ENEMY_DEAD
+    outcomes[p_dead & ~e_dead] = PLAYER_DEAD
+    outcomes[p_dead & e_dead] = DOUBLE_KO
+
+    won = outcomes == ENEMY_DEAD
+    spread = batch.e_gold_max > batch.e_gold_min
+    loot = np.where(
+        spread,
+        rng.integers(batch.e_gold_min, np.maximum(batch.e_gold_max, batch.e_gold_min) + 1),
+        batch.e_gold_min,
+    )
+    batch.p_money += np.where(won, loot, 0)
+    return outcomes, turns
+
+
+# ------------------------
+# PARITY CHECK AGAINST THE SCALAR RULES
+# ------------------------
+def check_parity(samples=2000, seed=0):
+    """
+    Compare resolve_turn against Combat.resolve_turn on random states for
+    all 25 action pairs. Returns a list of mismatch descriptions (empty = OK).
+    """
+    rng = np.random.default_rng(seed)
+    combat = Combat()
+    mismatches = []
+
+    def roll(low, high):
+        return int(rng.integers(low, high + 1))
+
+    for _ in range(samples):
+        stats = [roll(-2, 40), roll(0, 12), roll(0, 4), roll(0, 12)]
+        enemy_stats = [roll(-2, 60), roll(0, 30), roll(0, 4), roll(0, 20)]
+
+        players, enemies, p_codes, e_codes = [], [], [], []
+        for p_code in range(5):
+            for e_code in range(5):
+                p = Character("P", stats[0], 0, stats[1], stats[3])
+                p.vigor = stats[2]
+                e = Character("E", enemy_stats[0], 0, enemy_stats[1], enemy_stats[3])
+                e.vigor = enemy_stats[2]
+                players.append(p)
+                enemies.append(e)
+                p_codes.append(p_code)
+                e_codes.append(e_code)
+
+        batch = BattleBatch.from_characters(players, enemies)
+        resolve_turn(batch, np.array(p_codes), np.array(e_codes))
+
+        for i, (p, e) in enumerate(zip(players, enemies)):
+            combat.resolve_turn(p, e, ACTIONS[p_codes[i]], ACTIONS[e_codes[i]])
+            scalar = (p.health, p.armor, p.vigor, e.health, e.armor, e.vigor)
+            vector = (
+                int(batch.p_health[i]), int(batch.p_armor[i]), int(batch.p_vigor[i]),
+                int(batch.e_health[i]), int(batch.e_armor[i]), int(batch.e_vigor[i]),
+            )
+            if scalar != vector:
+                mismatches.append(
+                    f"{ACTIONS[p_codes[i]]} vs {ACTIONS[e_codes[i]]} from "
+                    f"player {stats} enemy {enemy_stats}: scalar {scalar} != vector {vector}"
+                )
+    return mismatches
+
+
+# ----------------------------------------------------------------------
+# Entry point: parity check + throughput
+# ----------------------------------------------------------------------
+if __name__ == "__main__":
+    import time
+
+    problems = check_parity()
+    print(f"Parity check: {len(problems)} mismatches")
+    for line in problems[:10]:
+        print("  " + line)
+
+    rng = np.random.default_rng(1)
+    size = 1_000_000
+    batch = BattleBatch.spawn(size, round_counter=0, rng=rng)
+    start = time.perf_counter()
+    outcomes, turns = run_battles(batch, random_policy, rng)
+    elapsed = time.perf_counter() - start
+    print(
+        f"{size} battles in {elapsed:.2f}s ({size / elapsed:,.0f}/s), "
+        f"win rate {np.mean(outcomes == ENEMY_DEAD):.1%}"
+    )
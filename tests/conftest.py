@@ -0,0 +1,23 @@
+# The game modules live flat in the repository root
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import pytest
+
+import Backends
+import Shopkeeper
+from Backends import LocalRuleBackend
+from ResponseCache import ResponseCache
+
+
+@pytest.fixture
+def offline_shop():
+    """Shopkeepers use the rule engine and a memory-only reply cache."""
+    backend, cache = Backends._backend, Shopkeeper._response_cache
+    Backends.set_backend(LocalRuleBackend())
+    Shopkeeper.set_response_cache(ResponseCache())
+    yield
+    Backends.set_backend(backend)
+    Shopkeeper.set_response_cache(cache)
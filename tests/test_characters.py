@@ -0,0 +1,56 @@
+import copy
+import json
+import os
+
+import pytest
+
+import Characters
+from Characters import spawn_table, use_catalog, validate_catalog
+
+CATALOG_PATH = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "enemies.json")
+
+
+@pytest.fixture
+def catalog():
+    with open(CATALOG_PATH, encoding="utf-8") as handle:
+        return json.load(handle)
+
+
+@pytest.fixture
+def restore_catalog():
+    templates = list(Characters.enemy_templates)
+    yield
+    use_catalog(templates)
+
+
+def test_shipped_catalog_is_valid(catalog):
+    assert validate_catalog(copy.deepcopy(catalog), "enemies.json")
+
+
+def test_zero_total_spawn_weight_is_rejected(catalog):
+    for template in catalog["templates"]:
+        template["spawn_weight"] = 0
+    with pytest.raises(ValueError, match="spawn weights add up to 0"):
+        validate_catalog(catalog, "enemies.json")
+
+
+def test_negative_curve_entries_are_rejected(catalog):
+    catalog["scaling"]["vigor"] = [0, -1]
+    with pytest.raises(ValueError, match="must not be negative"):
+        validate_catalog(catalog, "enemies.json")
+
+
+def test_negative_template_curve_entries_are_rejected(catalog):
+    catalog["templates"][0]["scaling"] = {"gold_min": [1, -2]}
+    with pytest.raises(ValueError, match="must not be negative"):
+        validate_catalog(catalog, "enemies.json")
+
+
+def test_spawn_table_rejects_a_fight_with_only_zero_weights(catalog, restore_catalog):
+    first, *rest = catalog["templates"]
+    first["spawn_weight"] = 0
+    for template in rest:
+        template["min_fight"] = 5
+    use_catalog(validate_catalog(catalog, "enemies.json"))
+    with pytest.raises(ValueError, match="spawn_weight 0"):
+        spawn_table(1)
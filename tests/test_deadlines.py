@@ -0,0 +1,111 @@
+import threading
+import time
+
+import pytest
+
+from Backends import DeadlineExceeded, FallbackBackend, LocalStubBackend, call_before, is_cacheable, stream_before
+from ResponseCache import ResponseCache
+from Server import SocketIO
+from Shopkeeper import Shopkeeper, greedy
+from UI import ScriptedIO, use_io
+
+
+class CountingStub(LocalStubBackend):
+    """LocalStubBackend that counts the streamed pieces it produced."""
+
+    def __init__(self, **kwargs):
+        super().__init__(**kwargs)
+        self.produced = 0
+        self._produced_lock = threading.Lock()
+
+    def stream(self, prompt, turn=None):
+        for piece in super().stream(prompt, turn):
+            with self._produced_lock:
+                self.produced += 1
+            yield piece
+
+
+def test_stream_before_stops_the_primary_stream_at_the_deadline():
+    # 20 pieces, one every 0.1 s: the whole reply would take 2 s
+    stub = CountingStub(reply="x" * 20, chunk_size=1, latency_seconds=2.0, pool_size=1)
+    backend = FallbackBackend(stub, budget_seconds=1.0)
+
+    received = []
+    with pytest.raises(DeadlineExceeded):
+        for piece in stream_before(backend.stream("prompt"), time.perf_counter() + 0.5):
+            received.append(piece)
+    assert 0 < len(received) < 20
+
+    # At most the pieces already in flight arrive after the deadline
+    time.sleep(0.4)
+    stopped_at = stub.produced
+    assert stopped_at < 20
+    time.sleep(2.0)
+    assert stub.produced == stopped_at
+
+    # The primary stream was closed, so its client is back in the pool
+    assert stub.pool._idle.qsize() == stub.pool.created == 1
+    assert backend.fallbacks == 0
+
+
+def slow_shopkeeper(budget_seconds, stream=False):
+    slow = LocalStubBackend(latency_seconds=2.0)
+    backend = FallbackBackend(slow, budget_seconds=budget_seconds)
+    return Shopkeeper("Grimble", greedy, cache=ResponseCache(), backend=backend, stream=stream), backend
+
+
+def test_call_before_gives_up_at_the_deadline():
+    slow = LocalStubBackend(latency_seconds=2.0)
+    started = time.perf_counter()
+    with pytest.raises(DeadlineExceeded):
+        call_before(started + 0.2, slow.generate, "prompt")
+    assert time.perf_counter() - started < 1.0
+
+
+def test_slow_model_gets_the_fallback_reply_within_budget():
+    shopkeeper, backend = slow_shopkeeper(0.2)
+    session = shopkeeper.new_session("Sword", 30)
+
+    started = time.perf_counter()
+    text = shopkeeper.negotiate(session, 10, 0)
+    assert time.perf_counter() - started < 1.0
+    assert text.splitlines()[-1] == "DECISION: REJECT"
+    assert not is_cacheable(text)
+    assert backend.fallbacks == 1
+    assert len(shopkeeper.cache.memory) == 0
+
+
+def test_slow_model_stream_gets_the_fallback_reply_within_budget():
+    shopkeeper, backend = slow_shopkeeper(0.2, stream=True)
+    session = shopkeeper.new_session("Sword", 30)
+
+    started = time.perf_counter()
+    shown = "".join(shopkeeper.negotiate_stream(session, 10, 0))
+    assert time.perf_counter() - started < 1.0
+    assert shown and "DECISION:" not in shown
+    assert backend.fallbacks == 1
+    assert not session.is_accepted
+
+
+def test_shop_visit_ends_when_the_prompt_times_out(offline_shop):
+    # None lets the timed prompt run out; the virtual clock jumps past the limit
+    scripted = ScriptedIO([None])
+    shopkeeper = Shopkeeper("Grimble", greedy)
+    with use_io(scripted):
+        assert shopkeeper.sell(object(), 1, time_limit_seconds=60) is False
+    assert "Come back when you can decide." in scripted.text()
+    assert scripted.clock.now() >= 60
+
+
+class _NullLoop:
+    def call_soon_threadsafe(self, callback, *args):
+        pass
+
+
+def test_socket_prompt_drops_lines_typed_for_a_timed_out_prompt():
+    io = SocketIO(_NullLoop(), writer=None)
+    assert io.read_line("Offer? ", timeout=0.05) is None
+    io.feed("typed too late")
+    # Only a line typed after the new prompt answers it
+    threading.Timer(0.1, io.feed, ("fresh answer",)).start()
+    assert io.read_line("Offer? ", timeout=2.0) == "fresh answer"
@@ -0,0 +1,43 @@
+import random
+
+import pytest
+
+import Rng
+from Characters import Character
+from Combat import ENEMY_BASIC_WEIGHTS, ENEMY_SAMPLERS, ENEMY_VIGOR_WEIGHTS, Combat, choose_enemy_actions
+
+
+@pytest.mark.parametrize("has_vigor", [False, True])
+@pytest.mark.parametrize("preferred", ["attack", "block", "feint", None])
+def test_sampler_draws_match_random_choices(preferred, has_vigor):
+    actions, weights = (ENEMY_VIGOR_WEIGHTS if has_vigor else ENEMY_BASIC_WEIGHTS)[preferred]
+    sampler = ENEMY_SAMPLERS[(preferred, has_vigor)]
+
+    baseline, compiled = random.Random(42), random.Random(42)
+    expected = [baseline.choices(actions, weights, k=1)[0] for _ in range(5000)]
+    drawn = [sampler.draw(compiled) for _ in range(5000)]
+    assert drawn == expected
+
+
+def enemies(count, seed):
+    rng = random.Random(seed)
+    result = []
+    for i in range(count):
+        enemy = Character(f"Enemy {i}", 10, 0, 2, 3)
+        enemy.preferred_action = rng.choice(["attack", "block", "feint", None, "unknown"])
+        enemy.vigor = rng.randint(0, 4)
+        result.append(enemy)
+    return result
+
+
+def test_batched_enemy_actions_match_sequential_calls():
+    batched_enemies, sequential_enemies = enemies(500, 1), enemies(500, 1)
+
+    with Rng.use_seed(9):
+        batched = choose_enemy_actions(batched_enemies)
+    with Rng.use_seed(9):
+        combat = Combat()
+        sequential = [combat._get_enemy_action(enemy) for enemy in sequential_enemies]
+
+    assert batched == sequential
+    assert [e.vigor for e in batched_enemies] == [e.vigor for e in sequential_enemies]
@@ -0,0 +1,39 @@
+import pytest
+
+from Characters import create_enemy, enemy_templates
+from Odds import _odds_for, battle_odds, defensive_policy, odds_table, warm_odds
+from Simulator import Simulator, aggressive_policy, new_player, random_policy
+
+
+def test_warm_odds_leaves_only_cache_hits():
+    rounds = range(1, 3)
+    spent = warm_odds(rounds, [("defensive", defensive_policy)])
+    assert set(spent) == {"defensive"}
+
+    misses = _odds_for.cache_info().misses
+    odds_table(rounds, defensive_policy)
+    assert _odds_for.cache_info().misses == misses
+
+
+@pytest.mark.parametrize("fight_index", [1, 4])
+@pytest.mark.parametrize("template", enemy_templates, ids=lambda template: template["name"])
+def test_outcome_probabilities_add_up_to_one(template, fight_index):
+    odds = battle_odds(new_player(), create_enemy(fight_index - 1, template))
+    assert all(0.0 <= p <= 1.0 for p in (odds.win, odds.loss, odds.double_ko, odds.stall))
+    assert odds.win + odds.loss + odds.double_ko + odds.stall == pytest.approx(1.0)
+    assert odds.expected_turns >= 1.0
+
+
+@pytest.mark.parametrize("policy", [random_policy, aggressive_policy])
+def test_exact_odds_match_sampled_battles(policy):
+    # 60k battles: one standard error of the win rate is about 0.002
+    battles = 60000
+    template = enemy_templates[0]
+    odds = battle_odds(new_player(), create_enemy(0, template), policy)
+    summary = Simulator(policy=policy, compiled=True, seed=3).run_battles(battles, 0, template)
+
+    results = summary["results"]
+    assert summary["win_rate"] == pytest.approx(odds.win, abs=0.01)
+    assert results["player_dead"] / battles == pytest.approx(odds.loss, abs=0.01)
+    assert results["double_ko"] / battles == pytest.approx(odds.double_ko, abs=0.005)
+    assert summary["avg_turns"] == pytest.approx(odds.expected_turns, rel=0.02)
@@ -0,0 +1,31 @@
+import pytest
+
+from GameController import GameController
+from Playthrough import play_scripted, scripted_player
+from UI import ScriptedIO, use_io
+
+
+@pytest.mark.parametrize("seed", [0, 1, 2, 3])
+def test_seeded_run_is_reproducible(offline_shop, seed):
+    first = play_scripted(scripted_player(seed), seed=seed)
+    second = play_scripted(scripted_player(seed), seed=seed)
+
+    assert first.text() == second.text()
+    assert first.prompts == second.prompts
+    assert "[ROUND: 1 BEGINS!]" in first.text()
+    # The bot declines another criminal, so the game quits on its own
+    assert first.text().endswith("Your story ends here.\n")
+
+
+def test_different_seeds_play_different_runs(offline_shop):
+    assert play_scripted(scripted_player(0), seed=0).text() != play_scripted(scripted_player(1), seed=1).text()
+
+
+def test_run_ends_cleanly_when_the_script_runs_out(offline_shop):
+    # Name, "Press Enter" and one combat move; the next menu gets no answer
+    io = play_scripted(["Bot", "1", "2"], seed=0)
+    assert io.prompts == 3
+    assert io.text().endswith("> ")
+
+    with use_io(ScriptedIO([])), pytest.raises(EOFError):
+        GameController().run()
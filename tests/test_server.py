@@ -0,0 +1,11 @@
+import asyncio
+
+from Server import _serve_and_load
+
+
+def test_load_test_runs_complete_without_failures(offline_shop):
+    summary = asyncio.run(_serve_and_load(sessions=3, seed=0, pauses=False))
+    assert summary["completed"] == 3
+    assert summary["errors"] == 0
+    assert summary["failed_runs"] == 0
+    assert summary["answers"] > 0
@@ -0,0 +1,63 @@
+import random
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+from Backends import LocalRuleBackend, LocalStubBackend
+from ResponseCache import LRUCache, ResponseCache
+from Shopkeeper import ITEMS, PERSONALITIES, Shopkeeper
+
+
+def haggle(shopkeeper, session, opening_offer):
+    """
+    Scripted player: opens low, then meets the shopkeeper halfway each
+    step. Returns (accepted, steps, final_offer).
+    """
+    offer, prevoffer = opening_offer, 0
+    while True:
+        shopkeeper.negotiate(session, offer, prevoffer)
+        if session.is_accepted or session.out_of_patience:
+            return session.is_accepted, session.step, offer
+        prevoffer = offer
+        counter = session.last_counter_offer or offer
+        offer = max(offer + 1, (offer + counter + 1) // 2)
+
+
+def run_concurrently(backend, count, workers, seed=0):
+    """
+    (serial results, concurrent results) for `count` haggles sharing the
+    shopkeepers and one backend. The reply cache is off so a session's
+    replies can't depend on what other sessions cached first.
+    """
+    cache = ResponseCache(memory=LRUCache(max_entries=0))
+    shopkeepers = [Shopkeeper(p["name"], p, cache=cache, backend=backend) for p in PERSONALITIES]
+
+    rng = random.Random(seed)
+    jobs = [
+        (rng.choice(shopkeepers), rng.choice(ITEMS)["name"], rng.randint(10, 60), rng.randint(1, 40))
+        for _ in range(count)
+    ]
+
+    def run(job):
+        shopkeeper, item_name, price, opening = job
+        return haggle(shopkeeper, shopkeeper.new_session(item_name, price), opening)
+
+    expected = [run(job) for job in jobs]
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        results = list(pool.map(run, jobs))
+    return expected, results
+
+
+@pytest.mark.parametrize("seed", [0, 1])
+def test_rule_engine_sessions_match_serial(seed):
+    expected, results = run_concurrently(LocalRuleBackend(), count=1000, workers=64, seed=seed)
+    mismatches = [i for i, (a, b) in enumerate(zip(expected, results)) if a != b]
+    assert mismatches == []
+
+
+def test_pooled_backend_sessions_match_serial():
+    stub = LocalStubBackend(latency_seconds=0.002, pool_size=8)
+    expected, results = run_concurrently(stub, count=200, workers=32)
+    mismatches = [i for i, (a, b) in enumerate(zip(expected, results)) if a != b]
+    assert mismatches == []
+    assert stub.setups <= 8  # clients are reused, never built per call
@@ -0,0 +1,13 @@
+import pytest
+
+from Characters import enemy_templates
+from Simulator import Simulator, aggressive_policy, defensive_policy, fixed_policy, random_policy
+
+
+@pytest.mark.parametrize("policy", [random_policy, aggressive_policy, defensive_policy, fixed_policy("feint")])
+@pytest.mark.parametrize("template", enemy_templates, ids=lambda template: template["name"])
+def test_compiled_battles_match_plain_battles(policy, template):
+    # Same seed, same draws: the table walk must not change a single result
+    plain = Simulator(policy=policy, seed=7).run_battles(300, 2, template)
+    compiled = Simulator(policy=policy, compiled=True, seed=7).run_battles(300, 2, template)
+    assert compiled == plain
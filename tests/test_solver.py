@@ -0,0 +1,66 @@
+import time
+
+import pytest
+
+from Characters import Character
+from Combat import Combat
+from CombatTable import compile_table
+from Simulator import Simulator, random_policy
+from Solver import solution_for, solve
+
+
+def fighter(name, health, armor=0, damage=2):
+    return Character(name, health, 0, armor, damage)
+
+
+@pytest.fixture(scope="module")
+def tiny_solution():
+    return solve(compile_table(3, 0, 0, 2, 3, 0, 0, 2, vigor_cap=2))
+
+
+def test_values_are_probabilities(tiny_solution):
+    assert all(0.0 <= value <= 1.0 for value in tiny_solution.values)
+    assert 0.0 < tiny_solution.win_probability < 1.0
+
+
+def test_strategies_sum_to_one(tiny_solution):
+    table = tiny_solution.table
+    for index in range(len(table)):
+        if table.is_terminal(index):
+            continue
+        for strategy in (tiny_solution.player_strategy(index), tiny_solution.enemy_strategy(index)):
+            assert sum(strategy.values()) == pytest.approx(1.0)
+            assert all(probability >= 0.0 for probability in strategy.values())
+
+
+def test_solution_for_is_memoized():
+    player, enemy = fighter("Player", 3), fighter("Enemy", 3)
+    first = solution_for(player, enemy, vigor_cap=2)
+    assert solution_for(player, enemy, vigor_cap=2) is first
+    assert first.values[first.table.start] == first.win_probability
+
+
+def test_hard_mode_simulator_battle_finishes():
+    sim = Simulator(policy=random_policy, seed=0, hard_mode=True)
+    for _ in range(5):
+        result, turns = sim.run_battle(fighter("Player", 3), fighter("Enemy", 3))
+        assert result in ("enemy_dead", "player_dead", "double_ko", "timeout")
+        assert 0 < turns <= sim.max_turns
+    assert sim.combat.solution is not None
+
+
+def test_hard_mode_game_does_not_wait_for_the_solver():
+    combat = Combat(hard_mode=True)
+    player, enemy = fighter("Player", 4), fighter("Enemy", 3)
+
+    started = time.perf_counter()
+    combat.begin_battle(player, enemy)
+    assert time.perf_counter() - started < 0.5
+    # The regular AI plays until the solution is ready
+    assert combat.solution is None
+    assert combat._get_enemy_action(enemy, player) in ("attack", "block", "feint")
+
+    combat._solution_future.result(timeout=120)
+    combat._get_enemy_action(enemy, player)
+    assert combat.solution is not None
+    assert combat.solution.table.signature[:4] == (4, 0, 0, 2)
@@ -0,0 +1,69 @@
+import pytest
+
+from Backends import LocalStubBackend
+from ResponseCache import LRUCache, ResponseCache
+from Shopkeeper import DecisionFilter, Shopkeeper, greedy
+
+REPLIES = [
+    "Hmph. Fine, I'll take 25 gold for it.\nDECISION: ACCEPT",
+    "Nice try, kid. 40 gold, not a copper less.\n\nDECISION: REJECT\n",
+    "Decent try.\nDecisive men pay 32 gold.\n  decision: accept  ",
+    "  \nNo decision line at all, just 18 gold.",
+]
+
+CHUNK_SIZES = [1, 2, 3, 5, 8, 64]
+
+
+def displayed(reply):
+    """What the non-streaming shop shows for a full reply."""
+    lines = reply.strip().splitlines()
+    if lines and lines[-1].strip().upper().startswith("DECISION:"):
+        return "\n".join(lines[:-1]).strip()
+    return reply.strip()
+
+
+def shopkeeper_for(reply, chunk_size):
+    backend = LocalStubBackend(reply=reply, chunk_size=chunk_size)
+    return Shopkeeper("Grimble", greedy, cache=ResponseCache(memory=LRUCache(max_entries=0)), backend=backend)
+
+
+@pytest.mark.parametrize("chunk_size", CHUNK_SIZES)
+@pytest.mark.parametrize("reply", REPLIES)
+def test_stream_hides_the_decision_line(reply, chunk_size):
+    shopkeeper = shopkeeper_for(reply, chunk_size)
+    session = shopkeeper.new_session("Sword", 30)
+    rendered = "".join(shopkeeper.negotiate_stream(session, 20, 0))
+
+    assert "DECISION:" not in rendered.upper()
+    assert rendered == displayed(reply)
+
+
+@pytest.mark.parametrize("chunk_size", CHUNK_SIZES)
+@pytest.mark.parametrize("reply", REPLIES)
+def test_stream_decision_matches_negotiate(reply, chunk_size):
+    streamed = shopkeeper_for(reply, chunk_size)
+    streamed_session = streamed.new_session("Sword", 30)
+    list(streamed.negotiate_stream(streamed_session, 20, 0))
+
+    plain = shopkeeper_for(reply, chunk_size)
+    plain_session = plain.new_session("Sword", 30)
+    plain.negotiate(plain_session, 20, 0)
+
+    assert streamed_session.is_accepted == plain_session.is_accepted
+    assert streamed_session.last_counter_offer == plain_session.last_counter_offer
+
+
+def test_marker_split_across_chunks_is_held_back():
+    reply = DecisionFilter()
+    shown = [reply.feed(chunk) for chunk in ("Fine, 25 gold.\nDE", "CIS", "ION: ACC", "EPT")]
+    shown.append(reply.close())
+
+    assert shown[0] == "Fine, 25 gold."
+    assert "".join(shown) == "Fine, 25 gold."
+    assert reply.text() == "Fine, 25 gold.\nDECISION: ACCEPT"
+
+
+def test_text_that_only_starts_like_the_marker_is_shown():
+    reply = DecisionFilter()
+    assert reply.feed("Dec") == ""  # could still be "DECISION:"
+    assert reply.feed("ent offer") == "Decent offer"
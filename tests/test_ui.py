@@ -0,0 +1,27 @@
+import io
+import time
+
+from Server import SocketIO
+from UI import Renderer, ScriptedIO, VirtualClock
+
+
+def test_typewriter_pauses_on_the_renderer_clock():
+    clock = VirtualClock()
+    out = io.StringIO()
+    renderer = Renderer(stream=out, skip_on_key=False, clock=clock)
+
+    started = time.perf_counter()
+    renderer.play("x" * 300, delay=0.03, end="\n")  # 9 s of typewriter
+    assert time.perf_counter() - started < 1.0
+    assert out.getvalue() == "x" * 300 + "\n"
+    assert abs(clock.now() - 9.0) < 1e-9
+
+
+def test_game_io_shares_its_clock_with_the_renderer():
+    scripted = ScriptedIO([])
+    assert scripted.renderer.clock is scripted.clock
+
+    # Server.py --typewriter --no-pauses
+    socket_io = SocketIO(loop=None, writer=None, typewriter=True, pauses=False)
+    assert isinstance(socket_io.clock, VirtualClock)
+    assert socket_io.renderer.clock is socket_io.clock
@@ -0,0 +1,10 @@
+import pytest
+
+from VectorCombat import check_parity
+
+
+@pytest.mark.parametrize("seed", [0, 1, 2, 3])
+def test_vector_resolve_turn_matches_combat(seed):
+    # check_parity plays all 25 action pairs from every random state
+    mismatches = check_parity(samples=500, seed=seed)
+    assert mismatches == [], "\n".join(mismatches[:10])